@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'search_api.middleware.ServerTimingMiddleware',
+    'search_api.middleware.SnapshotMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -96,6 +98,9 @@ CSRF_TRUSTED_ORIGINS = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Permet au frontend de lire les temps par phase (Server-Timing)
+CORS_EXPOSE_HEADERS = ['Server-Timing']
+
 LANGUAGE_CODE = 'fr-fr'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -108,4 +113,65 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# URL alternative des endpoints Gemini (ex: stub local `manage.py gemini_stub`)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+# Pool HTTP du client Gemini partagé (search_api/gemini_client.py)
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+GEMINI_KEEPALIVE_SECONDS = float(os.getenv("GEMINI_KEEPALIVE_SECONDS", "60"))
+
+# Analyse d'images par lot (analyze-images/) : appels Gemini simultanés et taille max d'un lot
+IMAGE_BATCH_CONCURRENCY = int(os.getenv("IMAGE_BATCH_CONCURRENCY", "4"))
+IMAGE_BATCH_MAX_IMAGES = int(os.getenv("IMAGE_BATCH_MAX_IMAGES", "10"))
+
+# Reconnaissance locale (photos de référence) devant Gemini : seuil de similarité pour
+# ne pas appeler Gemini, et seuil minimal pour servir de repli quand Gemini renvoie 429
+IMAGE_LOCAL_RECOGNIZER = os.getenv("IMAGE_LOCAL_RECOGNIZER", "true").lower() in ("1", "true", "yes")
+IMAGE_LOCAL_CONFIDENT = float(os.getenv("IMAGE_LOCAL_CONFIDENT", "0.9"))
+IMAGE_LOCAL_FALLBACK_MIN = float(os.getenv("IMAGE_LOCAL_FALLBACK_MIN", "0.5"))
+
+# Uploads audio (transcribe/, voice-search/) : taille et durée max, octets gardés en mémoire
+# avant de déborder sur disque (SpooledTemporaryFile)
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", str(20 * 1024 * 1024)))
+AUDIO_MAX_SECONDS = int(os.getenv("AUDIO_MAX_SECONDS", "300"))
+AUDIO_SPOOL_MEMORY_BYTES = int(os.getenv("AUDIO_SPOOL_MEMORY_BYTES", str(2 * 1024 * 1024)))
+# Prétraitement avant Gemini (mono, 16 kHz, silences coupés) ; ffmpeg décode WebM/OGG/MP3 et encode en Opus
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "true").lower() in ("1", "true", "yes")
+AUDIO_FFMPEG = os.getenv("AUDIO_FFMPEG", "ffmpeg")
+
+# Recherche par lot (search-batch/) : requêtes max par lot et top-k max par requête
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "200"))
+SEARCH_BATCH_MAX_LIMIT = int(os.getenv("SEARCH_BATCH_MAX_LIMIT", "50"))
+
+# Scoring de l'index : "dict" (boucles Python, tous les documents scorés puis triés),
+# "maxscore" (top-k élagué, postings triés par document), "sparse" (matrice CSR SciPy)
+# ou "auto" (maxscore, puis CSR à partir de SPARSE_SCORING_MIN_DOCS recettes indexées)
+SEARCH_SCORING_BACKEND = os.getenv("SEARCH_SCORING_BACKEND", "auto")
+SPARSE_SCORING_MIN_DOCS = int(os.getenv("SPARSE_SCORING_MIN_DOCS", "2000"))
+
+# Recettes similaires (recipes/<id>/similar/) : voisins max par réponse (similar_recipes.json en garde 10)
+SIMILAR_RECIPES_MAX_LIMIT = int(os.getenv("SIMILAR_RECIPES_MAX_LIMIT", "10"))
+
+# Regroupe les quasi-doublons (duplicates.json, MinHash/LSH) dans les tops de recherche
+SEARCH_COLLAPSE_DUPLICATES = os.getenv("SEARCH_COLLAPSE_DUPLICATES", "true").lower() in ("1", "true", "yes")
+
+# Index construits avec une autre chaîne d'analyse (ANALYZER_ID) : refusés, ou seulement signalés si false
+SEARCH_ANALYZER_STRICT = os.getenv("SEARCH_ANALYZER_STRICT", "true").lower() in ("1", "true", "yes")
+
+# Recherche plein texte (fulltext-search/) : boosts par défaut des champs, modifiables par requête
+SEARCH_FIELD_BOOSTS = {
+    'title': float(os.getenv("SEARCH_BOOST_TITLE", "3.0")),
+    'ingredients': float(os.getenv("SEARCH_BOOST_INGREDIENTS", "2.0")),
+    'steps': float(os.getenv("SEARCH_BOOST_STEPS", "1.0")),
+}
+
+# Index plein texte en shards (field_shards/) : un processus par shard, ou tous en mémoire (threads) si false
+SEARCH_SHARD_PROCESSES = os.getenv("SEARCH_SHARD_PROCESSES", "true").lower() in ("1", "true", "yes")
+
+# Recherche texte darija (text-search/) : requêtes résolues par le lexique local sans appeler Gemini
+TEXT_LOCAL_LEXICON = os.getenv("TEXT_LOCAL_LEXICON", "true").lower() in ("1", "true", "yes")
+
+# Autocomplétion (autocomplete/) : nombre max de suggestions par préfixe
+AUTOCOMPLETE_MAX_LIMIT = int(os.getenv("AUTOCOMPLETE_MAX_LIMIT", "20"))
+
 CORS_ALLOW_ALL_ORIGINS = True
@@ -0,0 +1,48 @@
+"""
+Configuration gunicorn (chargée automatiquement depuis backend/) :
+    gunicorn backend.wsgi
+
+GUNICORN_PRELOAD=true (défaut) : l'application, les index et les recettes sont chargés
+une fois dans le maître (search_api.preload), gc.freeze() puis fork : les workers
+partagent ces pages en copy-on-write. false : chaque worker charge sa propre copie
+au démarrage (comportement sans préchargement, pour comparer).
+Mémoire par worker : python manage.py worker_memory --pid <pid du maître>
+"""
+
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+if preload_app:
+    # Pas de collecte dans le maître pendant le chargement : pas de trous dans les pages à partager
+    gc.disable()
+
+
+def preload(log):
+    from search_api.preload import preload_indexes
+
+    summary = preload_indexes()
+    log.info("Index préchargés: %(terms)s termes, %(documents)s recettes en %(seconds)ss", summary)
+
+
+def when_ready(server):
+    """Maître, avant le premier fork"""
+    if preload_app:
+        preload(server.log)
+        gc.freeze()
+        server.log.info("gc.freeze(): %s objets partagés avec les workers", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    """Sans préchargement, chaque worker charge ses index avant de servir (mémoire comparable)"""
+    if not preload_app:
+        preload(worker.log)
@@ -0,0 +1,98 @@
+"""
+Autocomplétion des requêtes (type-ahead) sur les termes de l'index et les titres de recettes
+- Clés normalisées (minuscules, sans accents) rangées dans un tableau trié :
+  un préfixe = un intervalle [lo, hi) trouvé par deux bisect
+- Un titre est aussi indexé à partir de chacun de ses mots (« poul » → « tajine de poulet »)
+- Poids = fréquence documentaire (recettes contenant le terme, ou portant le titre)
+- Les intervalles trop larges (préfixes courts) ne sont triés qu'une fois, puis mémorisés
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+# Au-delà de cette taille d'intervalle, le top du préfixe est mémorisé
+DENSE_RANGE = 256
+# Borne haute de 'limit' par défaut (les vues passent AUTOCOMPLETE_MAX_LIMIT)
+MAX_SUGGESTIONS = 20
+# Ordre des types à poids égal
+TYPE_ORDER = {'term': 0, 'recipe': 1}
+
+
+def normalize_text(text):
+    """Minuscules sans accents, séparateurs ramenés à un espace (« Ras-el-Hanout » → « ras el hanout »)"""
+    text = ''.join(
+        c for c in unicodedata.normalize('NFD', text.lower())
+        if unicodedata.category(c) != 'Mn'
+    )
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+
+class AutocompleteIndex:
+    """Tableau trié des clés de complétion ; chaque clé renvoie au rang de sa suggestion"""
+
+    def __init__(self, terms, titles, max_suggestions=MAX_SUGGESTIONS):
+        """
+        terms: {terme: fréquence documentaire}
+        titles: [(titre, identifiant de recette ou None)], un élément par document
+        max_suggestions: borne haute de 'limit', et taille du top mémorisé par préfixe dense
+        """
+        self.max_suggestions = max_suggestions
+        merged = {}
+        for term, frequency in terms.items():
+            normalized = normalize_text(term)
+            if normalized:
+                merged[('term', normalized)] = {'text': term, 'type': 'term', 'weight': frequency}
+        for title, recipe_id in titles:
+            normalized = normalize_text(title)
+            if not normalized:
+                continue
+            entry = merged.setdefault(('recipe', normalized),
+                                      {'text': title.strip(), 'type': 'recipe', 'weight': 0, 'id': recipe_id})
+            entry['weight'] += 1
+            if entry.get('id') is None:
+                entry['id'] = recipe_id
+
+        # Rang global : poids décroissant, puis type, puis texte ; le top d'un préfixe = ses plus petits rangs
+        ordered = sorted(merged.items(), key=lambda item: (-item[1]['weight'], TYPE_ORDER[item[0][0]], item[0][1]))
+        self.suggestions = [entry for _, entry in ordered]
+
+        keys = []
+        for rank, ((kind, normalized), _) in enumerate(ordered):
+            keys.append((normalized, rank))
+            if kind == 'recipe':
+                words = normalized.split(' ')
+                for i in range(1, len(words)):
+                    if len(words[i]) >= 3:
+                        keys.append((' '.join(words[i:]), rank))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.ranks = np.array([rank for _, rank in keys], dtype=np.int32)
+
+        # Préfixe → top mémorisé (affectation de dict atomique : pas de verrou nécessaire)
+        self._dense_tops = {}
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def prefix_range(self, prefix):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\x7f', lo)
+        return lo, hi
+
+    def complete(self, prefix, limit=8):
+        """Top-'limit' suggestions dont une clé commence par le préfixe"""
+        prefix = normalize_text(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, self.max_suggestions)
+        lo, hi = self.prefix_range(prefix)
+        if hi - lo > DENSE_RANGE:
+            top = self._dense_tops.get(prefix)
+            if top is None:
+                top = self._dense_tops[prefix] = np.unique(self.ranks[lo:hi])[:self.max_suggestions]
+        else:
+            top = np.unique(self.ranks[lo:hi])
+        return [self.suggestions[rank] for rank in top[:limit]]
@@ -0,0 +1,110 @@
+"""
+Recherche plein texte multi-champs (field_index.json) : titre, ingrédients, étapes
+- Postings par champ décodés au chargement : (recettes, tf normalisé par la longueur du champ)
+- Score BM25F : tf combiné = Σ boost_champ × tf_norm_champ, saturé une seule fois (k1), × idf
+- Les boosts sont choisis à la requête : changer de pondération ne demande aucune reconstruction
+- Le coût d'une requête suit la taille des postings de ses termes, pas celle du corpus
+- Top-k par argpartition, égalités départagées par nom de fichier
+- Un shard (sous-ensemble des recettes) reçoit les statistiques de toute la collection
+  (nombre de recettes, longueurs moyennes, df) : ses scores sont ceux de l'index complet
+"""
+
+import numpy as np
+
+from .indexing.Recipies.PythonScripts.build_field_index import STOP_WORDS
+from .indexing.Recipies.PythonScripts.analyzer import analyze
+
+K1 = 1.2
+# Normalisation par la longueur : forte sur les étapes (longues et variables), faible sur le titre
+FIELD_B = {'title': 0.3, 'ingredients': 0.6, 'steps': 0.75}
+
+EMPTY_POSTINGS = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+
+
+class FieldIndex:
+    """Index multi-champs : terme → champ → (identifiants de recettes, tf normalisés)"""
+
+    def __init__(self, data, collection=None):
+        """collection: {'documents', 'average_lengths', 'df'} de la collection entière pour un shard"""
+        self.fields = data.get('fields', [])
+        self.documents = data.get('documents', [])
+        n_docs = collection['documents'] if collection else len(self.documents)
+
+        norms = {}
+        for field in self.fields:
+            lengths = np.asarray(data['lengths'][field], dtype=np.float64)
+            if collection:
+                average = collection['average_lengths'][field] or 1.0
+            else:
+                average = lengths.mean() if n_docs and lengths.mean() > 0 else 1.0
+            b = FIELD_B.get(field, 0.75)
+            norms[field] = 1.0 - b + b * lengths / average
+
+        self.postings = {}
+        self.idf = {}
+        for term, term_postings in data.get('postings', {}).items():
+            decoded = {}
+            for field, encoded in term_postings.items():
+                doc_ids = np.cumsum(encoded[0::2], dtype=np.int64)
+                decoded[field] = (doc_ids, np.asarray(encoded[1::2], dtype=np.float64) / norms[field][doc_ids])
+            self.postings[term] = decoded
+            # idf BM25 sur les recettes contenant le terme dans au moins un champ
+            if collection:
+                df = collection['df'][term]
+            else:
+                df = len(np.unique(np.concatenate([doc_ids for doc_ids, _ in decoded.values()])))
+            self.idf[term] = float(np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)))
+
+    def query_terms(self, text):
+        """Termes connus de la requête (mots vides et inconnus ignorés), sans doublon"""
+        return list(dict.fromkeys(
+            term for term in analyze(text) if term in self.postings and term not in STOP_WORDS
+        ))
+
+    def search(self, text, boosts, limit=5):
+        """Top-'limit' [(fichier, score, [champs trouvés])] pour une requête plein texte"""
+        return [(filename, round(score, 4), fields) for filename, score, fields in self.top_k(text, boosts, limit)]
+
+    def top_k(self, text, boosts, limit=5):
+        """Comme search, scores non arrondis : triés par (-score, fichier), fusionnables entre shards"""
+        fields = [field for field in self.fields if boosts.get(field, 0.0) > 0]
+        terms = self.query_terms(text)
+        doc_parts, score_parts = [], []
+        for term in terms:
+            postings = [self.postings[term].get(field, EMPTY_POSTINGS) for field in fields]
+            doc_ids = np.concatenate([docs for docs, _ in postings]) if postings else EMPTY_POSTINGS[0]
+            if not len(doc_ids):
+                continue
+            weighted = np.concatenate([tf * boosts[field] for field, (_, tf) in zip(fields, postings)])
+            # tf combiné des champs par recette, saturé une seule fois
+            docs, inverse = np.unique(doc_ids, return_inverse=True)
+            tf = np.bincount(inverse, weights=weighted)
+            doc_parts.append(docs)
+            score_parts.append(self.idf[term] * tf * (K1 + 1.0) / (tf + K1))
+        if not doc_parts:
+            return []
+
+        candidates, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if len(candidates) > limit:
+            kth = scores[np.argpartition(-scores, limit - 1)[limit - 1]]
+            keep = scores >= kth
+            candidates, scores = candidates[keep], scores[keep]
+        order = np.lexsort((candidates, -scores))[:limit]
+
+        return [
+            (self.documents[doc], float(score), self.matched_fields(terms, doc, fields))
+            for doc, score in zip(candidates[order], scores[order])
+        ]
+
+    def matched_fields(self, terms, doc, fields):
+        """Champs de la recette où au moins un terme de la requête apparaît (postings triés : recherche binaire)"""
+        matched = []
+        for field in fields:
+            for term in terms:
+                doc_ids = self.postings[term].get(field, EMPTY_POSTINGS)[0]
+                i = np.searchsorted(doc_ids, doc)
+                if i < len(doc_ids) and doc_ids[i] == doc:
+                    matched.append(field)
+                    break
+        return matched
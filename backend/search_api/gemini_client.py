@@ -0,0 +1,70 @@
+"""
+Client Gemini partagé par tout le processus (SDK google-genai)
+- Un seul genai.Client, construit au premier appel puis réutilisé
+- Connexions HTTP persistantes (keep-alive) dans un pool borné :
+  les requêtes ne paient plus ni la construction du client ni le TLS
+- Le SDK (près d'une seconde d'import) n'est importé qu'à la construction du client :
+  les commandes manage.py et le démarrage des workers ne le paient pas
+"""
+
+import os
+import threading
+
+from django.conf import settings
+
+# ✅ Modèle utilisé pour l'image, le texte et l'audio
+MODEL_NAME = "gemini-2.5-flash"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class RateLimitedError(Exception):
+    """Gemini a refusé l'appel faute de quota (429 RESOURCE_EXHAUSTED)"""
+
+
+def is_rate_limited(error):
+    """Reconnaît une erreur de quota, quel que soit le type d'exception du SDK"""
+    error_msg = str(error)
+    return getattr(error, 'code', None) == 429 or "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg
+
+
+def get_setting(name, default=None):
+    """Lit un réglage Django, ou l'environnement hors projet Django (scripts)"""
+    if settings.configured:
+        return getattr(settings, name, default)
+    return os.environ.get(name, default)
+
+
+def build_client():
+    """Construit un client avec un pool de connexions borné et keep-alive"""
+    import httpx
+    from google import genai
+    from google.genai import types
+
+    max_connections = int(get_setting('GEMINI_MAX_CONNECTIONS', 20))
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=float(get_setting('GEMINI_KEEPALIVE_SECONDS', 60)),
+    )
+    http_options = types.HttpOptions(
+        base_url=get_setting('GEMINI_BASE_URL') or None,
+        client_args={'limits': limits},
+    )
+    return genai.Client(api_key=get_setting('GEMINI_API_KEY'), http_options=http_options)
+
+
+def get_client():
+    """Retourne le client partagé (créé une seule fois, thread-safe)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_client()
+    return _client
+
+
+def generate_content(contents, config=None, model=MODEL_NAME):
+    """Appel generate_content via le client partagé"""
+    return get_client().models.generate_content(model=model, contents=contents, config=config)
@@ -0,0 +1,156 @@
+"""
+Reconnaissance locale des plats (hors ligne) à partir des photos de référence
+- Descripteurs compacts par photo : histogramme HSV (128 cases) + dHash 64 bits
+- kNN sur les photos étiquetées de indexing/Recipies/images (étiquette = recette qui la référence)
+- Sert de raccourci devant Gemini quand la correspondance est sûre,
+  et de repli quand Gemini est limité (429)
+
+Construction des descripteurs (depuis backend/, à relancer si les photos changent):
+    python -m search_api.image_search.local_recognizer
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '..', 'indexing', 'Recipies')
+IMAGES_DIR = os.path.join(BASE_DIR, 'images')
+RECIPES_DIR = os.path.join(BASE_DIR, 'recipes')
+DESCRIPTORS_PATH = os.path.join(BASE_DIR, 'image_descriptors.json')
+
+HSV_BINS = (8, 4, 4)
+HIST_SIZE = 64
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+_recognizer_cache = {'source': None, 'recognizer': None}
+_recognizer_lock = threading.Lock()
+
+
+# ============================================================
+# DESCRIPTEURS
+# ============================================================
+
+def compute_descriptor(image):
+    """(histogramme HSV normalisé, dHash 64 bits) d'une image PIL"""
+    # Décodage JPEG réduit : inutile de décompresser la pleine résolution
+    image.draft('RGB', (HIST_SIZE * 4, HIST_SIZE * 4))
+    image = image.convert('RGB')
+
+    hsv = np.asarray(image.resize((HIST_SIZE, HIST_SIZE)).convert('HSV'), dtype=np.int32).reshape(-1, 3)
+    h_bins, s_bins, v_bins = HSV_BINS
+    bins = (hsv[:, 0] * h_bins // 256) * (s_bins * v_bins) + (hsv[:, 1] * s_bins // 256) * v_bins \
+        + hsv[:, 2] * v_bins // 256
+    histogram = np.bincount(bins, minlength=h_bins * s_bins * v_bins).astype(np.float32)
+    histogram /= histogram.sum()
+
+    # dHash : gradient horizontal sur une vignette 9x8 en niveaux de gris
+    gray = np.asarray(image.convert('L').resize((9, 8)), dtype=np.int16)
+    bits = (gray[:, 1:] > gray[:, :-1]).flatten()
+    dhash = int(''.join('1' if b else '0' for b in bits), 2)
+    return histogram, dhash
+
+
+def label_references(recipes_dir=RECIPES_DIR):
+    """Photo → étiquette (nom_recette, ingredients_visibles, recettes) déduite des recettes qui la citent"""
+    from ..indexing.Recipies.PythonScripts.build_inverted_index import StrictRecipeIndexer
+
+    indexer = StrictRecipeIndexer()
+    recipes_by_image = {}
+    for filename in sorted(f for f in os.listdir(recipes_dir) if f.endswith('.json')):
+        with open(os.path.join(recipes_dir, filename), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('image'):
+            recipes_by_image.setdefault(os.path.basename(data['image']), []).append((filename, data))
+
+    labels = {}
+    for image_name, recipes in recipes_by_image.items():
+        # Plusieurs recettes pour une photo : la plus générique (nom le plus court) donne l'étiquette
+        filename, data = min(recipes, key=lambda r: (len(r[1].get('name', '')), r[0]))
+        name = data.get('name', '').lower().strip()
+        dishes, modifiers = indexer.extract_main_dishes_and_modifiers(name)
+        labels[image_name] = {
+            'nom_recette': sorted(dishes)[0].replace('_', ' ') if dishes else name,
+            'ingredients_visibles': sorted(modifiers),
+            'recipes': [r[0] for r in recipes],
+        }
+    return labels
+
+
+def build_descriptors(images_dir=IMAGES_DIR, recipes_dir=RECIPES_DIR):
+    """Descripteurs de toutes les photos étiquetées (format de image_descriptors.json)"""
+    from PIL import Image
+
+    labels = label_references(recipes_dir)
+    references = []
+    for image_name in sorted(os.listdir(images_dir)):
+        if not image_name.lower().endswith(IMAGE_EXTENSIONS) or image_name not in labels:
+            continue
+        with Image.open(os.path.join(images_dir, image_name)) as image:
+            histogram, dhash = compute_descriptor(image)
+        references.append({
+            'image': image_name,
+            **labels[image_name],
+            'hist': [round(float(v), 5) for v in histogram],
+            'dhash': f'{dhash:016x}',
+        })
+    return {'hsv_bins': list(HSV_BINS), 'references': references}
+
+
+# ============================================================
+# RECONNAISSANCE
+# ============================================================
+
+class LocalRecognizer:
+    """kNN sur les descripteurs de référence ; similarité = moyenne (intersection d'histogrammes, 1 - Hamming/64)"""
+
+    def __init__(self, descriptors):
+        self.references = descriptors.get('references', [])
+        self.histograms = np.array([r['hist'] for r in self.references], dtype=np.float32).reshape(-1, 128)
+        self.hashes = np.array([int(r['dhash'], 16) for r in self.references], dtype=np.uint64)
+
+    def similarities(self, image):
+        histogram, dhash = compute_descriptor(image)
+        intersection = np.minimum(self.histograms, histogram).sum(axis=1)
+        hamming = np.bitwise_count(self.hashes ^ np.uint64(dhash)).astype(np.float32)
+        return 0.5 * intersection + 0.5 * (1.0 - hamming / 64.0)
+
+    def recognize(self, image, k=3):
+        """Analyse au format de analyze_image_with_gemini, avec 'confidence' et 'reference', ou None"""
+        if not self.references:
+            return None
+        similarities = self.similarities(image)
+        neighbours = np.argsort(-similarities)[:k]
+
+        # Vote pondéré par la similarité ; le meilleur voisin du plat élu donne l'étiquette
+        votes = {}
+        for i in neighbours:
+            dish = self.references[i]['nom_recette']
+            votes[dish] = votes.get(dish, 0.0) + float(similarities[i])
+        dish = max(votes, key=votes.get)
+        best = next(i for i in neighbours if self.references[i]['nom_recette'] == dish)
+
+        reference = self.references[best]
+        return {
+            'nom_recette': reference['nom_recette'],
+            'ingredients_visibles': list(reference['ingredients_visibles']),
+            'confidence': round(float(similarities[best]), 4),
+            'reference': reference['image'],
+        }
+
+
+def get_recognizer(descriptors):
+    """Reconnaisseur construit une fois par contenu de image_descriptors.json chargé"""
+    with _recognizer_lock:
+        if _recognizer_cache['source'] is not descriptors:
+            _recognizer_cache['recognizer'] = LocalRecognizer(descriptors)
+            _recognizer_cache['source'] = descriptors
+        return _recognizer_cache['recognizer']
+
+
+if __name__ == '__main__':
+    descriptors = build_descriptors()
+    with open(DESCRIPTORS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(descriptors, f, ensure_ascii=False)
+    print(f"✅ {len(descriptors['references'])} photos de référence décrites dans '{DESCRIPTORS_PATH}'")
@@ -0,0 +1,63 @@
+"""
+Snapshot d'index servi (build_inverted_index.py --snapshot)
+- Le lien indexing/Recipies/current → snapshots/<version> est lu une fois au début de chaque
+  requête (SnapshotMiddleware) : toute la requête lit ses artefacts dans ce snapshot
+- Une publication (renommage atomique du lien) ne concerne que les requêtes suivantes ;
+  celles en cours finissent sur l'ancien snapshot, conservé sur disque (--keep)
+- Sans lien 'current', les artefacts sont lus à plat dans indexing/Recipies (ancienne disposition)
+"""
+
+import contextvars
+import os
+
+from .indexing.Recipies.PythonScripts.snapshots import CURRENT_LINK, SNAPSHOTS_DIR
+
+INDEX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'indexing', 'Recipies'))
+
+_UNPINNED = object()
+# Répertoire du snapshot de la requête en cours ('' sans snapshot), _UNPINNED hors requête
+_pinned_snapshot = contextvars.ContextVar('index_snapshot', default=_UNPINNED)
+
+
+def resolve_snapshot():
+    """Répertoire du snapshot publié à cet instant, '' si les artefacts sont à plat"""
+    try:
+        target = os.readlink(os.path.join(INDEX_DIR, CURRENT_LINK))
+    except OSError:
+        return ''
+    return os.path.normpath(os.path.join(INDEX_DIR, target))
+
+
+def pin_snapshot():
+    """Fige le snapshot de la requête qui commence ; jeton à rendre à unpin_snapshot"""
+    return _pinned_snapshot.set(resolve_snapshot())
+
+
+def unpin_snapshot(token):
+    _pinned_snapshot.reset(token)
+
+
+def active_snapshot():
+    """Snapshot figé par la requête en cours, sinon celui publié à cet instant"""
+    snapshot = _pinned_snapshot.get()
+    return resolve_snapshot() if snapshot is _UNPINNED else snapshot
+
+
+def artifact_path(path):
+    """Chemin absolu d'un artefact d'index, pris dans le snapshot actif s'il y en a un"""
+    abs_path = os.path.abspath(path)
+    snapshot = active_snapshot()
+    if not snapshot:
+        return abs_path
+    relative = os.path.relpath(abs_path, INDEX_DIR)
+    # Chemins hors de indexing/Recipies (corpus de benchmark...) : inchangés
+    if relative.startswith(os.pardir):
+        return abs_path
+    return os.path.join(snapshot, relative)
+
+
+def is_stale(path):
+    """Vrai pour un artefact d'un snapshot qui n'est plus publié (à retirer des caches)"""
+    snapshots = os.path.join(INDEX_DIR, SNAPSHOTS_DIR) + os.sep
+    current = resolve_snapshot()
+    return path.startswith(snapshots) and not (current and path.startswith(current + os.sep))
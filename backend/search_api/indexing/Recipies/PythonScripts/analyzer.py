@@ -0,0 +1,141 @@
+"""
+Single analysis chain shared by every index build and by the API at query time.
+
+    text -> lowercase -> accents stripped (NFD) -> [a-z0-9]+ tokens -> plurals and spellings folded
+
+Every artifact built from recipe text stores ANALYZER_ID in its header; the
+server refuses an artifact whose id differs from its own, so index terms and
+query terms can never silently diverge. ANALYZER_ID combines ANALYZER_VERSION
+with a fingerprint of the tables below: editing a table without bumping the
+version still changes the id.
+
+QUERY_EXPANSIONS is applied to queries only (expand_query): it never changes
+an index term, so it is not part of the fingerprint.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
+
+# ------------ CONFIG ------------
+ANALYZER_NAME = "recipe-fold"
+ANALYZER_VERSION = 2
+TOKEN_PATTERN = r"[a-z0-9]+"
+
+VALID_INGREDIENTS = frozenset({
+    'chicken', 'lamb', 'beef', 'meat', 'fish', 'tuna', 'shrimp', 'prawn', 'veal',
+    'turkey', 'calamari', 'sardine', 'liver', 'brain', 'tripe', 'mutton', 'head', 'feet', 'khlii',
+    'onion', 'garlic', 'tomato', 'potato', 'carrot', 'zucchini', 'olive', 'aubergine',
+    'pepper', 'chili', 'prune', 'lemon', 'orange', 'raisin', 'almond', 'date',
+    'mint', 'parsley', 'cilantro', 'ginger', 'cumin', 'paprika', 'turmeric', 'saffron',
+    'cinnamon', 'harissa', 'ras-el-hanout', 'anise', 'fennel',
+    'couscous', 'semolina', 'fava', 'chickpea', 'lentil', 'rice', 'flour', 'wheat', 'barley',
+    'bread', 'yeast', 'egg', 'cheese', 'butter', 'oil', 'smen', 'broth', 'stock', 'honey',
+    'sugar', 'milk', 'cream', 'coco', 'vinegar', 'pickle', 'merguez', 'kefta', 'dates'
+})
+MAIN_DISHES = frozenset({
+    'tajine', 'tagine', 'couscous', 'pastilla', 'harira', 'briouate',
+    'rfissa', 'tangia', 'kefta', 'zaalouk', 'msemen', 'chebakia',
+    'bissara', 'mechoui', 'sellou', 'mint_tea', 'batbout', 'khobz',
+    'harcha', 'baghrir', 'rghaif', 'mlaoui', 'seffa', 'mrouzia',
+    'chorba', 'loubia', 'taktouka', 'salad', 'fekkas', 'ghriba',
+    'kaab_ghzal', 'makrout', 'halwa', 'soup', 'chermoula'
+})
+SINGULAR_MAP = {
+    'tomatoes': 'tomato', 'potatoes': 'potato', 'olives': 'olive',
+    'eggs': 'egg', 'chickpeas': 'chickpea', 'lentils': 'lentil',
+    'prunes': 'prune', 'raisins': 'raisin', 'almonds': 'almond',
+    'sardines': 'sardine', 'dates': 'date', 'shrimps': 'shrimp',
+    'favas': 'fava'
+}
+# Darija / French spellings of a dish folded to its vocabulary term, in recipes and queries
+TERM_ALIASES = {
+    'bastilla': 'pastilla', 'bastila': 'pastilla', 'bstila': 'pastilla', 'pastila': 'pastilla',
+    'chbakiya': 'chebakia', 'chbakia': 'chebakia', 'chebbakia': 'chebakia', 'chebakiya': 'chebakia',
+    'shebakia': 'chebakia',
+    'tanjia': 'tangia', 'tanjiya': 'tangia', 'tangiya': 'tangia',
+}
+# Query words that stand for several index terms: short dish names and occasions
+QUERY_EXPANSIONS = {
+    'kaab': ('kaab_ghzal',),
+    'ramadan': ('harira', 'chebakia', 'sellou', 'msemen', 'briouate'),
+    'aid': ('kaab_ghzal', 'ghriba', 'fekkas', 'batbout', 'msemen', 'pastilla'),
+    'eid': ('kaab_ghzal', 'ghriba', 'fekkas', 'batbout', 'msemen', 'pastilla'),
+    'festival': ('kaab_ghzal', 'ghriba', 'fekkas', 'batbout', 'msemen', 'pastilla'),
+    'wedding': ('pastilla', 'mechoui', 'mrouzia', 'prune'),
+}
+# --------------------------------
+
+# A trailing "s" is only dropped when the singular is a known ingredient or dish
+FOLD_ROOTS = VALID_INGREDIENTS | MAIN_DISHES
+
+
+def _fingerprint() -> str:
+    tables = [TOKEN_PATTERN, sorted(FOLD_ROOTS), sorted(SINGULAR_MAP.items()), sorted(TERM_ALIASES.items())]
+    return hashlib.sha1(json.dumps(tables).encode("utf-8")).hexdigest()[:8]
+
+
+ANALYZER_ID = f"{ANALYZER_NAME}-v{ANALYZER_VERSION}:{_fingerprint()}"
+
+
+def fold_accents(text: str) -> str:
+    """Lowercase, accents removed after NFD decomposition ("légumes" -> "legumes")"""
+    return "".join(c for c in unicodedata.normalize("NFD", text.lower()) if unicodedata.category(c) != "Mn")
+
+
+@lru_cache(maxsize=65536)
+def fold_word(word: str) -> str:
+    """Plural and spelling folding, memoized (the same few thousand tokens come back everywhere)"""
+    if word in SINGULAR_MAP:
+        return SINGULAR_MAP[word]
+    if word.endswith('s') and len(word) > 3 and (word[:-1] in FOLD_ROOTS or word[:-1] in TERM_ALIASES):
+        word = word[:-1]
+    return TERM_ALIASES.get(word, word)
+
+
+def analyze(text: str) -> List[str]:
+    """Index and query terms of a text, in order"""
+    return [fold_word(token) for token in re.findall(TOKEN_PATTERN, fold_accents(text))]
+
+
+def _compound_terms() -> Dict[Tuple[str, ...], str]:
+    compounds = {}
+    for term in FOLD_ROOTS:
+        parts = tuple(analyze(term))
+        if len(parts) > 1:
+            compounds[parts] = term
+    return compounds
+
+
+# Vocabulary entries spelled in several tokens: ("ras", "el", "hanout") -> "ras-el-hanout"
+COMPOUND_TERMS = _compound_terms()
+MAX_COMPOUND = max((len(parts) for parts in COMPOUND_TERMS), default=1)
+
+
+def compound_terms(tokens: List[str]) -> Set[str]:
+    """Multi-token vocabulary entries found in a sequence of analyzed tokens"""
+    found = set()
+    for i in range(len(tokens)):
+        for size in range(2, MAX_COMPOUND + 1):
+            term = COMPOUND_TERMS.get(tuple(tokens[i:i + size]))
+            if term:
+                found.add(term)
+    return found
+
+
+def expand_query(terms: List[str]) -> List[str]:
+    """Analyzed query terms with QUERY_EXPANSIONS applied (an expansion already in the query is not repeated)"""
+    expanded = []
+    for term in terms:
+        if term in QUERY_EXPANSIONS:
+            expanded.extend(t for t in QUERY_EXPANSIONS[term] if t not in terms and t not in expanded)
+        else:
+            expanded.append(term)
+    return expanded
+
+
+def built_with(data) -> str:
+    """Analyzer id stored in an artifact header (None for artifacts built before the header existed)"""
+    return data.get("analyzer") if isinstance(data, dict) else None
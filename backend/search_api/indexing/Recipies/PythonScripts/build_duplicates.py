@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import zlib
+from collections import defaultdict
+from typing import Dict, Set
+
+import numpy as np
+
+try:
+    from .analyzer import ANALYZER_ID
+    from .build_inverted_index import StrictRecipeIndexer
+except ImportError:
+    from analyzer import ANALYZER_ID
+    from build_inverted_index import StrictRecipeIndexer
+
+# ------------ CONFIG ------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RECIPES_DIR = os.path.join(SCRIPT_DIR, "..", "recipes")
+OUTPUT_FILE = os.path.join(SCRIPT_DIR, "..", "duplicates.json")
+NUM_PERM = 128
+BANDS = 32                  # 32 bands x 4 rows: pairs above ~0.42 Jaccard become candidates
+DUPLICATE_THRESHOLD = 0.8   # Jaccard of extracted term sets for a near-duplicate
+OVERLAP_THRESHOLD = 0.6     # Jaccard reported as a high-overlap pair
+MAX_PAIRWISE_BUCKET = 50    # larger buckets are verified against their first member only
+MERSENNE_PRIME = (1 << 31) - 1
+SEED = 42
+# --------------------------------
+
+
+def recipe_terms(indexer: StrictRecipeIndexer, data: dict) -> Set[str]:
+    """Terms the index builder extracts: ingredients, dishes and title modifiers"""
+    ingredients = indexer.extract_valid_ingredients(" ".join(data.get("ingredients", [])))
+    dishes, modifiers = indexer.extract_main_dishes_and_modifiers(data.get("name", ""))
+    return ingredients | dishes | modifiers
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash signatures with NUM_PERM universal hash functions (a*x + b) mod p"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self.b = rng.integers(0, MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        self.num_perm = num_perm
+
+    def signature(self, terms: Set[str]) -> np.ndarray:
+        hashes = np.array([zlib.crc32(t.encode("utf-8")) % MERSENNE_PRIME for t in sorted(terms)],
+                          dtype=np.int64)
+        return ((self.a * hashes[None, :] + self.b) % MERSENNE_PRIME).min(axis=1)
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, x, y):
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            # The smallest filename stays the root: it becomes the canonical recipe
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+
+def load_term_sets(directory: str) -> Dict[str, Set[str]]:
+    indexer = StrictRecipeIndexer()
+    term_sets = {}
+    for filename in sorted(f for f in os.listdir(directory) if f.endswith(".json")):
+        try:
+            with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                terms = recipe_terms(indexer, json.load(f))
+            if terms:
+                term_sets[filename] = terms
+        except Exception as e:
+            print(f"⚠️ Error on {filename}: {e}")
+    return term_sets
+
+
+def find_near_duplicates(term_sets: Dict[str, Set[str]],
+                         duplicate_threshold: float = DUPLICATE_THRESHOLD,
+                         overlap_threshold: float = OVERLAP_THRESHOLD,
+                         bands: int = BANDS) -> dict:
+    """
+    LSH over MinHash signatures: only recipes sharing a band bucket are compared,
+    so the cost grows with the bucket sizes, not with n^2. Candidates are then
+    checked with the exact Jaccard of their term sets.
+    """
+    hasher = MinHasher()
+    rows = hasher.num_perm // bands
+    buckets = defaultdict(list)
+    for filename, terms in term_sets.items():
+        signature = hasher.signature(terms)
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows].tobytes())].append(filename)
+
+    union_find = UnionFind()
+    pairs = {}
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        if len(members) <= MAX_PAIRWISE_BUCKET:
+            candidates = ((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+        else:
+            candidates = ((members[0], b) for b in members[1:])
+        for a, b in candidates:
+            key = (a, b) if a < b else (b, a)
+            if key in pairs:
+                continue
+            similarity = jaccard(term_sets[a], term_sets[b])
+            pairs[key] = similarity
+            if similarity >= duplicate_threshold:
+                union_find.union(a, b)
+
+    clusters = defaultdict(list)
+    for filename in union_find.parent:
+        clusters[union_find.find(filename)].append(filename)
+    clusters = sorted(sorted(members) for members in clusters.values() if len(members) > 1)
+
+    return {
+        "analyzer": ANALYZER_ID,
+        "duplicate_threshold": duplicate_threshold,
+        "overlap_threshold": overlap_threshold,
+        "clusters": clusters,
+        "canonical": {member: cluster[0] for cluster in clusters for member in cluster[1:]},
+        "pairs": sorted(
+            ([a, b, round(s, 4)] for (a, b), s in pairs.items() if s >= overlap_threshold),
+            key=lambda p: (-p[2], p[0], p[1]),
+        ),
+    }
+
+
+def write_duplicates(report: dict, output_file: str) -> None:
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate clusters and high-overlap pairs")
+    parser.add_argument("-i", "--recipes-dir", default=RECIPES_DIR)
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE)
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD)
+    parser.add_argument("--overlap", type=float, default=OVERLAP_THRESHOLD)
+    args = parser.parse_args()
+
+    report = find_near_duplicates(load_term_sets(args.recipes_dir), args.threshold, args.overlap)
+    write_duplicates(report, args.output)
+    print(f"✅ {len(report['clusters'])} near-duplicate clusters, {len(report['pairs'])} "
+          f"high-overlap pairs written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
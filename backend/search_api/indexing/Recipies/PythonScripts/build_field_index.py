@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+try:
+    from .analyzer import ANALYZER_ID, analyze
+except ImportError:
+    from analyzer import ANALYZER_ID, analyze
+
+# ------------ CONFIG ------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RECIPES_DIR = os.path.join(SCRIPT_DIR, "..", "recipes")
+OUTPUT_FILE = os.path.join(SCRIPT_DIR, "..", "field_index.json")
+SHARDS_DIR = os.path.join(SCRIPT_DIR, "..", "field_shards")
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+FIELDS = ("title", "ingredients", "steps")
+# Function words and measures: frequent everywhere, never useful alone
+STOP_WORDS = {
+    "a", "an", "and", "or", "the", "of", "in", "on", "to", "for", "with", "into", "at", "by", "from",
+    "it", "its", "them", "then", "until", "about", "as", "is", "be", "if", "your", "you",
+    "g", "kg", "ml", "cl", "l", "tsp", "tbsp", "cup", "cups", "pinch", "tablespoon", "teaspoon",
+}
+# --------------------------------
+
+
+def recipe_fields(data: dict) -> Dict[str, List[str]]:
+    """Tokens of each field; numbers and stop words are left out"""
+    texts = {
+        "title": [data.get("name", "")],
+        "ingredients": data.get("ingredients", []),
+        "steps": data.get("steps", []),
+    }
+    return {
+        field: [t for line in lines for t in analyze(line) if t not in STOP_WORDS and not t.isdigit()]
+        for field, lines in texts.items()
+    }
+
+
+def build_field_index(directory: str, filenames: Optional[List[str]] = None) -> dict:
+    """
+    Per-field term frequencies and field lengths, over all recipes of the
+    directory or only over 'filenames' (one shard).
+    postings: {term: {field: [doc_gap, tf, doc_gap, tf, ...]}}, document ids
+    (indexes in "documents", sorted by filename) delta-encoded per field.
+    lengths: {field: [tokens per document]}, used for length normalisation.
+    """
+    documents = []
+    lengths = {field: [] for field in FIELDS}
+    postings: Dict[str, Dict[str, List[int]]] = {}
+    last_doc: Dict[tuple, int] = {}
+
+    if filenames is None:
+        filenames = [f for f in os.listdir(directory) if f.endswith(".json")]
+    for filename in sorted(filenames):
+        try:
+            with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                fields = recipe_fields(json.load(f))
+        except Exception as e:
+            print(f"⚠️ Error on {filename}: {e}")
+            continue
+        doc_id = len(documents)
+        documents.append(filename)
+        for field in FIELDS:
+            tokens = fields[field]
+            lengths[field].append(len(tokens))
+            for term, tf in sorted(Counter(tokens).items()):
+                encoded = postings.setdefault(term, {}).setdefault(field, [])
+                encoded.extend((doc_id - last_doc.get((term, field), 0), tf))
+                last_doc[(term, field)] = doc_id
+
+    return {
+        "version": FORMAT_VERSION,
+        "analyzer": ANALYZER_ID,
+        "fields": list(FIELDS),
+        "documents": documents,
+        "lengths": lengths,
+        "postings": {term: postings[term] for term in sorted(postings)},
+    }
+
+
+def write_field_index(index: dict, output_file: str) -> None:
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def shard_of(filename: str, shards: int) -> int:
+    """Shard of a recipe: CRC32 of its filename (stable across runs and machines, unlike hash())"""
+    return zlib.crc32(filename.encode("utf-8")) % shards
+
+
+def build_shard(directory: str, filenames: List[str], output_file: str) -> dict:
+    """
+    Builds and writes one shard; returns only what the manifest needs:
+    recipe count, summed field lengths and document frequency of each term.
+    """
+    index = build_field_index(directory, filenames)
+    write_field_index(index, output_file)
+    df = {}
+    for term, term_postings in index["postings"].items():
+        docs = set()
+        for encoded in term_postings.values():
+            doc = 0
+            for gap in encoded[0::2]:
+                doc += gap
+                docs.add(doc)
+        df[term] = len(docs)
+    return {
+        "documents": len(index["documents"]),
+        "length_sums": {field: sum(index["lengths"][field]) for field in FIELDS},
+        "df": df,
+    }
+
+
+def build_field_shards(directory: str, output_dir: str, shards: int, workers: Optional[int] = None) -> dict:
+    """
+    Partitions the recipes into 'shards' by filename hash and builds the shards
+    in parallel (one process per shard, at most 'workers' at a time).
+    Each shard is a regular field index; manifest.json holds the collection-wide
+    statistics (recipe count, average field lengths, df) every shard scores with,
+    so sharded scores are those of the single index.
+    """
+    groups = [[] for _ in range(shards)]
+    for filename in os.listdir(directory):
+        if filename.endswith(".json"):
+            groups[shard_of(filename, shards)].append(filename)
+
+    os.makedirs(output_dir, exist_ok=True)
+    shard_files = [f"shard-{i:03d}.json" for i in range(shards)]
+    with ProcessPoolExecutor(max_workers=workers or min(shards, os.cpu_count() or 1)) as pool:
+        stats = list(pool.map(
+            build_shard,
+            [directory] * shards,
+            groups,
+            [os.path.join(output_dir, name) for name in shard_files],
+        ))
+
+    n_docs = sum(s["documents"] for s in stats)
+    df = Counter()
+    for s in stats:
+        df.update(s["df"])
+    manifest = {
+        "version": FORMAT_VERSION,
+        "analyzer": ANALYZER_ID,
+        "fields": list(FIELDS),
+        "shards": shard_files,
+        "documents": n_docs,
+        "average_lengths": {
+            field: sum(s["length_sums"][field] for s in stats) / n_docs if n_docs else 0.0 for field in FIELDS
+        },
+        "df": {term: df[term] for term in sorted(df)},
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-field (title / ingredients / steps) full-text index")
+    parser.add_argument("-i", "--recipes-dir", default=RECIPES_DIR)
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE)
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Number of shards written to --shards-dir (0 = single index in --output)")
+    parser.add_argument("--shards-dir", default=SHARDS_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="Build processes (default: one per core)")
+    args = parser.parse_args()
+
+    if args.shards > 0:
+        manifest = build_field_shards(args.recipes_dir, args.shards_dir, args.shards, args.workers)
+        print(f"✅ {len(manifest['df'])} terms over {manifest['documents']} recipes in "
+              f"{len(manifest['shards'])} shards written to '{args.shards_dir}'")
+        return
+
+    index = build_field_index(args.recipes_dir)
+    write_field_index(index, args.output)
+    print(f"✅ {len(index['postings'])} terms, {len(index['fields'])} fields over "
+          f"{len(index['documents'])} recipes written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
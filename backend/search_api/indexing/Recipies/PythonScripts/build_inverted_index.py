@@ -1,75 +1,59 @@
 import json
 import os
 import re
+import shutil
 from typing import Dict, List, Set, Tuple
 
+try:
+    from .analyzer import (
+        ANALYZER_ID, MAIN_DISHES, SINGULAR_MAP, VALID_INGREDIENTS, analyze, compound_terms, fold_accents,
+        fold_word,
+    )
+except ImportError:
+    from analyzer import (
+        ANALYZER_ID, MAIN_DISHES, SINGULAR_MAP, VALID_INGREDIENTS, analyze, compound_terms, fold_accents,
+        fold_word,
+    )
+
+INDEX_FORMAT_VERSION = 2
+
+
 class StrictRecipeIndexer:
     def __init__(self):
-        # --- LISTES (Identiques à la version anglaise précédente) ---
-        self.valid_ingredients = {
-            'chicken', 'lamb', 'beef', 'meat', 'fish', 'tuna', 'shrimp', 'prawn', 'veal', 
-            'turkey', 'calamari', 'sardine', 'liver', 'brain', 'tripe', 'mutton', 'head', 'feet', 'khlii',
-            'onion', 'garlic', 'tomato', 'potato', 'carrot', 'zucchini', 'olive', 'aubergine',
-            'pepper', 'chili', 'prune', 'lemon', 'orange', 'raisin', 'almond', 'date',
-            'mint', 'parsley', 'cilantro', 'ginger', 'cumin', 'paprika', 'turmeric', 'saffron', 
-            'cinnamon', 'harissa', 'ras-el-hanout', 'anise', 'fennel',
-            'couscous', 'semolina', 'fava', 'chickpea', 'lentil', 'rice', 'flour', 'wheat', 'barley',
-            'bread', 'yeast', 'egg', 'cheese', 'butter', 'oil', 'smen', 'broth', 'stock', 'honey', 
-            'sugar', 'milk', 'cream', 'coco', 'vinegar', 'pickle', 'merguez', 'kefta', 'dates'
-        }
-        self.main_dishes = {
-            'tajine', 'tagine', 'couscous', 'pastilla', 'harira', 'briouate', 
-            'rfissa', 'tangia', 'kefta', 'zaalouk', 'msemen', 'chebakia', 
-            'bissara', 'mechoui', 'sellou', 'mint_tea', 'batbout', 'khobz', 
-            'harcha', 'baghrir', 'rghaif', 'mlaoui', 'seffa', 'mrouzia', 
-            'chorba', 'loubia', 'taktouka', 'salad', 'fekkas', 'ghriba', 
-            'kaab_ghzal', 'makrout', 'halwa', 'soup', 'chermoula'
-        }
-        self.singular_map = {
-            'tomatoes': 'tomato', 'potatoes': 'potato', 'olives': 'olive', 
-            'eggs': 'egg', 'chickpeas': 'chickpea', 'lentils': 'lentil', 
-            'prunes': 'prune', 'raisins': 'raisin', 'almonds': 'almond',
-            'sardines': 'sardine', 'dates': 'date', 'shrimps': 'shrimp', 
-            'favas': 'fava'
-        }
-
-    # --- MÉTHODES D'EXTRACTION (Identiques) ---
+        # --- LISTES : définies dans analyzer.py (le pliage des pluriels en dépend) ---
+        self.valid_ingredients = set(VALID_INGREDIENTS)
+        self.main_dishes = set(MAIN_DISHES)
+        self.singular_map = dict(SINGULAR_MAP)
+
+    # --- MÉTHODES D'EXTRACTION (chaîne d'analyse partagée) ---
     def normalize_word(self, word: str) -> str:
-        word = word.lower().strip()
-        word = re.sub(r'[^a-z0-9\s-]', '', word)
-        if word in self.singular_map:
-            return self.singular_map[word]
-        if word.endswith('s') and len(word) > 3:
-            root_word = word[:-1] 
-            if root_word in self.valid_ingredients.union(self.main_dishes):
-                return root_word
-        return word
+        word = re.sub(r'[^a-z0-9\s-]', '', fold_accents(word).strip())
+        return fold_word(word)
 
     def extract_valid_ingredients(self, text: str) -> Set[str]:
         found = set()
         stop_words_local = {'moroccan', 'morocco', 'cups', 'spoons', 'tsp', 'tbsp', 'kg', 'g', 'oz', 'of', 'and', 'the', 'in', 'to', 'for', 'with'}
-        words = re.sub(r'[^a-z0-9\s-]', ' ', text.lower()).split()
+        words = analyze(text)
         for w in words:
             if w in stop_words_local:
                 continue
-            clean_w = self.normalize_word(w)
-            if clean_w in self.valid_ingredients:
-                found.add(clean_w)
+            if w in self.valid_ingredients:
+                found.add(w)
+        found.update(t for t in compound_terms(words) if t in self.valid_ingredients)
         return found
         
     def extract_main_dishes_and_modifiers(self, recipe_name: str) -> Tuple[Set[str], Set[str]]:
         found_dishes = set()
         found_modifiers = set()
-        words = re.sub(r'[^a-z0-9\s-]', ' ', recipe_name.lower()).split()
+        words = analyze(recipe_name)
         stop_words_title = {'moroccan', 'style', 'traditional', 'and', 'with', 'in', 'of', 'a', 'the', 'at'}
-        for w in words:
+        for w in words + sorted(compound_terms(words)):
             if w in stop_words_title:
                 continue
-            clean_w = self.normalize_word(w)
-            if clean_w in self.main_dishes:
-                found_dishes.add(clean_w)
-            elif clean_w in self.valid_ingredients:
-                found_modifiers.add(clean_w)
+            if w in self.main_dishes:
+                found_dishes.add(w)
+            elif w in self.valid_ingredients:
+                found_modifiers.add(w)
         return found_dishes, found_modifiers
 
     # --- MÉTHODE PRINCIPALE DE CONSTRUCTION ---
@@ -119,28 +103,154 @@ class StrictRecipeIndexer:
             
         return sorted_index
 
+def write_inverted_index(index: Dict[str, List[str]], output_file: str) -> None:
+    """Écrit l'index avec son en-tête : {"version", "analyzer", "terms": {terme: [fichiers]}}"""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({"version": INDEX_FORMAT_VERSION, "analyzer": ANALYZER_ID, "terms": index},
+                  f, indent=2, ensure_ascii=False)
+
+
+def index_terms(data) -> Dict[str, List[str]]:
+    """{terme: [fichiers]} d'un index chargé, avec ou sans en-tête (ancien format : le dict seul)"""
+    if isinstance(data, dict) and isinstance(data.get("terms"), dict):
+        return data["terms"]
+    return data if isinstance(data, dict) else {}
+
+
 # --- LANCEMENT ---
-if __name__ == "__main__":
-    RECIPES_DIR = "C:/Users/j\Desktop/📦 smart-moroccan-cuisine/backend/search_api/indexing/Recipies/recipes"
-    OUTPUT_FILE = "inverted_index_final.json"
-    
+def main():
+    import argparse
+
+    try:
+        from .build_duplicates import DUPLICATE_THRESHOLD
+        from .build_similar_recipes import DEFAULT_TOP_K
+        from .snapshots import DEFAULT_KEEP, begin_snapshot, commit_snapshot, prune
+    except ImportError:
+        from build_duplicates import DUPLICATE_THRESHOLD
+        from build_similar_recipes import DEFAULT_TOP_K
+        from snapshots import DEFAULT_KEEP, begin_snapshot, commit_snapshot, prune
+
+    base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    parser = argparse.ArgumentParser(description="Construit l'index inversé et la table des recettes similaires")
+    parser.add_argument("-i", "--recipes-dir", default=os.path.join(base_dir, "recipes"))
+    parser.add_argument("-o", "--output-dir", default=base_dir)
+    parser.add_argument("--index", default="inverted_index.json")
+    parser.add_argument("--similar", default="similar_recipes.json")
+    parser.add_argument("--similar-k", type=int, default=DEFAULT_TOP_K,
+                        help="Voisins TF-IDF précalculés par recette (0 = pas de table)")
+    parser.add_argument("--duplicates", default="duplicates.json")
+    parser.add_argument("--dup-threshold", type=float, default=DUPLICATE_THRESHOLD,
+                        help="Jaccard minimal entre termes extraits pour un quasi-doublon (0 = pas de détection)")
+    parser.add_argument("--positional", default="positional_index.json",
+                        help="Index positionnel pour les requêtes d'expression (vide = pas d'index)")
+    parser.add_argument("--fields", default="field_index.json",
+                        help="Index plein texte titre / ingrédients / étapes (vide = pas d'index)")
+    parser.add_argument("--field-shards", type=int, default=0,
+                        help="Index multi-champs aussi réparti en N shards dans field_shards/ (0 = pas de shards)")
+    parser.add_argument("--stats", default="term_statistics.json",
+                        help="Statistiques par terme (vide = pas de fichier)")
+    parser.add_argument("--docs", default="document_metadata.json",
+                        help="Titre et longueurs par recette (écrit avec --stats)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Écrit dans un nouveau snapshots/<version>/ puis bascule le lien 'current' (atomique)")
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP,
+                        help="Snapshots conservés pour le retour arrière (avec --snapshot)")
+    args = parser.parse_args()
+
     indexer = StrictRecipeIndexer()
-    final_index = indexer.build_index(RECIPES_DIR)
-    
-    if final_index:
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(final_index, f, indent=2, ensure_ascii=False)
-            
-        print(f"\n✅ Index inversé généré avec succès dans '{OUTPUT_FILE}'")
-        print(f"Nombre de termes indexés : {len(final_index)}")
-        
-        # Test de l'indexation par plat (tagine) et par ingrédient (chicken)
-        print("\n--- TEST DE L'INDEXATION CORRIGÉE ---")
+    final_index = indexer.build_index(args.recipes_dir)
+    if not final_index:
+        return
+    if not args.snapshot:
+        write_artifacts(args, final_index)
+        return
+
+    # Les serveurs lisent 'current' : rien n'est visible avant que tout le snapshot soit écrit
+    snapshot_root = args.output_dir
+    args.output_dir = begin_snapshot(snapshot_root)
+    try:
+        write_artifacts(args, final_index)
+    except BaseException:
+        shutil.rmtree(args.output_dir, ignore_errors=True)
+        raise
+    version = commit_snapshot(snapshot_root, args.output_dir, os.listdir(args.output_dir))
+    removed = prune(snapshot_root, args.keep)
+    print(f"\n🔀 Snapshot {version} publié ('current'), {len(removed)} ancien(s) supprimé(s)")
+
+
+def write_artifacts(args, final_index):
+    """Écrit l'index inversé et les artefacts dérivés dans args.output_dir"""
+    try:
+        from .build_duplicates import find_near_duplicates, load_term_sets, write_duplicates
+        from .build_field_index import build_field_index, build_field_shards, write_field_index
+        from .build_positional_index import build_positional_index, write_positional_index
+        from .build_similar_recipes import build_similarity_table, write_similarity_table
+        from .build_term_statistics import build_term_statistics, write_json
+    except ImportError:
+        from build_duplicates import find_near_duplicates, load_term_sets, write_duplicates
+        from build_field_index import build_field_index, build_field_shards, write_field_index
+        from build_positional_index import build_positional_index, write_positional_index
+        from build_similar_recipes import build_similarity_table, write_similarity_table
+        from build_term_statistics import build_term_statistics, write_json
+
+    index_file = os.path.join(args.output_dir, args.index)
+    write_inverted_index(final_index, index_file)
         
-        tagine_key = 'tagine'
-        if tagine_key in final_index:
-            print(f"🍽️ {tagine_key} (Type de Plat) trouvé dans {len(final_index[tagine_key])} recettes.")
+    print(f"\n✅ Index inversé généré avec succès dans '{index_file}' (analyseur {ANALYZER_ID})")
+    print(f"Nombre de termes indexés : {len(final_index)}")
+    
+    # Test de l'indexation par plat (tagine) et par ingrédient (chicken)
+    print("\n--- TEST DE L'INDEXATION CORRIGÉE ---")
+    
+    tagine_key = 'tagine'
+    if tagine_key in final_index:
+        print(f"🍽️ {tagine_key} (Type de Plat) trouvé dans {len(final_index[tagine_key])} recettes.")
+
+    chicken_key = 'chicken'
+    if chicken_key in final_index:
+        print(f"🐔 {chicken_key} (Ingrédient) trouvé dans {len(final_index[chicken_key])} recettes.")
 
-        chicken_key = 'chicken'
-        if chicken_key in final_index:
-            print(f"🐔 {chicken_key} (Ingrédient) trouvé dans {len(final_index[chicken_key])} recettes.")
\ No newline at end of file
+    # Table des voisins TF-IDF, stockée à côté de l'index
+    if args.similar_k > 0:
+        similar_file = os.path.join(args.output_dir, args.similar)
+        table = build_similarity_table(args.recipes_dir, args.similar_k)
+        write_similarity_table(table, similar_file, args.similar_k)
+        print(f"🔗 Top {args.similar_k} recettes similaires de {len(table)} recettes dans '{similar_file}'")
+
+    # Groupes de quasi-doublons (MinHash/LSH), utilisés pour dédoublonner le top-5
+    if args.dup_threshold > 0:
+        duplicates_file = os.path.join(args.output_dir, args.duplicates)
+        report = find_near_duplicates(load_term_sets(args.recipes_dir), args.dup_threshold)
+        write_duplicates(report, duplicates_file)
+        print(f"🧬 {len(report['clusters'])} groupes de quasi-doublons dans '{duplicates_file}'")
+
+    # Index positionnel (positions delta-encodées) pour les requêtes d'expression et de proximité
+    if args.positional:
+        positional_file = os.path.join(args.output_dir, args.positional)
+        positional = build_positional_index(args.recipes_dir)
+        write_positional_index(positional, positional_file)
+        print(f"📍 Index positionnel de {len(positional['postings'])} termes dans '{positional_file}'")
+
+    # Index plein texte par champ (titre, ingrédients, étapes) pour fulltext-search/
+    if args.fields:
+        fields_file = os.path.join(args.output_dir, args.fields)
+        field_index = build_field_index(args.recipes_dir)
+        write_field_index(field_index, fields_file)
+        print(f"🗂️ Index multi-champs de {len(field_index['postings'])} termes dans '{fields_file}'")
+
+    # Shards de l'index multi-champs, construits en parallèle (un processus par shard)
+    if args.field_shards > 0:
+        shards_dir = os.path.join(args.output_dir, "field_shards")
+        manifest = build_field_shards(args.recipes_dir, shards_dir, args.field_shards)
+        print(f"🧩 {len(manifest['shards'])} shards de l'index multi-champs dans '{shards_dir}'")
+
+    # Statistiques des termes et métadonnées des recettes, même analyseur que les index
+    if args.stats:
+        statistics, metadata = build_term_statistics(args.recipes_dir)
+        write_json(statistics, os.path.join(args.output_dir, args.stats))
+        write_json(metadata, os.path.join(args.output_dir, args.docs))
+        print(f"📊 Statistiques de {statistics['total_unique_terms']} termes dans '{args.stats}' et '{args.docs}'")
+
+
+if __name__ == "__main__":
+    main()
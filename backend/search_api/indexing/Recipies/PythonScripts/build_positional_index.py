@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+from typing import Dict, List
+
+try:
+    from .analyzer import ANALYZER_ID, analyze
+except ImportError:
+    from analyzer import ANALYZER_ID, analyze
+
+# ------------ CONFIG ------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RECIPES_DIR = os.path.join(SCRIPT_DIR, "..", "recipes")
+OUTPUT_FILE = os.path.join(SCRIPT_DIR, "..", "positional_index.json")
+FORMAT_VERSION = 1
+# Positions skipped between two lines (title, each ingredient, each step):
+# a phrase or a proximity window never spans two lines
+LINE_GAP = 16
+# --------------------------------
+
+
+def recipe_lines(data: dict) -> List[str]:
+    return [data.get("name", "")] + data.get("ingredients", []) + data.get("steps", [])
+
+
+def document_positions(lines: List[str]) -> Dict[str, List[int]]:
+    """term -> increasing positions in the document"""
+    positions, position = {}, 0
+    for line in lines:
+        for token in analyze(line):
+            positions.setdefault(token, []).append(position)
+            position += 1
+        position += LINE_GAP
+    return positions
+
+
+def build_positional_index(directory: str) -> dict:
+    """
+    Positional postings, delta-encoded. Each term maps to one flat list of ints:
+        [doc_gap, tf, pos_gap_1, ..., pos_gap_tf, doc_gap, tf, ...]
+    doc_gap is the gap between document ids (indexes in "documents", sorted by
+    filename). pos_gap_1 is the first position; later gaps are relative to the
+    previous position.
+    """
+    filenames = sorted(f for f in os.listdir(directory) if f.endswith(".json"))
+    documents, postings, last_doc = [], {}, {}
+    for filename in filenames:
+        try:
+            with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                positions = document_positions(recipe_lines(json.load(f)))
+        except Exception as e:
+            print(f"⚠️ Error on {filename}: {e}")
+            continue
+        doc_id = len(documents)
+        documents.append(filename)
+        for term, term_positions in positions.items():
+            encoded = postings.setdefault(term, [])
+            encoded.append(doc_id - last_doc.get(term, 0))
+            encoded.append(len(term_positions))
+            previous = 0
+            for position in term_positions:
+                encoded.append(position - previous)
+                previous = position
+            last_doc[term] = doc_id
+
+    return {
+        "version": FORMAT_VERSION,
+        "analyzer": ANALYZER_ID,
+        "line_gap": LINE_GAP,
+        "documents": documents,
+        "postings": {term: postings[term] for term in sorted(postings)},
+    }
+
+
+def write_positional_index(index: dict, output_file: str) -> None:
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-encoded positional index for phrase and proximity queries")
+    parser.add_argument("-i", "--recipes-dir", default=RECIPES_DIR)
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    index = build_positional_index(args.recipes_dir)
+    write_positional_index(index, args.output)
+    print(f"✅ {len(index['postings'])} terms over {len(index['documents'])} recipes written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
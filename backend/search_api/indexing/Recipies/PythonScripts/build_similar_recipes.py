@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# ------------ CONFIG ------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RECIPES_DIR = os.path.join(SCRIPT_DIR, "..", "recipes")
+OUTPUT_FILE = os.path.join(SCRIPT_DIR, "..", "similar_recipes.json")
+DEFAULT_TOP_K = 10
+# Similarity rows computed at once: keeps the dense block around 32 MB on large corpora
+BLOCK_CELLS = 4_000_000
+# --------------------------------
+
+
+def recipe_text(data: dict) -> str:
+    """Title, ingredients and steps of a recipe as one document"""
+    return " ".join([data.get("name", "")] + data.get("ingredients", []) + data.get("steps", []))
+
+
+def load_documents(directory: str) -> Tuple[List[str], List[str]]:
+    """Returns (filenames, texts) sorted by filename"""
+    filenames, texts = [], []
+    for filename in sorted(f for f in os.listdir(directory) if f.endswith(".json")):
+        try:
+            with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                texts.append(recipe_text(json.load(f)))
+            filenames.append(filename)
+        except Exception as e:
+            print(f"⚠️ Error on {filename}: {e}")
+    return filenames, texts
+
+
+def build_similarity_table(directory: str, top_k: int = DEFAULT_TOP_K) -> Dict[str, List[List]]:
+    """
+    TF-IDF vectors over title + ingredients + steps, then the top_k nearest
+    neighbours (cosine similarity) of every recipe: {filename: [[filename, score], ...]}.
+    Ties are broken by filename so the table is reproducible.
+    """
+    filenames, texts = load_documents(directory)
+    if len(filenames) < 2:
+        return {filename: [] for filename in filenames}
+
+    vectorizer = TfidfVectorizer(
+        strip_accents="unicode",
+        lowercase=True,
+        stop_words="english",
+        token_pattern=r"(?u)\b[a-z][a-z]+\b",
+        sublinear_tf=True,
+    )
+    # Rows are L2-normalised: the dot product is the cosine similarity
+    vectors = vectorizer.fit_transform(texts)
+    n = len(filenames)
+    k = min(top_k, n - 1)
+    block = max(1, min(1024, BLOCK_CELLS // n))
+
+    table = {}
+    for start in range(0, n, block):
+        stop = min(n, start + block)
+        scores = (vectors[start:stop] @ vectors.T).toarray()
+        scores[np.arange(stop - start), np.arange(start, stop)] = -1.0  # a recipe is not its own neighbour
+
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for row, columns in enumerate(candidates):
+            threshold = scores[row, columns].min()
+            # Keep every candidate tied with the k-th score, then order by (-score, filename)
+            tied = np.flatnonzero(scores[row] >= threshold if threshold > 0 else scores[row] > 0)
+            order = np.lexsort((tied, -scores[row, tied]))[:k]
+            table[filenames[start + row]] = [
+                [filenames[col], round(float(scores[row, col]), 4)]
+                for col in tied[order] if scores[row, col] > 0
+            ]
+    return table
+
+
+def write_similarity_table(table: Dict[str, List[List]], output_file: str, top_k: int) -> None:
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({"top_k": top_k, "similar": table}, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputed TF-IDF nearest-neighbour table")
+    parser.add_argument("-i", "--recipes-dir", default=RECIPES_DIR)
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE)
+    parser.add_argument("-k", "--top-k", type=int, default=DEFAULT_TOP_K)
+    args = parser.parse_args()
+
+    table = build_similarity_table(args.recipes_dir, args.top_k)
+    write_similarity_table(table, args.output, args.top_k)
+    print(f"✅ {len(table)} recipes, top {args.top_k} neighbours written to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
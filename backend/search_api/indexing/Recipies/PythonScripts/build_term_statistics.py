@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+from collections import Counter
+from typing import Tuple
+
+try:
+    from .analyzer import ANALYZER_ID
+    from .build_field_index import FIELDS, recipe_fields
+except ImportError:
+    from analyzer import ANALYZER_ID
+    from build_field_index import FIELDS, recipe_fields
+
+# ------------ CONFIG ------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RECIPES_DIR = os.path.join(SCRIPT_DIR, "..", "recipes")
+STATS_FILE = os.path.join(SCRIPT_DIR, "..", "term_statistics.json")
+DOCS_FILE = os.path.join(SCRIPT_DIR, "..", "document_metadata.json")
+FORMAT_VERSION = 1
+# --------------------------------
+
+
+def build_term_statistics(directory: str) -> Tuple[dict, dict]:
+    """
+    Corpus statistics over the same terms as field_index.json (shared analyzer,
+    stop words and numbers left out). Returns (term statistics, document metadata).
+    """
+    df, cf, ingredient_cf = Counter(), Counter(), Counter()
+    documents, malformed = {}, []
+
+    for filename in sorted(f for f in os.listdir(directory) if f.endswith(".json")):
+        try:
+            with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            fields = recipe_fields(data)
+        except Exception as e:
+            print(f"⚠️ Error on {filename}: {e}")
+            malformed.append(filename)
+            continue
+        tokens = [term for field in FIELDS for term in fields[field]]
+        df.update(set(tokens))
+        cf.update(tokens)
+        ingredient_cf.update(fields["ingredients"])
+        documents[filename] = {
+            "title": data.get("name", ""),
+            "length": len(tokens),
+            "fields": {field: len(fields[field]) for field in FIELDS},
+        }
+
+    statistics = {
+        "version": FORMAT_VERSION,
+        "analyzer": ANALYZER_ID,
+        "total_unique_terms": len(cf),
+        "top_20_terms": [{"term": t, "count": c} for t, c in cf.most_common(20)],
+        "top_10_ingredients": [{"term": t, "count": c} for t, c in ingredient_cf.most_common(10)],
+        "average_tokens_per_recipe": sum(cf.values()) / len(documents) if documents else 0.0,
+        "malformed_files": malformed,
+        "terms": {term: {"df": df[term], "cf": cf[term]} for term in sorted(cf)},
+    }
+    metadata = {"version": FORMAT_VERSION, "analyzer": ANALYZER_ID, "documents": documents}
+    return statistics, metadata
+
+
+def write_json(data: dict, output_file: str) -> None:
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Term statistics and per-document metadata")
+    parser.add_argument("-i", "--recipes-dir", default=RECIPES_DIR)
+    parser.add_argument("--stats", default=STATS_FILE)
+    parser.add_argument("--docs", default=DOCS_FILE)
+    args = parser.parse_args()
+
+    statistics, metadata = build_term_statistics(args.recipes_dir)
+    write_json(statistics, args.stats)
+    write_json(metadata, args.docs)
+    print(f"✅ {statistics['total_unique_terms']} terms over {len(metadata['documents'])} recipes "
+          f"written to '{args.stats}' and '{args.docs}'")
+
+
+if __name__ == "__main__":
+    main()
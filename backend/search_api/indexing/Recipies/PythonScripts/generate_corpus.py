@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+import random
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List
+
+try:
+    from .build_inverted_index import StrictRecipeIndexer
+    from .split_recipes import clean_filename
+except ImportError:
+    from build_inverted_index import StrictRecipeIndexer
+    from split_recipes import clean_filename
+
+# ------------ CONFIG ------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RECIPES_DIR = os.path.join(SCRIPT_DIR, "..", "recipes")  # real corpus used as a model
+DEFAULT_SEED = 42
+# --------------------------------
+
+SMALL_QUANTITIES = ["1/2", "1", "2", "3", "4", "6"]      # pieces, spoons, cups
+LARGE_QUANTITIES = ["100", "150", "200", "250", "500", "750"]  # grams, ml
+QUANTITY_PREFIX = re.compile(r"^\d+(?:[/.,]\d+)?")
+
+
+class RecipeCorpusGenerator:
+    """
+    Generates synthetic recipes in the schema of recipes/*.json
+    (name, image, ingredients, steps, references).
+
+    Distributions are learned from the real corpus: dish and title modifier
+    frequencies, ingredient document frequencies, list lengths, and the
+    ingredient lines / steps themselves. The same seed always yields the
+    same corpus.
+    """
+
+    def __init__(self, recipes_dir: str = RECIPES_DIR, seed: int = DEFAULT_SEED):
+        self.indexer = StrictRecipeIndexer()
+        self.rng = random.Random(seed)
+        self.templates = self._load_templates(recipes_dir)
+        self._learn_distributions()
+
+    # --- APPRENTISSAGE ---
+    def _load_templates(self, recipes_dir: str) -> List[Dict]:
+        templates = []
+        for filename in sorted(os.listdir(recipes_dir)):
+            if not filename.endswith(".json"):
+                continue
+            with open(os.path.join(recipes_dir, filename), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            dishes, modifiers = self.indexer.extract_main_dishes_and_modifiers(data.get("name", ""))
+            templates.append({
+                "name": data.get("name", ""),
+                "image": data.get("image", ""),
+                "ingredients": list(data.get("ingredients", [])),
+                "steps": list(data.get("steps", [])),
+                "references": list(data.get("references", [])),
+                "dishes": sorted(dishes),
+                "modifiers": sorted(modifiers),
+            })
+        if not templates:
+            raise ValueError(f"No recipe found in '{recipes_dir}'")
+        return templates
+
+    def _learn_distributions(self):
+        dish_counts = Counter()
+        modifier_counts = Counter()
+        style_counts = Counter()
+        ingredient_df = Counter()
+        self.lines_by_ingredient = defaultdict(list)
+        self.templates_by_dish = defaultdict(list)
+        self.all_steps = []
+
+        vocabulary = self.indexer.valid_ingredients | self.indexer.main_dishes
+        for template in self.templates:
+            dish_counts.update(template["dishes"])
+            modifier_counts.update(template["modifiers"])
+            for dish in template["dishes"]:
+                self.templates_by_dish[dish].append(template)
+            for word in re.sub(r"[^a-z\s]", " ", template["name"].lower()).split():
+                if len(word) > 3 and self.indexer.normalize_word(word) not in vocabulary:
+                    style_counts[word] += 1
+            ingredient_df.update(self.indexer.extract_valid_ingredients(" ".join(template["ingredients"])))
+            for line in template["ingredients"]:
+                for ingredient in self.indexer.extract_valid_ingredients(line):
+                    self.lines_by_ingredient[ingredient].append(line)
+            self.all_steps.extend(template["steps"])
+
+        # Lissage (+1) : chaque plat et ingrédient du vocabulaire reste atteignable
+        self.dishes = sorted(self.indexer.main_dishes)
+        self.dish_weights = [dish_counts[d] + 1 for d in self.dishes]
+        self.modifiers = sorted(self.indexer.valid_ingredients)
+        self.modifier_weights = [modifier_counts[m] + 1 for m in self.modifiers]
+        self.styles = sorted(style_counts)
+        self.style_weights = [style_counts[s] for s in self.styles]
+        self.ingredients = sorted(i for i in self.lines_by_ingredient)
+        self.ingredient_weights = [ingredient_df[i] + 1 for i in self.ingredients]
+        self.ingredient_lengths = [len(t["ingredients"]) for t in self.templates]
+        self.step_lengths = [len(t["steps"]) for t in self.templates]
+
+    # --- GÉNÉRATION ---
+    def _make_name(self, dish: str, modifier: str) -> str:
+        dish = dish.replace("_", " ")
+        pattern = self.rng.random()
+        if pattern < 0.35:
+            return f"{modifier} {dish}"
+        if pattern < 0.6:
+            return f"{dish} with {modifier}"
+        if pattern < 0.8 and self.styles:
+            return f"{self.rng.choices(self.styles, self.style_weights)[0]} {dish}"
+        return dish
+
+    def _vary_quantity(self, line: str) -> str:
+        # Seul le nombre initial change : l'unité d'origine reste cohérente
+        match = QUANTITY_PREFIX.match(line)
+        if not match or self.rng.random() < 0.5:
+            return line
+        quantities = LARGE_QUANTITIES if match.group().isdigit() and int(match.group()) >= 50 else SMALL_QUANTITIES
+        return self.rng.choice(quantities) + line[match.end():]
+
+    def generate_one(self) -> Dict:
+        dish = self.rng.choices(self.dishes, self.dish_weights)[0]
+        modifier = self.rng.choices(self.modifiers, self.modifier_weights)[0]
+        template = self.rng.choice(self.templates_by_dish.get(dish) or self.templates)
+
+        target_ingredients = self.rng.choice(self.ingredient_lengths)
+        ingredients = [self._vary_quantity(l) for l in template["ingredients"] if self.rng.random() < 0.85]
+        if modifier in self.lines_by_ingredient:
+            ingredients.append(self.rng.choice(self.lines_by_ingredient[modifier]))
+        while len(ingredients) < target_ingredients:
+            extra = self.rng.choices(self.ingredients, self.ingredient_weights)[0]
+            ingredients.append(self._vary_quantity(self.rng.choice(self.lines_by_ingredient[extra])))
+
+        steps = [s for s in template["steps"] if self.rng.random() < 0.9]
+        target_steps = self.rng.choice(self.step_lengths)
+        while len(steps) < target_steps:
+            steps.append(self.rng.choice(self.all_steps))
+
+        return {
+            "name": self._make_name(dish, modifier),
+            "image": template["image"],
+            "ingredients": ingredients,
+            "steps": steps,
+            "references": template["references"] if self.rng.random() < 0.5 else [],
+        }
+
+    def generate(self, count: int) -> Iterator[Dict]:
+        for _ in range(count):
+            yield self.generate_one()
+
+
+# --- ÉCRITURE ---
+def write_recipe_files(generator: RecipeCorpusGenerator, count: int, output_dir: str) -> List[str]:
+    """Writes one JSON file per recipe, numbered like split_recipes.py."""
+    os.makedirs(output_dir, exist_ok=True)
+    filenames = []
+    for idx, recipe in enumerate(generator.generate(count), start=1):
+        filename = f"{idx}_{clean_filename(recipe['name'])}.json"
+        with open(os.path.join(output_dir, filename), "w", encoding="utf-8") as out:
+            json.dump(recipe, out, ensure_ascii=False)
+        filenames.append(filename)
+    return filenames
+
+
+def write_single_file(generator: RecipeCorpusGenerator, count: int, output_file: str):
+    """Streams {"recipes": [...]} to disk (input format of split_recipes.py) in constant memory."""
+    with open(output_file, "w", encoding="utf-8") as out:
+        out.write('{"recipes": [\n')
+        for idx, recipe in enumerate(generator.generate(count)):
+            if idx:
+                out.write(",\n")
+            out.write(json.dumps(recipe, ensure_ascii=False))
+        out.write("\n]}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic synthetic recipe corpus generator")
+    parser.add_argument("-n", "--count", type=int, required=True, help="number of recipes to generate")
+    parser.add_argument("-o", "--output", required=True,
+                        help="output directory (--format files) or JSON file (--format single)")
+    parser.add_argument("--format", choices=["files", "single"], default="files")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--recipes-dir", default=RECIPES_DIR, help="real corpus used as a model")
+    args = parser.parse_args()
+
+    generator = RecipeCorpusGenerator(args.recipes_dir, args.seed)
+    if args.format == "files":
+        write_recipe_files(generator, args.count, args.output)
+    else:
+        write_single_file(generator, args.count, args.output)
+
+    print(f"Done! {args.count} recipes generated in '{args.output}' (seed={args.seed}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from typing import List, Optional
+
+try:
+    from .analyzer import ANALYZER_ID
+except ImportError:
+    from analyzer import ANALYZER_ID
+
+# ------------ CONFIG ------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_ROOT = os.path.join(SCRIPT_DIR, "..")
+SNAPSHOTS_DIR = "snapshots"       # one sub-directory per published build
+CURRENT_LINK = "current"          # symlink to the snapshot being served
+MANIFEST = "snapshot.json"        # written last: a snapshot without it is incomplete
+STAGING_SUFFIX = ".partial"       # builds in progress, never listed nor served
+DEFAULT_KEEP = 3
+STALE_STAGING_SECONDS = 24 * 3600  # staging left by a crashed build, removed by prune
+# --------------------------------
+
+
+def snapshots_root(root: str) -> str:
+    return os.path.join(root, SNAPSHOTS_DIR)
+
+
+def begin_snapshot(root: str) -> str:
+    """Creates an empty staging directory for a new build and returns its path."""
+    os.makedirs(snapshots_root(root), exist_ok=True)
+    while True:
+        now = time.time()
+        version = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1e6) % 1000000:06d}"
+        staging = os.path.join(snapshots_root(root), version + STAGING_SUFFIX)
+        try:
+            os.mkdir(staging)
+            return staging
+        except FileExistsError:
+            continue
+
+
+def commit_snapshot(root: str, staging: str, files: List[str]) -> str:
+    """
+    Seals a finished build: writes its manifest, renames the staging directory
+    to its final name and publishes it. Returns the published version.
+    """
+    version = os.path.basename(staging)[:-len(STAGING_SUFFIX)]
+    manifest = {
+        "version": version,
+        "analyzer": ANALYZER_ID,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": sorted(files),
+    }
+    with open(os.path.join(staging, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.rename(staging, os.path.join(snapshots_root(root), version))
+    publish(root, version)
+    return version
+
+
+def publish(root: str, version: str) -> None:
+    """
+    Points CURRENT_LINK at a snapshot. The new link is created under a temporary
+    name and renamed over the old one: readers see either version, never neither.
+    """
+    if not os.path.isfile(os.path.join(snapshots_root(root), version, MANIFEST)):
+        raise ValueError(f"Snapshot '{version}' not found or incomplete")
+    temporary = os.path.join(root, f".{CURRENT_LINK}-{os.getpid()}")
+    if os.path.lexists(temporary):
+        os.remove(temporary)
+    # Relative target: the index directory can be moved or mounted elsewhere
+    os.symlink(os.path.join(SNAPSHOTS_DIR, version), temporary)
+    os.replace(temporary, os.path.join(root, CURRENT_LINK))
+
+
+def current_version(root: str) -> Optional[str]:
+    """Version the CURRENT_LINK points at, None when snapshots are not used."""
+    try:
+        return os.path.basename(os.readlink(os.path.join(root, CURRENT_LINK)))
+    except OSError:
+        return None
+
+
+def list_snapshots(root: str) -> List[str]:
+    """Complete snapshots, oldest first (versions sort by build time)."""
+    directory = snapshots_root(root)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name for name in os.listdir(directory)
+        if not name.endswith(STAGING_SUFFIX) and os.path.isfile(os.path.join(directory, name, MANIFEST))
+    )
+
+
+def prune(root: str, keep: int = DEFAULT_KEEP) -> List[str]:
+    """
+    Deletes all but the newest `keep` snapshots (the current one is always kept),
+    plus staging directories left by builds that died. Returns the removed versions.
+    """
+    versions = list_snapshots(root)
+    current = current_version(root)
+    kept = set(versions[-keep:]) if keep > 0 else set()
+    removed = [version for version in versions if version not in kept and version != current]
+    for version in removed:
+        shutil.rmtree(os.path.join(snapshots_root(root), version), ignore_errors=True)
+    directory = snapshots_root(root)
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            # A recent staging directory may belong to a build still running
+            if name.endswith(STAGING_SUFFIX) and time.time() - os.path.getmtime(path) > STALE_STAGING_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+def rollback(root: str, version: Optional[str] = None) -> str:
+    """Publishes `version`, or the snapshot built just before the current one."""
+    if version is None:
+        versions = list_snapshots(root)
+        current = current_version(root)
+        older = [v for v in versions if current is None or v < current]
+        if not older:
+            raise ValueError("No older snapshot to roll back to")
+        version = older[-1]
+    publish(root, version)
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned index snapshots: list, rollback, prune")
+    parser.add_argument("-r", "--root", default=INDEX_ROOT, help="Directory holding snapshots/ and current")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    rollback_parser = commands.add_parser("rollback")
+    rollback_parser.add_argument("version", nargs="?", default=None)
+    prune_parser = commands.add_parser("prune")
+    prune_parser.add_argument("--keep", type=int, default=DEFAULT_KEEP)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = current_version(args.root)
+        for version in list_snapshots(args.root):
+            print(f"{'*' if version == current else ' '} {version}")
+    elif args.command == "rollback":
+        try:
+            print(f"✅ Serving snapshot {rollback(args.root, args.version)}")
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        removed = prune(args.root, args.keep)
+        print(f"🧹 {len(removed)} snapshot(s) removed, {len(list_snapshots(args.root))} kept")
+
+
+if __name__ == "__main__":
+    main()
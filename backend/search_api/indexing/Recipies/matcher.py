@@ -2,14 +2,43 @@ import json
 import os
 from difflib import get_close_matches
 
+try:
+    from .PythonScripts.analyzer import ANALYZER_ID, analyze, built_with, compound_terms
+    from .PythonScripts.build_inverted_index import index_terms
+    from .PythonScripts.snapshots import CURRENT_LINK
+except ImportError:
+    from PythonScripts.analyzer import ANALYZER_ID, analyze, built_with, compound_terms
+    from PythonScripts.build_inverted_index import index_terms
+    from PythonScripts.snapshots import CURRENT_LINK
+
 # === Localisation correcte de inverted_index.json ===
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 INVERTED_INDEX_PATH = os.path.join(CURRENT_DIR, "inverted_index.json")
+# Snapshot publié par build_inverted_index.py --snapshot, prioritaire s'il existe
+SNAPSHOT_INDEX_PATH = os.path.join(CURRENT_DIR, CURRENT_LINK, "inverted_index.json")
+
+# Index chargé au premier appel, pas à l'import du module
+INVERTED_INDEX = None
+
+
+def get_inverted_index():
+    """{terme: [fichiers]} lu une fois, au premier appel"""
+    global INVERTED_INDEX
+    if INVERTED_INDEX is None:
+        path = SNAPSHOT_INDEX_PATH if os.path.exists(SNAPSHOT_INDEX_PATH) else INVERTED_INDEX_PATH
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if built_with(data) != ANALYZER_ID:
+            print(f"⚠️ inverted_index.json construit avec l'analyseur {built_with(data)}, attendu {ANALYZER_ID}")
+        INVERTED_INDEX = index_terms(data)
+    return INVERTED_INDEX
+
 
-# Charger l'index au chargement du module
-with open(INVERTED_INDEX_PATH, "r", encoding="utf-8") as f:
-    INVERTED_INDEX = json.load(f)
+def query_terms(text):
+    """Termes de l'index pour un texte libre : même chaîne d'analyse que la construction"""
+    words = analyze(text)
+    return list(dict.fromkeys(words + sorted(compound_terms(words))))
 
 
 def find_recipes_by_ingredients(ingredients):
@@ -17,13 +46,14 @@ def find_recipes_by_ingredients(ingredients):
     Retourne (filename, score) pour chaque recette contenant ces ingrédients.
     """
     scores = {}
+    inverted_index = get_inverted_index()
 
     for ing in ingredients:
-        term = ing.lower().strip()
-        if term in INVERTED_INDEX:
-            files = INVERTED_INDEX[term]
-            for f in files:
-                scores[f] = scores.get(f, 0) + 1
+        for term in query_terms(ing):
+            if term in inverted_index:
+                files = inverted_index[term]
+                for f in files:
+                    scores[f] = scores.get(f, 0) + 1
 
     ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
     return ranked
@@ -33,15 +63,16 @@ def find_recipes_by_name(name):
     """
     Fuzzy match sur le nom de la recette prédite par Gemini.
     """
-    name = name.lower().strip()
+    name = " ".join(analyze(name))
 
-    terms = list(INVERTED_INDEX.keys())
+    inverted_index = get_inverted_index()
+    terms = list(inverted_index.keys())
     match = get_close_matches(name, terms, n=1, cutoff=0.7)
 
     if not match:
         return []
     
-    return INVERTED_INDEX[match[0]]
+    return inverted_index[match[0]]
 
 
 def match_recipe(name_recette, ingredients):
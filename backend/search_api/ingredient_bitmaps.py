@@ -0,0 +1,102 @@
+"""
+Mode « j'ai ces ingrédients » : une recette = un masque de bits à largeur fixe
+- Un bit par ingrédient de StrictRecipeIndexer.valid_ingredients (76 → 2 mots de 64 bits)
+- Couverture et ingrédients manquants calculés par popcount (np.bitwise_count)
+  sur toutes les recettes en une seule passe vectorisée
+- Exclusions (« pas de poisson ») par ingrédient ou par famille
+"""
+
+import numpy as np
+
+# Familles utilisables dans les exclusions, en plus des ingrédients eux-mêmes
+EXCLUSION_GROUPS = {
+    'fish': {'fish', 'tuna', 'sardine'},
+    'seafood': {'fish', 'tuna', 'sardine', 'shrimp', 'prawn', 'calamari'},
+    'meat': {'chicken', 'lamb', 'beef', 'meat', 'veal', 'turkey', 'liver', 'brain', 'tripe',
+             'mutton', 'head', 'feet', 'khlii', 'merguez', 'kefta'},
+    'poultry': {'chicken', 'turkey'},
+    'dairy': {'butter', 'cheese', 'milk', 'cream', 'smen'},
+    'gluten': {'flour', 'wheat', 'barley', 'bread', 'semolina', 'couscous'},
+}
+
+
+class IngredientBitmapIndex:
+    """Masques d'ingrédients de toutes les recettes (lignes triées par nom de fichier)"""
+
+    def __init__(self, inverted_index, vocabulary):
+        self.vocabulary = sorted(vocabulary)
+        self.bit_of = {ingredient: bit for bit, ingredient in enumerate(self.vocabulary)}
+        self.words = (len(self.vocabulary) + 63) // 64
+
+        present = [ing for ing in self.vocabulary if ing in inverted_index]
+        self.filenames = sorted({f for ing in present for f in inverted_index[ing]})
+        rows = {filename: row for row, filename in enumerate(self.filenames)}
+
+        # Masque à un seul bit de chaque ingrédient du vocabulaire
+        self.bit_masks = np.zeros((len(self.vocabulary), self.words), dtype=np.uint64)
+        for bit in range(len(self.vocabulary)):
+            self.bit_masks[bit, bit // 64] = np.uint64(1 << (bit % 64))
+
+        # Stockage mot par mot (words × recettes) : chaque opération parcourt un tableau contigu
+        self.masks = np.zeros((self.words, len(self.filenames)), dtype=np.uint64)
+        for ingredient in present:
+            bit = self.bit_of[ingredient]
+            recipe_rows = [rows[f] for f in inverted_index[ingredient]]
+            self.masks[bit // 64, recipe_rows] |= self.bit_masks[bit, bit // 64]
+        self.sizes = self.popcount_and(np.full(self.words, np.iinfo(np.uint64).max, dtype=np.uint64))
+
+    def popcount_and(self, mask):
+        """Nombre de bits communs entre chaque recette et un masque"""
+        counts = np.zeros(len(self.filenames), dtype=np.int64)
+        for word in range(self.words):
+            counts += np.bitwise_count(self.masks[word] & mask[word])
+        return counts
+
+    def intersects(self, mask):
+        """Recettes ayant au moins un bit commun avec le masque"""
+        hits = np.zeros(len(self.filenames), dtype=bool)
+        for word in range(self.words):
+            if mask[word]:
+                hits |= (self.masks[word] & mask[word]) != 0
+        return hits
+
+    def mask(self, ingredients):
+        """Masque d'un ensemble d'ingrédients connus du vocabulaire"""
+        bits = [self.bit_of[ingredient] for ingredient in ingredients]
+        return np.bitwise_or.reduce(self.bit_masks[bits], axis=0) if bits else np.zeros(self.words, np.uint64)
+
+    def ingredients_of(self, masks):
+        """Noms des ingrédients de chaque masque (une ligne par masque)"""
+        bits = np.unpackbits(masks.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+        return [[self.vocabulary[b] for b in np.flatnonzero(row[:len(self.vocabulary)])] for row in bits]
+
+    def query(self, have, exclude=(), limit=10, max_missing=None):
+        """
+        Classe toutes les recettes en une passe : couverture (part de la recette déjà disponible)
+        décroissante, puis ingrédients manquants croissants, puis nom de fichier.
+        Retourne [(fichier, couverture, nb trouvés, [manquants])].
+        """
+        have_mask = self.mask(have)
+        exclude_mask = self.mask(exclude)
+
+        matched = self.popcount_and(have_mask)
+        missing = self.sizes - matched
+        keep = (matched > 0) & ~self.intersects(exclude_mask)
+        if max_missing is not None:
+            keep &= missing <= max_missing
+
+        rows = np.flatnonzero(keep)
+        coverage = matched[rows] / self.sizes[rows]
+        if len(rows) > limit:
+            # argpartition isole les meilleures couvertures ; on garde les ex æquo de la limite
+            kth = coverage[np.argpartition(-coverage, limit - 1)[limit - 1]]
+            candidates = coverage >= kth
+            rows, coverage = rows[candidates], coverage[candidates]
+        order = np.lexsort((rows, missing[rows], -coverage))[:limit]
+        top_rows = rows[order]
+
+        missing_names = self.ingredients_of(self.masks[:, top_rows].T & ~have_mask)
+        return [
+            (self.filenames[row], float(cov), int(matched[row]), names)
+            for row, cov, names in zip(top_rows, coverage[order], missing_names)
+        ]
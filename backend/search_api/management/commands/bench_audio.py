@@ -0,0 +1,125 @@
+"""
+Benchmark du prétraitement audio (voice_search/preprocess.py) : octets et durée avant / après
+
+Usage:
+    python manage.py bench_audio
+    python manage.py bench_audio clip1.webm clip2.wav --output audio.json
+    AUDIO_FFMPEG=/chemin/vers/ffmpeg python manage.py bench_audio
+
+Sans fichier, des clips type navigateur sont synthétisés : WAV stéréo 48 kHz 16 bits, silence
+(bruit de fond faible) avant et après une « parole » (sons modulés en syllabes). Avec ffmpeg,
+chaque clip est aussi converti en WebM/Opus, le format de MediaRecorder.
+"""
+
+import io
+import json
+import subprocess
+import time
+import wave
+
+import numpy as np
+from django.core.files.uploadedfile import UploadedFile
+from django.core.management.base import BaseCommand
+
+from search_api.voice_search.audio_ingest import sniff_audio_format
+from search_api.voice_search.preprocess import ffmpeg_path, preprocess_audio
+
+BROWSER_RATE = 48000
+# (nom, silence avant en s, parole en s, silence après en s)
+CLIPS = [
+    ('court', 1.0, 2.0, 1.5),
+    ('moyen', 1.5, 5.0, 2.0),
+    ('long', 2.0, 12.0, 3.0),
+]
+
+
+def synthesize_clip(lead, speech, trail, seed=0):
+    """WAV stéréo 48 kHz 16 bits : bruit de fond, syllabes harmoniques modulées, bruit de fond"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(speech * BROWSER_RATE)) / BROWSER_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / BROWSER_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    # Syllabes d'environ 200 ms, avec des creux entre les mots
+    envelope = np.clip(np.sin(2 * np.pi * 2.5 * t), 0, None) ** 0.5
+    voice = 0.3 * voice * envelope
+    signal = np.concatenate([np.zeros(int(lead * BROWSER_RATE)), voice, np.zeros(int(trail * BROWSER_RATE))])
+    signal += rng.normal(0, 0.002, len(signal))
+    stereo = np.stack([signal, 0.9 * signal], axis=1)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(2)
+        out.setsampwidth(2)
+        out.setframerate(BROWSER_RATE)
+        out.writeframes((np.clip(stereo, -1, 1) * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def to_webm(ffmpeg, data):
+    """Conversion en WebM/Opus 48 kHz stéréo, comme un enregistrement MediaRecorder"""
+    result = subprocess.run(
+        [ffmpeg, '-nostdin', '-v', 'error', '-i', 'pipe:0', '-c:a', 'libopus', '-b:a', '128k',
+         '-f', 'webm', 'pipe:1'],
+        input=data, capture_output=True, check=True,
+    )
+    return result.stdout
+
+
+def measure(name, data):
+    """Prétraitement d'un clip : tailles, durées, méthode et temps de traitement"""
+    upload = UploadedFile(file=io.BytesIO(data), name=name, content_type=sniff_audio_format(data[:4096]),
+                          size=len(data))
+    start = time.perf_counter()
+    prepared = preprocess_audio(upload)
+    elapsed = (time.perf_counter() - start) * 1000
+    return {
+        'clip': name,
+        'format': upload.content_type,
+        'method': prepared.method,
+        'bytes_before': prepared.original_bytes,
+        'bytes_after': prepared.size,
+        'seconds_before': round(prepared.original_seconds, 2) if prepared.original_seconds else None,
+        'seconds_after': round(prepared.seconds, 2) if prepared.seconds else None,
+        'preprocess_ms': round(elapsed, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = "Tailles et durées des clips audio avant / après le prétraitement (mono, 16 kHz, silences coupés)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='Clips à mesurer (sinon clips synthétiques)')
+        parser.add_argument('--output', default=None, help='Fichier JSON de résultats')
+
+    def handle(self, *args, **options):
+        ffmpeg = ffmpeg_path()
+        self.stdout.write(f"🎚️ ffmpeg: {ffmpeg or 'absent (WAV seulement, encodage WAV 16 bits)'}")
+
+        clips = []
+        if options['files']:
+            for path in options['files']:
+                with open(path, 'rb') as f:
+                    clips.append((path, f.read()))
+        else:
+            for seed, (name, lead, speech, trail) in enumerate(CLIPS):
+                data = synthesize_clip(lead, speech, trail, seed)
+                clips.append((f"{name}.wav", data))
+                if ffmpeg:
+                    clips.append((f"{name}.webm", to_webm(ffmpeg, data)))
+
+        report = [measure(name, data) for name, data in clips]
+        for row in report:
+            ratio = row['bytes_before'] / row['bytes_after']
+            duration = (f"{row['seconds_before']} → {row['seconds_after']} s"
+                        if row['seconds_after'] is not None else '-')
+            self.stdout.write(
+                f"   {row['clip']:<14} {row['format'] or '?':<12} {row['method']:<9}"
+                f"{row['bytes_before']:>10} → {row['bytes_after']:>8} octets (x{ratio:.1f})"
+                f"   {duration:<16} {row['preprocess_ms']:>7.1f} ms"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"✅ Résultats écrits dans {options['output']}"))
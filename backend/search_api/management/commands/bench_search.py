@@ -0,0 +1,389 @@
+"""
+Microbenchmarks des chemins chauds de recherche et d'indexation
+
+Usage:
+    python manage.py bench_search --sizes 100 10000 100000 --output bench_results.json
+    python manage.py bench_search --sizes 100 --compare bench_results.json
+
+Le corpus de chaque taille vient de generate_corpus.py (même graine = même corpus).
+Gemini est remplacé par un stub : le benchmark tourne entièrement hors ligne.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Les vues refusent de s'importer sans clé : une clé factice suffit hors ligne
+os.environ.setdefault('GEMINI_API_KEY', 'offline-benchmark')
+
+from search_api import gemini_client, views  # noqa: E402
+from search_api.autocomplete import AutocompleteIndex, normalize_text  # noqa: E402
+from search_api.indexing.Recipies import matcher  # noqa: E402
+from search_api.indexing.Recipies.PythonScripts.build_inverted_index import (  # noqa: E402
+    StrictRecipeIndexer,
+    write_inverted_index,
+)
+from search_api.indexing.Recipies.PythonScripts.generate_corpus import (  # noqa: E402
+    RecipeCorpusGenerator,
+    write_recipe_files,
+)
+from search_api.field_index import FieldIndex  # noqa: E402
+from search_api.indexing.Recipies.PythonScripts.build_field_index import (  # noqa: E402
+    build_field_index,
+    build_field_shards,
+)
+from search_api.indexing.Recipies.PythonScripts.build_positional_index import build_positional_index  # noqa: E402
+from search_api.ingredient_bitmaps import IngredientBitmapIndex  # noqa: E402
+from search_api.positional_index import PositionalIndex  # noqa: E402
+from search_api.pruned_scoring import PrunedRecipeIndex  # noqa: E402
+from search_api.sharded_search import ShardedFieldIndex  # noqa: E402
+from search_api.sparse_scoring import SparseRecipeIndex  # noqa: E402
+
+DEFAULT_SIZES = [100, 10000, 100000]
+# Shards de l'index multi-champs mesurés (build_field_shards, ShardedFieldIndex)
+BENCH_SHARDS = 4
+
+# Expressions fréquentes des recettes : postings longs, beaucoup de candidats à prolonger
+PHRASES = [('preserved lemon', 0), ('ras el hanout', 0), ('olive oil', 0), ('chicken broth', 2),
+           ('orange blossom water', 0), ('salt and pepper', 1), ('cut into pieces', 0)]
+
+
+class OfflineGeminiClient:
+    """Stub du client google-genai partagé : tout appel réseau est une erreur"""
+
+    class _Offline:
+        def __getattr__(self, name):
+            def refuse(*args, **kwargs):
+                raise RuntimeError("Gemini est désactivé pendant le benchmark")
+            return refuse
+
+    models = _Offline()
+    files = _Offline()
+
+
+def offline_client():
+    return OfflineGeminiClient()
+
+
+# ============================================================
+# CORPUS ET REQUÊTES
+# ============================================================
+
+def build_queries(rng, indexer, count):
+    """Génère des couples (nom de plat, ingrédients visibles) réalistes"""
+    dishes = sorted(indexer.main_dishes)
+    ingredients = sorted(indexer.valid_ingredients)
+    queries = []
+    for _ in range(count):
+        nom = rng.choice(dishes).replace('_', ' ')
+        visibles = rng.sample(ingredients, rng.randint(1, 6))
+        queries.append((nom, visibles))
+    return queries
+
+
+def build_prefixes(rng, texts, count):
+    """Préfixes de 1 à 6 caractères de termes et de titres, comme pendant la frappe"""
+    texts = [t for t in (normalize_text(text) for text in texts) if t]
+    return [(text[:rng.randint(1, min(6, len(text)))],) for text in (rng.choice(texts) for _ in range(count))]
+
+
+def build_partial_words(rng, inverted_index, count):
+    """Mots absents de l'index qui déclenchent la recherche partielle"""
+    keys = [k for k in inverted_index if len(k) >= 5]
+    words = []
+    for _ in range(count):
+        key = rng.choice(keys)
+        words.append(key[:rng.randint(4, len(key) - 1)] if rng.random() < 0.5 else key + 'es')
+    return words
+
+
+# ============================================================
+# MESURE
+# ============================================================
+
+def measure(func, inputs, iterations):
+    """Exécute func sur les entrées (en boucle) et retourne les stats par appel"""
+    durations = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(iterations):
+            args = inputs[i % len(inputs)]
+            start = time.perf_counter_ns()
+            func(*args)
+            durations.append(time.perf_counter_ns() - start)
+    return summarize(durations)
+
+
+def summarize(durations_ns):
+    """Statistiques en microsecondes"""
+    ordered = sorted(durations_ns)
+    to_us = 1 / 1000
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * to_us
+
+    return {
+        'calls': len(ordered),
+        'mean_us': round(statistics.fmean(ordered) * to_us, 3),
+        'p50_us': round(pct(0.50), 3),
+        'p95_us': round(pct(0.95), 3),
+        'min_us': round(ordered[0] * to_us, 3),
+        'max_us': round(ordered[-1] * to_us, 3),
+        'total_ms': round(sum(ordered) * to_us / 1000, 3),
+    }
+
+
+def measure_batch_throughput(queries, limit=5):
+    """Débit (requêtes/s) : une requête à la fois comme /analyze-image/, ou un seul lot comme /search-batch/
+
+    Les deux chemins passent par load_inverted_index et hydratent le top-k,
+    comme le font les endpoints correspondants.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for nom, visibles in queries:
+            views.search_recipes_by_analysis(nom, visibles, views.load_inverted_index())
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        top_lists = views.search_recipes_batch(queries, views.load_inverted_index(), limit)
+        views.hydrate_recipes(filename for top in top_lists for filename, _ in top)
+        batch = time.perf_counter() - start
+
+    return {
+        'queries': len(queries),
+        'sequential_qps': round(len(queries) / sequential, 1),
+        'batch_qps': round(len(queries) / batch, 1),
+        'speedup': round(sequential / batch, 2),
+    }
+
+
+@contextlib.contextmanager
+def patched(obj, name, value):
+    original = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        setattr(obj, name, original)
+
+
+# ============================================================
+# COMMANDE
+# ============================================================
+
+class Command(BaseCommand):
+    help = "Microbenchmarks hors ligne des fonctions de recherche et d'indexation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                            help='Tailles de corpus (nombre de recettes)')
+        parser.add_argument('--iterations', type=int, default=500,
+                            help='Appels mesurés par fonction et par taille')
+        parser.add_argument('--build-repeat', type=int, default=1,
+                            help="Nombre de constructions d'index mesurées par taille")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='bench_results.json',
+                            help='Fichier JSON de résultats')
+        parser.add_argument('--compare', default=None,
+                            help='Résultats précédents à comparer (JSON)')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        indexer = StrictRecipeIndexer()
+        iterations = options['iterations']
+
+        # Lu avant l'écriture : --compare peut désigner le même fichier que --output
+        previous = None
+        if options['compare']:
+            with open(options['compare'], 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': options['seed'],
+                'iterations': iterations,
+            },
+            'results': {},
+            'batch_throughput': {},
+        }
+
+        with patched(gemini_client, 'get_client', offline_client):
+            for size in options['sizes']:
+                self.stdout.write(f"📦 Corpus de {size} recettes...")
+                report['results'][str(size)], report['batch_throughput'][str(size)] = self.run_size(
+                    size, rng, options['seed'], indexer, iterations, options['build_repeat'])
+
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"✅ Résultats écrits dans {options['output']}"))
+
+        if previous:
+            self.print_comparison(options['compare'], previous, report)
+
+    def run_size(self, size, rng, seed, indexer, iterations, build_repeat):
+        results = {}
+        with tempfile.TemporaryDirectory(prefix=f'bench_{size}_') as corpus_dir:
+            generator = RecipeCorpusGenerator(views.RECIPES_FOLDER_PATH, seed)
+            filenames = write_recipe_files(generator, size, corpus_dir)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                build_times = []
+                for _ in range(build_repeat):
+                    start = time.perf_counter_ns()
+                    inverted_index = indexer.build_index(corpus_dir)
+                    build_times.append(time.perf_counter_ns() - start)
+            results['StrictRecipeIndexer.build_index'] = summarize(build_times)
+
+            queries = build_queries(rng, indexer, 200)
+            keywords = [(term,) for nom, visibles in queries for term in [nom] + visibles]
+            partial_words = build_partial_words(rng, inverted_index, 200)
+            sample_files = [(rng.choice(filenames),) for _ in range(200)]
+
+            with patched(views, 'RECIPES_FOLDER_PATH', corpus_dir), \
+                    patched(matcher, 'INVERTED_INDEX', inverted_index):
+                results['normalize_keyword'] = measure(views.normalize_keyword, keywords, iterations)
+                results['search_recipes_by_analysis'] = measure(
+                    views.search_recipes_by_analysis,
+                    [(nom, visibles, inverted_index) for nom, visibles in queries],
+                    iterations,
+                )
+                results['search_partial_match'] = measure(
+                    lambda word: views.search_partial_match(word, 2.0, inverted_index, {}),
+                    [(word,) for word in partial_words],
+                    iterations,
+                )
+                results['get_recipe_by_filename'] = measure(views.get_recipe_by_filename, sample_files, iterations)
+                results['matcher.match_recipe'] = measure(matcher.match_recipe, queries, iterations)
+
+                start = time.perf_counter_ns()
+                bitmaps = IngredientBitmapIndex(inverted_index, indexer.valid_ingredients)
+                results['IngredientBitmapIndex.build'] = summarize([time.perf_counter_ns() - start])
+                results['IngredientBitmapIndex.query'] = measure(
+                    lambda have: bitmaps.query(have, {'fish'}, 10),
+                    [(set(visibles),) for _, visibles in queries],
+                    iterations,
+                )
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter_ns()
+                    titles = views.load_indexed_titles(inverted_index)
+                    autocomplete = AutocompleteIndex(
+                        {term: len(recipe_files) for term, recipe_files in inverted_index.items()}, titles)
+                    results['AutocompleteIndex.build'] = summarize([time.perf_counter_ns() - start])
+                results['AutocompleteIndex.complete'] = measure(
+                    lambda prefix: autocomplete.complete(prefix, 8),
+                    build_prefixes(rng, list(inverted_index) + [title for title, _ in titles], 200),
+                    iterations,
+                )
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter_ns()
+                    positional = PositionalIndex(build_positional_index(corpus_dir))
+                    results['build_positional_index'] = summarize([time.perf_counter_ns() - start])
+                    # Premier appel : décodage des postings, hors mesure
+                    for phrase, slop in PHRASES:
+                        positional.phrase(phrase, slop)
+                results['PositionalIndex.phrase'] = measure(positional.phrase, PHRASES, iterations)
+
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter_ns()
+                    field_data = build_field_index(corpus_dir)
+                    results['build_field_index'] = summarize([time.perf_counter_ns() - start])
+                    start = time.perf_counter_ns()
+                    fields = FieldIndex(field_data)
+                    results['FieldIndex.load'] = summarize([time.perf_counter_ns() - start])
+                # Requêtes plein texte : plat + ingrédients + un mot des étapes
+                fulltext_queries = [
+                    (' '.join([nom] + visibles + [rng.choice(['simmer', 'steam', 'pot', 'oven', 'fry'])]),)
+                    for nom, visibles in queries
+                ]
+                results['FieldIndex.search'] = measure(
+                    lambda text: fields.search(text, settings.SEARCH_FIELD_BOOSTS, 5),
+                    fulltext_queries,
+                    iterations,
+                )
+
+                # Même index en BENCH_SHARDS shards : construction parallèle, scatter-gather par requête
+                with contextlib.redirect_stdout(io.StringIO()):
+                    shards_dir = os.path.join(corpus_dir, 'field_shards')
+                    start = time.perf_counter_ns()
+                    manifest = build_field_shards(corpus_dir, shards_dir, BENCH_SHARDS)
+                    results['build_field_shards'] = summarize([time.perf_counter_ns() - start])
+                sharded = ShardedFieldIndex(manifest, shards_dir, settings.SEARCH_SHARD_PROCESSES)
+                try:
+                    sharded.search('warm', settings.SEARCH_FIELD_BOOSTS, 5)
+                    results['ShardedFieldIndex.search'] = measure(
+                        lambda text: sharded.search(text, settings.SEARCH_FIELD_BOOSTS, 5),
+                        fulltext_queries,
+                        iterations,
+                    )
+                finally:
+                    sharded.close()
+
+                index_path = os.path.join(corpus_dir, 'inverted_index.json')
+                write_inverted_index(inverted_index, index_path)
+                with patched(views, 'INVERTED_INDEX_PATHS', [index_path]):
+                    throughput = measure_batch_throughput(queries)
+
+                results.update(self.compare_scoring_backends(queries, inverted_index, iterations))
+
+        for name, stats in results.items():
+            self.stdout.write(f"   {name:<35} p50={stats['p50_us']:>12.1f}µs  p95={stats['p95_us']:>12.1f}µs")
+        self.stdout.write(f"   {'lot vs requête par requête':<35} {throughput['sequential_qps']:>10.1f} → "
+                          f"{throughput['batch_qps']:.1f} req/s (x{throughput['speedup']:.2f})")
+        return results, throughput
+
+    def compare_scoring_backends(self, queries, inverted_index, iterations):
+        """Scoring + top-k sans hydratation : boucles dict vs MaxScore vs produit CSR, requête seule et lot"""
+        results = {}
+        batch_iterations = max(3, iterations // 50)
+
+        for compiled in (SparseRecipeIndex, PrunedRecipeIndex):
+            with contextlib.redirect_stdout(io.StringIO()):
+                compile_times = []
+                for _ in range(3):
+                    start = time.perf_counter_ns()
+                    compiled(inverted_index)
+                    compile_times.append(time.perf_counter_ns() - start)
+            results[f'{compiled.__name__}.compile'] = summarize(compile_times)
+
+        top_lists = {}
+        for backend in ('dict', 'maxscore', 'sparse'):
+            with patched(settings, 'SEARCH_SCORING_BACKEND', backend):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    top_lists[backend] = views.search_recipes_batch(queries, inverted_index)
+                results[f'score_top_k[{backend}]'] = measure(
+                    lambda nom, visibles: views.search_recipes_batch([(nom, visibles)], inverted_index),
+                    queries,
+                    iterations,
+                )
+                results[f'search_recipes_batch[{backend}]'] = measure(
+                    views.search_recipes_batch, [(queries, inverted_index)], batch_iterations)
+
+        if top_lists['dict'] != top_lists['sparse']:
+            self.stderr.write("❌ Le scoring CSR diffère du scoring dict")
+        if top_lists['dict'] != top_lists['maxscore']:
+            self.stderr.write("❌ Le top-k élagué (MaxScore) diffère du scoring exhaustif")
+        return results
+
+    def print_comparison(self, path, previous, report):
+        """Affiche le ratio p50 actuel / précédent pour chaque mesure commune"""
+        self.stdout.write(f"\n📊 Comparaison avec {path} (ratio p50, < 1 = plus rapide)")
+        for size, results in report['results'].items():
+            before = previous.get('results', {}).get(size, {})
+            for name, stats in results.items():
+                if name in before and before[name]['p50_us']:
+                    ratio = stats['p50_us'] / before[name]['p50_us']
+                    self.stdout.write(f"   [{size}] {name:<35} x{ratio:.2f}")
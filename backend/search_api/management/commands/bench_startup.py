@@ -0,0 +1,106 @@
+"""
+Benchmark du démarrage à froid : coût des imports (python -X importtime)
+
+Usage:
+    python manage.py bench_startup --repeat 5 --top 15 --output startup.json
+    python manage.py bench_startup --compare startup.json
+
+Chaque cible est importée dans un interpréteur neuf (sous-processus) :
+- wsgi    : ce que fait un worker gunicorn avant sa première requête (application + routes + vues)
+- manage  : ce que paie chaque commande manage.py (django.setup() + vérifications, qui importent les routes)
+Le rapport donne, par cible, le temps d'import total (somme des temps propres de -X importtime,
+médiane sur --repeat), le temps mur du processus et les modules racines les plus coûteux.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+TARGETS = {
+    'wsgi': 'import backend.wsgi, backend.urls',
+    'manage': 'import django; django.setup(); from django.core import checks; checks.run_checks()',
+}
+
+
+def parse_importtime(stderr):
+    """(total des temps propres en µs, {module racine: cumulé en µs}) d'une sortie -X importtime"""
+    total, roots = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        total += int(self_us)
+        # Un module importé directement par la cible n'est pas indenté (un seul espace)
+        if not name.startswith('  '):
+            roots[name.strip()] = int(cumulative_us)
+    return total, roots
+
+
+def run_target(code):
+    """Un import à froid : (total -X importtime en µs, temps mur en µs, modules racines)"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='backend.settings', PYTHONDONTWRITEBYTECODE='1')
+    env.setdefault('GEMINI_API_KEY', 'offline-benchmark')
+    start = time.perf_counter_ns()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    wall = (time.perf_counter_ns() - start) // 1000
+    total, roots = parse_importtime(result.stderr)
+    return total, wall, roots
+
+
+class Command(BaseCommand):
+    help = "Temps d'import à froid (python -X importtime) du worker WSGI et des commandes manage.py"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=list(TARGETS))
+        parser.add_argument('--repeat', type=int, default=5, help='Démarrages mesurés par cible (médiane)')
+        parser.add_argument('--top', type=int, default=10, help='Modules racines les plus coûteux affichés')
+        parser.add_argument('--output', default=None, help='Fichier JSON de résultats')
+        parser.add_argument('--compare', default=None, help='Résultats précédents à comparer (JSON)')
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            with open(options['compare'], 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+
+        # Modules chargés par l'interpréteur lui-même (site, encodings...) : hors classement
+        bootstrap = set(run_target('pass')[2])
+        report = {}
+        for target in options['targets']:
+            # Premier démarrage hors mesure : caches disque et .pyc chauds comme sur un serveur
+            run_target(TARGETS[target])
+            runs = [run_target(TARGETS[target]) for _ in range(options['repeat'])]
+            totals, walls = [r[0] for r in runs], [r[1] for r in runs]
+            roots = runs[totals.index(sorted(totals)[len(totals) // 2])][2]
+            top = sorted(
+                ((name, us) for name, us in roots.items() if name not in bootstrap),
+                key=lambda item: item[1], reverse=True,
+            )[:options['top']]
+            report[target] = {
+                'import_total_ms': round(statistics.median(totals) / 1000, 1),
+                'wall_ms': round(statistics.median(walls) / 1000, 1),
+                'top_modules_ms': {name: round(us / 1000, 1) for name, us in top},
+            }
+
+            self.stdout.write(f"🚀 {target}: imports {report[target]['import_total_ms']} ms, "
+                              f"processus {report[target]['wall_ms']} ms (médianes sur {options['repeat']})")
+            for name, ms in report[target]['top_modules_ms'].items():
+                self.stdout.write(f"   {name:<45} {ms:>8.1f} ms")
+            if previous and target in previous:
+                before = previous[target]['import_total_ms']
+                after = report[target]['import_total_ms']
+                self.stdout.write(f"   vs {options['compare']}: {before} → {after} ms (x{before / after:.2f})")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"✅ Résultats écrits dans {options['output']}"))
@@ -0,0 +1,309 @@
+"""
+Serveur local imitant les endpoints Gemini (google-genai) utilisés par l'API
+
+Usage:
+    python manage.py gemini_stub --port 8765 \\
+        --latency generate=lognormal:900:0.4 --latency upload=uniform:50:200 \\
+        --rate-limit generate=0.05 --error-rate '*=0.01'
+
+Puis lancer le serveur Django avec GEMINI_BASE_URL=http://127.0.0.1:8765
+pour que tous les appels modèle arrivent ici au lieu de consommer le quota.
+
+Endpoints imités:
+    POST   /upload/v1beta/files                      (création d'upload resumable)
+    POST   /upload/v1beta/files/<id>/session         (envoi des octets + finalize)
+    GET    /v1beta/files/<id>                        (état PROCESSING → ACTIVE)
+    DELETE /v1beta/files/<id>
+    POST   /v1beta/models/<model>:generateContent
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand, CommandError
+
+OPERATIONS = ('upload', 'get', 'delete', 'generate')
+
+# Réponses plausibles pour que les vues suivent leur chemin nominal
+DISHES = [
+    ('tagine', ['chicken', 'olives', 'preserved lemon', 'onion']),
+    ('couscous', ['semolina', 'carrot', 'zucchini', 'lamb']),
+    ('harira', ['tomato', 'lentil', 'chickpea', 'cilantro']),
+    ('pastilla', ['chicken', 'almond', 'cinnamon', 'egg']),
+    ('rfissa', ['chicken', 'lentil', 'fenugreek', 'msemen']),
+    ('zaalouk', ['aubergine', 'tomato', 'garlic', 'cumin']),
+]
+TRANSCRIPTIONS = [
+    ('bghit tajine b djaj', 'I want chicken tagine'),
+    ('kifach nsawb couscous', 'How do I make couscous'),
+    ('bghit harira', 'I want harira'),
+    ('chi pastilla b l7out', 'Some fish pastilla'),
+]
+
+
+class LatencyModel:
+    """Distribution de latence en millisecondes : fixed, uniform, normal, lognormal"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, *params = spec.split(':')
+        try:
+            self.params = [float(p) for p in params]
+        except ValueError:
+            raise CommandError(f"Latence invalide: '{spec}'")
+        expected = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if kind not in expected or len(self.params) != expected[kind]:
+            raise CommandError(f"Latence invalide: '{spec}' (ex: fixed:50, uniform:20:80, "
+                               f"normal:300:50, lognormal:900:0.4)")
+        self.kind = kind
+
+    def sample(self, rng):
+        p = self.params
+        if self.kind == 'fixed':
+            ms = p[0]
+        elif self.kind == 'uniform':
+            ms = rng.uniform(p[0], p[1])
+        elif self.kind == 'normal':
+            ms = rng.gauss(p[0], p[1])
+        else:
+            # lognormal:MEDIANE_MS:SIGMA
+            ms = p[0] * rng.lognormvariate(0.0, p[1])
+        return max(0.0, ms) / 1000
+
+
+class StubState:
+    """Configuration et état partagé (fichiers uploadés) entre les threads du serveur"""
+
+    def __init__(self, latencies, error_rates, rate_limits, processing_polls, seed):
+        self.latencies = latencies
+        self.error_rates = error_rates
+        self.rate_limits = rate_limits
+        self.processing_polls = processing_polls
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.files = {}
+        self.counters = {op: 0 for op in OPERATIONS}
+
+    def draw(self, operation):
+        """Tire (latence, erreur) pour une opération ; erreur ∈ {None, 429, 500}"""
+        with self.lock:
+            self.counters[operation] += 1
+            latency = self.latencies[operation].sample(self.rng)
+            roll = self.rng.random()
+        if roll < self.rate_limits[operation]:
+            return latency, 429
+        if roll < self.rate_limits[operation] + self.error_rates[operation]:
+            return latency, 500
+        return latency, None
+
+    def choice(self, values):
+        with self.lock:
+            return self.rng.choice(values)
+
+
+def file_resource(file_id, entry, state):
+    return {
+        'name': f'files/{file_id}',
+        'displayName': file_id,
+        'mimeType': entry['mime_type'],
+        'sizeBytes': str(entry['size']),
+        'uri': f'stub://files/{file_id}',
+        'state': state,
+    }
+
+
+def make_handler(state):
+    class GeminiStubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        # --- utilitaires ---
+        def _read_body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length) if length else b''
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_error(self, status):
+            if status == 429:
+                error = {'code': 429, 'status': 'RESOURCE_EXHAUSTED',
+                         'message': 'Resource has been exhausted (e.g. check quota).'}
+            else:
+                error = {'code': 500, 'status': 'INTERNAL', 'message': 'Internal error (stub).'}
+            self._send_json(status, {'error': error})
+
+        def _simulate(self, operation):
+            """Applique latence et erreurs ; retourne True si une erreur a été envoyée"""
+            latency, error = state.draw(operation)
+            time.sleep(latency)
+            if error:
+                self._send_error(error)
+                return True
+            return False
+
+        # --- routes ---
+        def do_POST(self):
+            path = self.path.split('?', 1)[0]
+            body = self._read_body()
+
+            if path == '/upload/v1beta/files':
+                if self._simulate('upload'):
+                    return
+                request = json.loads(body or b'{}').get('file', {})
+                file_id = uuid.uuid4().hex[:12]
+                with state.lock:
+                    state.files[file_id] = {
+                        'mime_type': request.get('mimeType', 'application/octet-stream'),
+                        'size': 0, 'polls': 0,
+                    }
+                host = self.headers.get('Host', '127.0.0.1')
+                upload_url = f'http://{host}/upload/v1beta/files/{file_id}/session'
+                self._send_json(200, {}, {'X-Goog-Upload-URL': upload_url})
+
+            elif path.startswith('/upload/v1beta/files/') and path.endswith('/session'):
+                file_id = path.split('/')[4]
+                with state.lock:
+                    entry = state.files.get(file_id)
+                    if entry:
+                        entry['size'] += len(body)
+                if not entry:
+                    self._send_json(404, {'error': {'code': 404, 'status': 'NOT_FOUND', 'message': 'No upload'}})
+                    return
+                if 'finalize' in self.headers.get('X-Goog-Upload-Command', ''):
+                    resource = file_resource(file_id, entry, 'PROCESSING' if state.processing_polls else 'ACTIVE')
+                    self._send_json(200, {'file': resource}, {'X-Goog-Upload-Status': 'final'})
+                else:
+                    self._send_json(200, {}, {'X-Goog-Upload-Status': 'active'})
+
+            elif path.startswith('/v1beta/models/') and path.endswith(':generateContent'):
+                if self._simulate('generate'):
+                    return
+                self._send_json(200, self._generate(json.loads(body or b'{}')))
+
+            else:
+                self._send_json(404, {'error': {'code': 404, 'status': 'NOT_FOUND', 'message': path}})
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if not path.startswith('/v1beta/files/'):
+                self._send_json(404, {'error': {'code': 404, 'status': 'NOT_FOUND', 'message': path}})
+                return
+            if self._simulate('get'):
+                return
+            file_id = path.rsplit('/', 1)[1]
+            with state.lock:
+                entry = state.files.get(file_id)
+                if entry:
+                    entry['polls'] += 1
+                    ready = entry['polls'] > state.processing_polls
+            if not entry:
+                self._send_json(404, {'error': {'code': 404, 'status': 'NOT_FOUND', 'message': path}})
+                return
+            self._send_json(200, file_resource(file_id, entry, 'ACTIVE' if ready else 'PROCESSING'))
+
+        def do_DELETE(self):
+            path = self.path.split('?', 1)[0]
+            if self._simulate('delete'):
+                return
+            with state.lock:
+                state.files.pop(path.rsplit('/', 1)[1], None)
+            self._send_json(200, {})
+
+        def _generate(self, request):
+            """Construit une réponse adaptée au type de prompt (image, audio, texte)"""
+            parts = [p for c in request.get('contents', []) for p in c.get('parts', [])]
+            has_image = any(str(p.get('inlineData', {}).get('mimeType', '')).startswith('image/') for p in parts)
+            has_file = any('fileData' in p for p in parts)
+
+            if has_image:
+                dish, ingredients = state.choice(DISHES)
+                text = json.dumps({'nom_recette': dish, 'ingredients_visibles': ingredients})
+            elif has_file:
+                transcription, translation = state.choice(TRANSCRIPTIONS)
+                text = f'TRANSCRIPTION: {transcription}\nTRANSLATION: {translation}'
+            else:
+                text = state.choice(TRANSCRIPTIONS)[1].lower()
+
+            return {
+                'candidates': [{
+                    'content': {'role': 'model', 'parts': [{'text': text}]},
+                    'finishReason': 'STOP',
+                    'index': 0,
+                }],
+                'usageMetadata': {'promptTokenCount': 0, 'candidatesTokenCount': 0, 'totalTokenCount': 0},
+                'modelVersion': 'gemini-stub',
+            }
+
+    return GeminiStubHandler
+
+
+def parse_per_operation(values, default, convert, label):
+    """Transforme ['generate=0.1', '*=0.01'] en {operation: valeur}"""
+    result = {op: default for op in OPERATIONS}
+    for item in values or []:
+        if '=' not in item:
+            raise CommandError(f"{label} invalide: '{item}' (format OPERATION=VALEUR)")
+        operation, value = item.split('=', 1)
+        targets = OPERATIONS if operation == '*' else (operation,)
+        if operation != '*' and operation not in OPERATIONS:
+            raise CommandError(f"Opération inconnue '{operation}' (choix: {', '.join(OPERATIONS)}, *)")
+        for target in targets:
+            result[target] = convert(value)
+    return result
+
+
+class Command(BaseCommand):
+    help = "Serveur Gemini factice (latences et erreurs configurables) pour les tests de charge"
+    # Indépendant du projet : pas besoin de charger les vues (ni la clé Gemini)
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', action='append', metavar='OP=SPEC',
+                            help='Distribution de latence par opération (upload, get, delete, generate ou *)')
+        parser.add_argument('--error-rate', action='append', metavar='OP=TAUX',
+                            help='Taux de réponses 500 INTERNAL')
+        parser.add_argument('--rate-limit', action='append', metavar='OP=TAUX',
+                            help='Taux de réponses 429 RESOURCE_EXHAUSTED')
+        parser.add_argument('--processing-polls', type=int, default=0,
+                            help="Nombre de GET renvoyant PROCESSING avant ACTIVE")
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        latencies = parse_per_operation(options['latency'], LatencyModel('fixed:0'), LatencyModel, 'Latence')
+        state = StubState(
+            latencies=latencies,
+            error_rates=parse_per_operation(options['error_rate'], 0.0, float, "Taux d'erreur"),
+            rate_limits=parse_per_operation(options['rate_limit'], 0.0, float, 'Taux de 429'),
+            processing_polls=options['processing_polls'],
+            seed=options['seed'],
+        )
+
+        server = ThreadingHTTPServer((options['host'], options['port']), make_handler(state))
+        server.daemon_threads = True
+        self.stdout.write(f"🤖 Stub Gemini sur http://{options['host']}:{options['port']}")
+        for op in OPERATIONS:
+            self.stdout.write(f"   {op:<9} latence={latencies[op].spec:<18} "
+                              f"429={state.rate_limits[op]:.1%}  500={state.error_rates[op]:.1%}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"\n📊 Appels reçus: {state.counters}")
@@ -0,0 +1,231 @@
+"""
+Générateur de charge asyncio pour toutes les routes de l'API
+
+Usage (hors ligne, sans quota Gemini):
+    python manage.py gemini_stub --port 8765 --latency generate=lognormal:900:0.4 --rate-limit generate=0.02
+    GEMINI_BASE_URL=http://127.0.0.1:8765 python manage.py runserver --noreload
+    python manage.py loadtest --rps 10 --duration 30 --output loadtest.json
+
+Les images envoyées sont les photos de référence du corpus : la reconnaissance locale
+y répond sans Gemini. Lancer le serveur avec IMAGE_LOCAL_RECOGNIZER=false pour
+charger le chemin Gemini.
+
+Chaque endpoint est piloté en boucle ouverte au débit cible : les requêtes
+partent à intervalle fixe, quel que soit le temps de réponse du serveur.
+Le rapport donne p50/p95/p99 et le débit par endpoint.
+"""
+
+import asyncio
+import io
+import itertools
+import json
+import os
+import time
+import wave
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SAMPLE_TEXTS = ['bghit tajine b djaj', 'couscous b l5odra', 'harira', 'pastilla dyal l7out', 'zaalouk']
+SAMPLE_QUERIES = ['tagine', 'couscous', 'poulet', 'harira', 'olives']
+SAMPLE_RECIPE_IDS = ['16_tajine_poulet', '2_couscous_marocain', '4_harira', '3_pastilla']
+
+
+def make_wav(seconds=1.5, rate=16000):
+    """Clip WAV mono silencieux généré en mémoire (aucun fichier de test à livrer)"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b'\x00\x00' * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def load_sample_images(limit=8):
+    """Quelques photos de référence du corpus pour analyze-image/"""
+    images_dir = settings.MEDIA_ROOT
+    names = sorted(n for n in os.listdir(images_dir) if n.lower().endswith(('.jpg', '.jpeg', '.png')))[:limit]
+    images = []
+    for name in names:
+        with open(os.path.join(images_dir, name), 'rb') as f:
+            mime = 'image/png' if name.lower().endswith('.png') else 'image/jpeg'
+            images.append((name, f.read(), mime))
+    return images
+
+
+def build_endpoints(include_writes):
+    """Table nom → fabrique de requête (méthode, chemin, kwargs httpx)"""
+    images = itertools.cycle(load_sample_images())
+    texts = itertools.cycle(SAMPLE_TEXTS)
+    queries = itertools.cycle(SAMPLE_QUERIES)
+    recipe_ids = itertools.cycle(SAMPLE_RECIPE_IDS)
+    audio = make_wav()
+
+    endpoints = {
+        'recipes': lambda: ('GET', 'recipes/', {}),
+        'search': lambda: ('GET', 'search/', {'params': {'query': next(queries)}}),
+        'search_batch': lambda: ('POST', 'search-batch/', {'json': {'queries': [
+            {'nom_recette': next(queries), 'ingredients_visibles': ['onion', 'tomato']} for _ in range(10)]}}),
+        'recipe_details': lambda: ('GET', f'recipes/{next(recipe_ids)}/', {}),
+        'user_recipes': lambda: ('GET', 'recipes/user/', {}),
+        'analyze_image': lambda: ('POST', 'analyze-image/', {'files': {'image': next(images)}}),
+        'analyze_images': lambda: ('POST', 'analyze-images/', {
+            'files': [('images', next(images)) for _ in range(3)]}),
+        'voice_search': lambda: ('POST', 'voice-search/', {'files': {'audio': ('clip.wav', audio, 'audio/wav')}}),
+        'transcribe': lambda: ('POST', 'transcribe/', {'files': {'audio': ('clip.wav', audio, 'audio/wav')}}),
+        'text_search': lambda: ('POST', 'text-search/', {'json': {'text': next(texts)}}),
+        'metrics': lambda: ('GET', 'metrics/', {}),
+    }
+    if include_writes:
+        endpoints['create_recipe'] = lambda: ('POST', 'recipes/create/', {'data': {
+            'title': 'loadtest', 'description': 'loadtest', 'user_name': 'loadtest',
+            'ingredients': json.dumps(['loadtest']), 'steps': json.dumps(['loadtest']),
+        }})
+    return endpoints
+
+
+def percentile(ordered, p):
+    """Percentile au rang le plus proche sur une liste triée"""
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.sent = 0
+        self.dropped = 0
+        self.latencies = []
+        self.statuses = {}
+        self.exceptions = {}
+
+    def report(self, elapsed):
+        ordered = sorted(self.latencies)
+        ok = sum(count for status, count in self.statuses.items() if 200 <= status < 300)
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            'sent': self.sent,
+            'completed': len(ordered),
+            'ok': ok,
+            'dropped': self.dropped,
+            'statuses': {str(k): v for k, v in sorted(self.statuses.items())},
+            'exceptions': self.exceptions,
+            'throughput_rps': round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            'ok_rps': round(ok / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': ms(percentile(ordered, 50)),
+            'p95_ms': ms(percentile(ordered, 95)),
+            'p99_ms': ms(percentile(ordered, 99)),
+        }
+
+
+async def drive_endpoint(client, name, factory, rps, duration, semaphore, stats, tasks):
+    """Émet des requêtes à intervalle fixe pendant `duration` secondes"""
+    interval = 1.0 / rps
+    start = time.perf_counter()
+    next_send = start
+
+    async def fire(method, path, kwargs):
+        try:
+            t0 = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            stats.latencies.append(time.perf_counter() - t0)
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+        except Exception as e:
+            kind = type(e).__name__
+            stats.exceptions[kind] = stats.exceptions.get(kind, 0) + 1
+        finally:
+            semaphore.release()
+
+    while next_send - start < duration:
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+        next_send += interval
+        stats.sent += 1
+        if semaphore.locked():
+            # Boucle ouverte : on ne ralentit pas l'émission, la requête est comptée perdue
+            stats.dropped += 1
+            continue
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(fire(*factory())))
+
+
+async def run_load(base_url, endpoints, rps, duration, timeout, max_in_flight):
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    stats = {name: EndpointStats() for name in endpoints}
+    tasks = []
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            drive_endpoint(client, name, factory, rps, duration, semaphore, stats[name], tasks)
+            for name, factory in endpoints.items()
+        ))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    return {name: s.report(elapsed) for name, s in stats.items()}, elapsed
+
+
+class Command(BaseCommand):
+    help = "Test de charge asyncio de toutes les routes (p50/p95/p99 et débit par endpoint)"
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000/api/')
+        parser.add_argument('--rps', type=float, default=5.0, help='Débit cible par endpoint (requêtes/s)')
+        parser.add_argument('--duration', type=float, default=30.0, help='Durée d\'émission (secondes)')
+        parser.add_argument('--endpoints', nargs='+', default=None, help='Sous-ensemble des endpoints à piloter')
+        parser.add_argument('--include-writes', action='store_true',
+                            help='Inclut recipes/create/ (écrit dans user_recipes.json)')
+        parser.add_argument('--timeout', type=float, default=150.0)
+        parser.add_argument('--max-in-flight', type=int, default=256)
+        parser.add_argument('--output', default=None, help='Fichier JSON du rapport')
+
+    def handle(self, *args, **options):
+        endpoints = build_endpoints(options['include_writes'])
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - set(endpoints)
+            if unknown:
+                raise CommandError(f"Endpoints inconnus: {', '.join(sorted(unknown))} "
+                                   f"(choix: {', '.join(endpoints)})")
+            endpoints = {name: endpoints[name] for name in options['endpoints']}
+        if options['rps'] <= 0:
+            raise CommandError('--rps doit être positif')
+
+        self.stdout.write(f"🚀 {len(endpoints)} endpoints × {options['rps']} req/s pendant "
+                          f"{options['duration']}s sur {options['base_url']}")
+        results, elapsed = asyncio.run(run_load(
+            options['base_url'], endpoints, options['rps'], options['duration'],
+            options['timeout'], options['max_in_flight'],
+        ))
+
+        self.stdout.write(f"\n{'endpoint':<16}{'sent':>7}{'ok':>7}{'drop':>6}{'rps':>8}"
+                          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuts")
+        for name, r in results.items():
+            statuses = ' '.join(f'{k}:{v}' for k, v in r['statuses'].items())
+            statuses += ''.join(f' {k}:{v}' for k, v in r['exceptions'].items())
+            self.stdout.write(
+                f"{name:<16}{r['sent']:>7}{r['ok']:>7}{r['dropped']:>6}{r['throughput_rps']:>8}"
+                f"{str(r['p50_ms']):>10}{str(r['p95_ms']):>10}{str(r['p99_ms']):>10}  {statuses}"
+            )
+
+        if options['output']:
+            report = {
+                'meta': {
+                    'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'base_url': options['base_url'],
+                    'target_rps': options['rps'],
+                    'duration_s': options['duration'],
+                    'elapsed_s': round(elapsed, 2),
+                },
+                'endpoints': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"✅ Rapport écrit dans {options['output']}"))
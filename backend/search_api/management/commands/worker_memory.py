@@ -0,0 +1,75 @@
+"""
+Mémoire du maître gunicorn et de ses workers (Linux, /proc/<pid>/smaps_rollup)
+
+Usage:
+    gunicorn backend.wsgi                      # GUNICORN_PRELOAD=true|false, GUNICORN_WORKERS=4
+    python manage.py worker_memory --pid $(pgrep -o -f "gunicorn backend.wsgi")
+
+RSS compte toutes les pages résidentes, partagées ou non : la somme des RSS surestime
+la mémoire réelle dès que des pages sont partagées. PSS répartit chaque page partagée
+entre les processus qui la partagent (la somme des PSS est la mémoire réellement occupée) ;
+Private est ce qu'un worker ajoute à lui seul.
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+FIELDS = {'Rss': 'rss', 'Pss': 'pss', 'Shared_Clean': 'shared', 'Shared_Dirty': 'shared',
+          'Private_Clean': 'private', 'Private_Dirty': 'private'}
+
+
+def read_rollup(pid):
+    """{'rss', 'pss', 'shared', 'private'} en Mio pour un processus"""
+    memory = dict.fromkeys(set(FIELDS.values()), 0.0)
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in FIELDS:
+                memory[FIELDS[name]] += int(value.split()[0]) / 1024
+    return memory
+
+
+def children(pid):
+    """Processus fils directs (workers du maître)"""
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # Le nom du processus (entre parenthèses) peut contenir des espaces
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == pid:
+            found.append(int(entry))
+    return sorted(found)
+
+
+class Command(BaseCommand):
+    help = "RSS / PSS / mémoire partagée et privée du maître gunicorn et de chacun de ses workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pid', type=int, required=True, help='PID du maître gunicorn')
+
+    def handle(self, *args, **options):
+        master = options['pid']
+        if not os.path.exists(f'/proc/{master}/smaps_rollup'):
+            raise CommandError(f"/proc/{master}/smaps_rollup introuvable (Linux uniquement, PID valide ?)")
+        workers = children(master)
+        if not workers:
+            raise CommandError(f"Aucun worker pour le maître {master}")
+
+        self.stdout.write(f"{'processus':<16}{'RSS':>10}{'PSS':>10}{'partagé':>10}{'privé':>10}  (Mio)")
+        totals = dict.fromkeys(('rss', 'pss', 'shared', 'private'), 0.0)
+        for label, pid in [('maître', master)] + [(f'worker {i + 1}', pid) for i, pid in enumerate(workers)]:
+            memory = read_rollup(pid)
+            if pid != master:
+                for key in totals:
+                    totals[key] += memory[key]
+            self.stdout.write(f"{label:<16}{memory['rss']:>10.1f}{memory['pss']:>10.1f}"
+                              f"{memory['shared']:>10.1f}{memory['private']:>10.1f}")
+        count = len(workers)
+        self.stdout.write(f"{'moyenne worker':<16}{totals['rss'] / count:>10.1f}{totals['pss'] / count:>10.1f}"
+                          f"{totals['shared'] / count:>10.1f}{totals['private'] / count:>10.1f}")
@@ -0,0 +1,185 @@
+"""
+Mesure des temps par phase (Gemini, index, scoring, hydratation)
+- Chronomètres légers utilisables en context manager ou en décorateur
+- En-tête Server-Timing construit par ServerTimingMiddleware
+- Histogrammes agrégés exposés au format texte Prometheus sur /api/metrics/
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_http_methods
+
+# Bornes des histogrammes (secondes) : de la recherche locale à l'appel Gemini
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Liste des (phase, durée) de la requête en cours, None hors requête
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class Histogram:
+    """Histogramme cumulatif au sens Prometheus"""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Registre process-wide des histogrammes, protégé par un verrou"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """Sérialise tous les histogrammes au format d'exposition Prometheus"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            snapshot = [(key, list(h.counts), h.total, h.count, h.buckets) for key, h in items]
+
+        lines = []
+        declared = set()
+        for (name, labels), counts, total, count, buckets in snapshot:
+            if name not in declared:
+                lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+                declared.add(name)
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f'{name}_bucket{_format_labels(labels, le=_format_bound(bound))} {bucket_count}')
+            lines.append(f'{name}_bucket{_format_labels(labels, le="+Inf")} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total:.6f}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+PHASE_METRIC = 'chhiwatdar_phase_duration_seconds'
+REQUEST_METRIC = 'chhiwatdar_request_duration_seconds'
+
+METRIC_HELP = {
+    PHASE_METRIC: 'Durée des phases internes (Gemini, index, scoring, hydratation).',
+    REQUEST_METRIC: 'Durée totale des requêtes HTTP par route.',
+}
+
+REGISTRY = MetricsRegistry()
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + '}'
+
+
+# ============================================================
+# CHRONOMÈTRES
+# ============================================================
+
+def start_request_timing():
+    """Ouvre la collecte des phases pour la requête courante"""
+    return _request_timings.set([])
+
+
+def end_request_timing(token):
+    """Ferme la collecte et retourne les phases mesurées"""
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    return timings
+
+
+def record_phase(phase, duration):
+    """Enregistre une durée dans l'histogramme et dans la requête courante"""
+    REGISTRY.observe(PHASE_METRIC, {'phase': phase}, duration)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((phase, duration))
+
+
+@contextmanager
+def timed(phase):
+    """Chronomètre un bloc de code sous le nom de phase donné"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start)
+
+
+def timed_function(phase):
+    """Décorateur : chronomètre chaque appel de la fonction"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_request(route, method, status, duration):
+    """Enregistre la durée totale d'une requête HTTP"""
+    REGISTRY.observe(REQUEST_METRIC, {'route': route, 'method': method, 'status': str(status)}, duration)
+
+
+def format_server_timing(timings):
+    """
+    Construit la valeur de l'en-tête Server-Timing.
+    Les phases répétées (ex: hydratation de 5 recettes) sont sommées.
+    """
+    totals = {}
+    for phase, duration in timings:
+        total, count = totals.get(phase, (0.0, 0))
+        totals[phase] = (total + duration, count + 1)
+
+    entries = []
+    for phase, (total, count) in totals.items():
+        entry = f'{phase};dur={total * 1000:.1f}'
+        if count > 1:
+            entry += f';desc="x{count}"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+# ============================================================
+# ENDPOINT
+# ============================================================
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Expose les histogrammes au format texte Prometheus"""
+    return HttpResponse(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
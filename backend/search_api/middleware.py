@@ -0,0 +1,51 @@
+"""
+Middlewares de l'application search_api
+"""
+
+import time
+
+from .index_snapshot import pin_snapshot, unpin_snapshot
+from .metrics import end_request_timing, format_server_timing, observe_request, start_request_timing
+
+
+class ServerTimingMiddleware:
+    """
+    Mesure chaque requête et ajoute l'en-tête Server-Timing
+    (phases internes + durée totale), puis alimente les histogrammes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_request_timing()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = end_request_timing(token)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        observe_request(route, request.method, response.status_code, duration)
+
+        response['Server-Timing'] = format_server_timing(timings + [('total', duration)])
+        return response
+
+
+class SnapshotMiddleware:
+    """
+    Fige le snapshot d'index (lien 'current') pour toute la durée de la requête :
+    une publication pendant la requête ne lui fait pas mélanger deux versions d'index.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = pin_snapshot()
+        try:
+            return self.get_response(request)
+        finally:
+            unpin_snapshot(token)
@@ -0,0 +1,64 @@
+"""
+Requêtes d'expression et de proximité sur l'index positionnel (positional_index.json)
+- Postings décodés à la demande (une fois par terme), en clés triées doc << 32 | position
+- Expression exacte (« preserved lemon ») : chaque mot suivant doit être à la position + 1
+- Proximité (slop) : chaque mot suivant à au plus 1 + slop positions du précédent, dans l'ordre
+- Une passe searchsorted (NumPy) par mot de la requête, quelle que soit la taille du corpus
+"""
+
+import numpy as np
+
+from .indexing.Recipies.PythonScripts.analyzer import analyze
+from .indexing.Recipies.PythonScripts.build_positional_index import LINE_GAP
+
+DOC_SHIFT = 32
+
+
+class PositionalIndex:
+    """Index positionnel chargé ; les postings delta-encodés sont décodés au premier usage"""
+
+    def __init__(self, data):
+        self.documents = data.get('documents', [])
+        self.encoded = data.get('postings', {})
+        # Une fenêtre plus large que l'écart entre lignes ferait déborder une expression sur la ligne suivante
+        self.max_slop = data.get('line_gap', LINE_GAP) - 1
+        self._keys = {}
+
+    def keys(self, term):
+        """Occurrences du terme : tableau trié de doc << 32 | position"""
+        keys = self._keys.get(term)
+        if keys is None:
+            flat = self.encoded.get(term, [])
+            decoded, doc, i = [], 0, 0
+            while i < len(flat):
+                doc += flat[i]
+                count = flat[i + 1]
+                positions = np.cumsum(flat[i + 2:i + 2 + count], dtype=np.int64)
+                decoded.append((doc << DOC_SHIFT) + positions)
+                i += 2 + count
+            keys = np.concatenate(decoded) if decoded else np.zeros(0, dtype=np.int64)
+            self._keys[term] = keys
+        return keys
+
+    def phrase(self, text, slop=0):
+        """{fichier: nombre d'occurrences} des recettes contenant l'expression (slop = mots intercalés tolérés)"""
+        words = analyze(text)
+        if not words:
+            return {}
+        slop = max(0, min(slop, self.max_slop))
+
+        # Fins d'occurrence courantes : on prolonge chaque occurrence mot par mot
+        ends = self.keys(words[0])
+        for word in words[1:]:
+            if not len(ends):
+                break
+            following = self.keys(word)
+            idx = np.searchsorted(following, ends + 1)
+            found = idx < len(following)
+            # Le plus proche suivant : le meilleur choix pour les mots d'après
+            next_keys = following[np.minimum(idx, len(following) - 1)] if len(following) else ends
+            found &= next_keys - ends <= 1 + slop
+            ends = np.unique(next_keys[found])
+
+        docs, counts = np.unique(ends >> DOC_SHIFT, return_counts=True)
+        return {self.documents[doc]: int(count) for doc, count in zip(docs, counts)}
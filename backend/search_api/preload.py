@@ -0,0 +1,50 @@
+"""
+Préchargement des index et des recettes avant le fork des workers (gunicorn, preload_app)
+- Tous les artefacts sont lus et compilés une fois dans le processus maître
+- Les workers forkés partagent ces pages en copy-on-write au lieu de parser chacun leur copie
+- gc.freeze() (gunicorn.conf.py) sort ces objets du suivi du GC : une collecte dans un worker
+  ne réécrit plus leurs en-têtes, les pages restent partagées
+- Rien qui démarre un thread ou un processus : ils ne survivraient pas au fork
+  (client Gemini, shards de l'index plein texte ouverts dans leurs processus)
+"""
+
+import contextlib
+import io
+import os
+import time
+
+from . import views
+from .image_search import local_recognizer
+
+
+def preload_indexes():
+    """Charge index, structures dérivées et magasin de documents ; retourne un résumé"""
+    start = time.perf_counter()
+    inverted_index = views.load_inverted_index()
+    views.get_scoring_index(inverted_index)
+    views.get_bitmap_index(inverted_index)
+    views.get_autocomplete_index()
+
+    positional_index = views.load_positional_index()
+    if positional_index is not None:
+        # Postings décodés d'avance : sinon chaque worker décode (et possède) sa propre copie
+        for term in positional_index.encoded:
+            positional_index.keys(term)
+
+    # Les shards s'ouvrent dans des processus dédiés : chaque worker ouvre les siens
+    if not os.path.exists(views.artifact_path(views.FIELD_SHARDS_MANIFEST_PATH)):
+        views.load_field_index()
+    views.load_similar_recipes()
+    views.load_duplicate_canonicals()
+    if os.path.exists(local_recognizer.DESCRIPTORS_PATH):
+        local_recognizer.get_recognizer(views.load_cached_json(os.path.abspath(local_recognizer.DESCRIPTORS_PATH)))
+
+    filenames = sorted(f for f in os.listdir(views.RECIPES_FOLDER_PATH) if f.endswith('.json'))
+    # Journaux d'image de chaque recette inutiles ici
+    with contextlib.redirect_stdout(io.StringIO()):
+        documents = views.hydrate_recipes(filenames)
+    return {
+        'terms': len(inverted_index),
+        'documents': len(documents),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
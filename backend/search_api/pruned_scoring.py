@@ -0,0 +1,113 @@
+"""
+Top-k avec élagage dynamique (MaxScore) sur l'index inversé
+- Postings compilés une fois : identifiants de documents triés (ordre des noms de fichier) + fréquences
+- Chaque terme de la requête a une borne : poids × fréquence max de ses postings
+- Dès que le top-k est plein, les termes dont la somme des bornes ne dépasse pas le k-ième score
+  deviennent "non essentiels" : aucun document n'entre dans le top par eux seuls,
+  on ne parcourt plus que les postings des termes essentiels
+- Les termes non essentiels ne sont consultés (recherche dichotomique) que pour les candidats
+  qui peuvent encore dépasser le seuil
+- Documents visités dans l'ordre des noms de fichier : à score égal le premier vu reste devant,
+  même départage que rank_recipe_scores ; scores et top identiques au scoring exhaustif
+"""
+
+import heapq
+from bisect import bisect_left
+from collections import Counter
+
+
+class PrunedRecipeIndex:
+    """Index inversé compilé en postings triés par document, interrogé en top-k avec MaxScore"""
+
+    def __init__(self, inverted_index):
+        # Identifiant de document = rang du nom de fichier : l'ordre de parcours sert de départage
+        self.filenames = sorted({f for recipe_files in inverted_index.values() for f in recipe_files})
+        columns = {filename: doc for doc, filename in enumerate(self.filenames)}
+
+        # terme → (documents triés, fréquences, fréquence max)
+        self.postings = {}
+        for term, recipe_files in inverted_index.items():
+            # Un fichier listé deux fois pour un terme compte deux fois (comme add_score_to_recipes)
+            counts = Counter(columns[f] for f in recipe_files)
+            docs = sorted(counts)
+            frequencies = [counts[doc] for doc in docs]
+            self.postings[term] = (docs, frequencies, max(frequencies, default=0))
+
+    @property
+    def num_documents(self):
+        return len(self.filenames)
+
+    def top_k(self, weights_list, limit=5):
+        """Top-k (fichier, score) de chaque requête {clé d'index: poids > 0}"""
+        return [self.top_one(weights, limit) for weights in weights_list]
+
+    def top_one(self, weights, limit=5):
+        # Termes par borne croissante : les premiers sont les candidats au statut non essentiel
+        terms = sorted(
+            (weight * self.postings[term][2], weight, self.postings[term][0], self.postings[term][1])
+            for term, weight in weights.items() if weight > 0 and self.postings[term][0]
+        )
+        if not terms or limit <= 0:
+            return []
+
+        # cumulative[i] : somme des bornes des termes 0..i
+        cumulative = []
+        total = 0.0
+        for bound, _, _, _ in terms:
+            total += bound
+            cumulative.append(total)
+
+        count = len(terms)
+        cursors = [0] * count
+        lengths = [len(docs) for _, _, docs, _ in terms]
+        heap = []          # (score, -document) : la racine est le moins bon du top
+        threshold = 0.0    # k-ième score une fois le top plein
+        essential = 0      # terms[essential:] sont parcourus, terms[:essential] seulement consultés
+
+        while True:
+            # Prochain candidat : plus petit document restant des termes essentiels
+            doc = None
+            for i in range(essential, count):
+                if cursors[i] < lengths[i]:
+                    current = terms[i][2][cursors[i]]
+                    if doc is None or current < doc:
+                        doc = current
+            if doc is None:
+                break
+
+            score = 0.0
+            for i in range(essential, count):
+                position = cursors[i]
+                if position < lengths[i] and terms[i][2][position] == doc:
+                    score += terms[i][1] * terms[i][3][position]
+                    cursors[i] = position + 1
+
+            # Termes non essentiels, de la plus forte borne à la plus faible
+            competitive = True
+            for i in range(essential - 1, -1, -1):
+                if score + cumulative[i] <= threshold:
+                    competitive = False
+                    break
+                docs = terms[i][2]
+                position = bisect_left(docs, doc, cursors[i])
+                cursors[i] = position
+                if position < lengths[i] and docs[position] == doc:
+                    score += terms[i][1] * terms[i][3][position]
+
+            if not competitive:
+                continue
+            if len(heap) < limit:
+                heapq.heappush(heap, (score, -doc))
+            elif score > threshold:
+                # Égalité : le document déjà retenu a un nom plus petit, il reste devant
+                heapq.heapreplace(heap, (score, -doc))
+            else:
+                continue
+
+            if len(heap) == limit:
+                threshold = heap[0][0]
+                while essential < count and cumulative[essential] <= threshold:
+                    essential += 1
+
+        ranked = sorted(heap, key=lambda entry: (-entry[0], -entry[1]))
+        return [(self.filenames[-doc], score) for score, doc in ranked]
@@ -0,0 +1,86 @@
+"""
+Recherche plein texte sur un index multi-champs partitionné (field_shards/manifest.json)
+- Chaque shard est chargé une fois par son propre processus (ou en mémoire, mode threads)
+- Scatter-gather : la requête part vers tous les shards en parallèle, chacun renvoie son top-k
+- Fusion des tops triés par heapq.merge : (-score, fichier), comme l'index complet
+- Les shards scorent avec les statistiques de toute la collection : scores et ordre identiques
+  à field_index.json construit sur les mêmes recettes
+"""
+
+import heapq
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from .field_index import FieldIndex
+
+# Shard chargé par le processus courant (processus dédié à un shard)
+_worker_shard = None
+
+
+def open_shard(path, collection):
+    """Lit un shard et le compile en FieldIndex avec les statistiques de la collection"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return FieldIndex(json.load(f), collection)
+
+
+def _load_worker_shard(path, collection):
+    global _worker_shard
+    _worker_shard = open_shard(path, collection)
+
+
+def _search_worker_shard(text, boosts, limit):
+    return _worker_shard.top_k(text, boosts, limit)
+
+
+class ShardedFieldIndex:
+    """Index multi-champs réparti en shards, interrogés en parallèle"""
+
+    def __init__(self, manifest, directory, processes=True):
+        """manifest: contenu de manifest.json ; processes=False garde les shards dans ce processus"""
+        self.fields = manifest.get('fields', [])
+        collection = {
+            'documents': manifest['documents'],
+            'average_lengths': manifest['average_lengths'],
+            'df': manifest['df'],
+        }
+        paths = [os.path.join(directory, name) for name in manifest['shards']]
+        self.processes = processes
+        if processes:
+            # spawn : un processus neuf par shard, sans hériter des threads du serveur
+            context = multiprocessing.get_context('spawn')
+            self.workers = [
+                ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                    initializer=_load_worker_shard, initargs=(path, collection))
+                for path in paths
+            ]
+            # Démarrage et chargement des shards tout de suite, pas à la première requête
+            for worker in self.workers:
+                worker.submit(int)
+            self.shards = []
+        else:
+            self.workers = []
+            self.shards = [open_shard(path, collection) for path in paths]
+            self.pool = ThreadPoolExecutor(max_workers=len(self.shards) or 1, thread_name_prefix='shard')
+
+    def top_k(self, text, boosts, limit=5):
+        """Top-'limit' fusionné des shards : [(fichier, score, [champs trouvés])], scores non arrondis"""
+        if self.processes:
+            futures = [worker.submit(_search_worker_shard, text, boosts, limit) for worker in self.workers]
+        else:
+            futures = [self.pool.submit(shard.top_k, text, boosts, limit) for shard in self.shards]
+        per_shard = [future.result() for future in futures]
+        return list(islice(heapq.merge(*per_shard, key=lambda hit: (-hit[1], hit[0])), limit))
+
+    def search(self, text, boosts, limit=5):
+        """Même contrat que FieldIndex.search"""
+        return [(filename, round(score, 4), fields) for filename, score, fields in self.top_k(text, boosts, limit)]
+
+    def close(self):
+        """Arrête les processus des shards (ancien index remplacé par une reconstruction)"""
+        for worker in self.workers:
+            worker.shutdown(wait=False)
+        if not self.processes:
+            self.pool.shutdown(wait=False)
@@ -0,0 +1,71 @@
+"""
+Scoring vectorisé de l'index inversé (matrice creuse SciPy CSR)
+- L'index est compilé une fois en matrice termes × documents
+- Une requête devient un vecteur creux de poids par terme : scores = q · M
+- Un lot de requêtes devient une matrice Q : scores = Q · M (un seul produit)
+- Top-k par argpartition ; égalités départagées par nom de fichier,
+  exactement comme rank_recipe_scores côté dictionnaire
+"""
+
+import numpy as np
+from scipy import sparse
+
+
+class SparseRecipeIndex:
+    """Index inversé compilé en matrice CSR (lignes = termes, colonnes = fichiers triés)"""
+
+    def __init__(self, inverted_index):
+        self.term_rows = {term: row for row, term in enumerate(inverted_index)}
+        # Colonnes triées par nom : l'indice de colonne sert de départage des égalités
+        self.filenames = sorted({f for recipe_files in inverted_index.values() for f in recipe_files})
+        columns = {filename: col for col, filename in enumerate(self.filenames)}
+
+        rows, cols = [], []
+        for row, recipe_files in enumerate(inverted_index.values()):
+            rows.extend([row] * len(recipe_files))
+            cols.extend(columns[f] for f in recipe_files)
+
+        # Un fichier listé deux fois pour un terme compte deux fois (comme add_score_to_recipes)
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(len(self.term_rows), len(self.filenames)),
+        )
+
+    @property
+    def num_documents(self):
+        return len(self.filenames)
+
+    def query_matrix(self, weights_list):
+        """Matrice creuse des requêtes : une ligne par dict {clé d'index: poids}"""
+        indptr, indices, data = [0], [], []
+        for weights in weights_list:
+            for term, weight in weights.items():
+                indices.append(self.term_rows[term])
+                data.append(weight)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), indptr),
+            shape=(len(weights_list), len(self.term_rows)),
+        )
+
+    def top_k(self, weights_list, limit=5):
+        """Top-k (fichier, score) de chaque requête, calculés par un seul produit Q · M"""
+        scores = self.query_matrix(weights_list) @ self.matrix
+        return [self._top_row(scores, i, limit) for i in range(len(weights_list))]
+
+    def _top_row(self, scores, i, limit):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        values = scores.data[start:end]
+        columns = scores.indices[start:end]
+
+        positive = values > 0
+        values, columns = values[positive], columns[positive]
+
+        if len(values) > limit:
+            # argpartition isole les k meilleurs en O(n) ; on garde aussi les ex æquo du k-ième
+            kth = values[np.argpartition(-values, limit - 1)[limit - 1]]
+            keep = values >= kth
+            values, columns = values[keep], columns[keep]
+
+        order = np.lexsort((columns, -values))[:limit]
+        return [(self.filenames[col], float(score)) for col, score in zip(columns[order], values[order])]
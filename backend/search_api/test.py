@@ -56,7 +56,8 @@ def load_inverted_index():
             abs_path = os.path.abspath(path)
             if os.path.exists(abs_path):
                 with open(abs_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                    # Format 2 : {"version", "analyzer", "terms": {terme: [fichiers]}}
+                    data = json.load(f)['terms']
                     print(f"   ✅ Inverted index chargé: {len(data)} entrées")
                     return data
         
@@ -267,7 +268,8 @@ def load_inverted_index():
             abs_path = os.path.abspath(path)
             if os.path.exists(abs_path):
                 with open(abs_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                    # Format 2 : {"version", "analyzer", "terms": {terme: [fichiers]}}
+                    data = json.load(f)['terms']
                     print(f"   ✅ Inverted index chargé: {len(data)} entrées")
                     return data
         
@@ -1,3 +1,977 @@
-from django.test import TestCase
+"""
+Tests de l'API de recherche
 
-# Create your tests here.
+Usage:
+    GEMINI_API_KEY=test python manage.py test search_api.tests
+
+(search_api/test.py est un ancien script de vues, pas un module de tests)
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import struct
+import tempfile
+import wave
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+
+from . import gemini_client, index_snapshot, views
+from .autocomplete import DENSE_RANGE, AutocompleteIndex, normalize_text
+from .image_search import local_recognizer
+from .indexing.Recipies.PythonScripts import build_similar_recipes, snapshots
+from .indexing.Recipies.PythonScripts.analyzer import ANALYZER_ID, QUERY_EXPANSIONS, analyze, built_with, fold_word
+from .field_index import FIELD_B, K1, FieldIndex
+from .indexing.Recipies.PythonScripts.build_duplicates import MAX_PAIRWISE_BUCKET, find_near_duplicates
+from .indexing.Recipies.PythonScripts.build_field_index import (
+    MANIFEST_FILE, STOP_WORDS, build_field_index, build_field_shards, recipe_fields,
+)
+from .indexing.Recipies.PythonScripts.build_inverted_index import StrictRecipeIndexer
+from .indexing.Recipies.PythonScripts.build_positional_index import LINE_GAP, build_positional_index
+from .indexing.Recipies.PythonScripts.generate_corpus import RecipeCorpusGenerator, write_recipe_files
+from .ingredient_bitmaps import EXCLUSION_GROUPS, IngredientBitmapIndex
+from .positional_index import PositionalIndex
+from .pruned_scoring import PrunedRecipeIndex
+from .sharded_search import ShardedFieldIndex
+from .sparse_scoring import SparseRecipeIndex
+from .text_search import darija_lexicon
+from .text_search.phrase_matcher import PhraseMatcher
+from .voice_search import preprocess
+
+RECIPES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indexing', 'Recipies', 'recipes')
+# (nom_recette, ingrédients visibles) comme les renvoie l'analyse d'image
+QUERIES = [
+    ('tagine', ['chicken', 'lemon', 'olives']),
+    ('harira', ['lentils', 'chickpeas', 'tomatoes']),
+    ('couscous', ['lamb', 'carrot']),
+    ('pastilla', ['almonds', 'cinnamon']),
+    ('plat marocain', ['honey', 'sesame', 'flour']),
+    ('', ['sardines']),
+]
+
+
+def exhaustive_top(query, inverted_index, limit=5):
+    """Top-k de référence : toutes les recettes notées (boucles dict), triées puis dédoublonnées"""
+    scores = views.score_recipes_by_analysis(*query, inverted_index)
+    ranked = views.rank_recipe_scores(scores, len(scores))
+    return views.collapse_duplicates(ranked, limit, views.load_duplicate_canonicals())
+
+
+def write_recipes(directory, recipes):
+    """Une recette JSON par fichier {nom de fichier: recette}"""
+    for filename, recipe in recipes.items():
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+            json.dump(recipe, f)
+
+
+def synthetic_index(size, seed=7):
+    """Index inversé d'un corpus généré (generate_corpus.py) : beaucoup d'ex æquo entre recettes"""
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        write_recipe_files(RecipeCorpusGenerator(RECIPES_DIR, seed), size, directory)
+        return StrictRecipeIndexer().build_index(directory)
+
+
+def random_weights(inverted_index, rng, count):
+    """Requêtes {clé d'index: poids} tirées au hasard, avec les poids de query_term_weights (5, 2, 2.5...)"""
+    terms = sorted(inverted_index)
+    return [
+        {term: rng.choice([0.5, 1.0, 2.0, 2.5, 5.0]) for term in rng.sample(terms, rng.randint(1, 8))}
+        for _ in range(count)
+    ]
+
+
+def dict_top(inverted_index, weights, limit):
+    """Top-k de référence d'une requête pondérée, par les boucles dict (add_score_to_recipes)"""
+    scores = {}
+    for term, weight in weights.items():
+        views.add_score_to_recipes(inverted_index[term], weight, scores)
+    return views.rank_recipe_scores(scores, limit)
+
+
+def wav_bytes(seconds, rate=8000, declared_seconds=None):
+    """WAV mono 16 bits ; declared_seconds réécrit la taille du bloc data annoncée dans l'en-tête"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(b'\x00\x00' * int(seconds * rate))
+    data = bytearray(buffer.getvalue())
+    if declared_seconds is not None:
+        struct.pack_into('<I', data, 40, int(declared_seconds * rate * 2))
+    return bytes(data)
+
+
+def mp3_bytes(seconds):
+    """MP3 CBR sans en-tête Xing : trames MPEG-1 Layer III 128 kb/s 44,1 kHz remplies de zéros"""
+    frame = b'\xff\xfb\x90\x64' + bytes(417 - 4)
+    return frame * int(seconds * 44100 / 1152)
+
+
+def upload(data, name):
+    audio = io.BytesIO(data)
+    audio.name = name
+    return audio
+
+
+class ApiTestCase(TestCase):
+    """Client de test sur /api/ ; tout appel à Gemini fait échouer le test"""
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+        patcher = mock.patch.object(gemini_client, 'get_client', side_effect=AssertionError('appel Gemini inattendu'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_json(self, url, body):
+        return self.client.post(url, data=body, content_type='application/json')
+
+    def assertError(self, response, status):
+        self.assertEqual(response.status_code, status)
+        self.assertFalse(response.json()['success'])
+
+
+class BenchSearchCommandTests(SimpleTestCase):
+    """Microbenchmarks (bench_search) sur un petit corpus synthétique, hors ligne"""
+
+    def test_report_and_comparison(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_search', sizes=[30], iterations=2, output=output, stdout=io.StringIO())
+            with open(output, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            self.assertEqual(report['meta']['iterations'], 2)
+            self.assertIn('StrictRecipeIndexer.build_index', report['results']['30'])
+            self.assertGreater(report['batch_throughput']['30']['queries'], 0)
+
+            # --compare relit le rapport précédent avant de l'écraser
+            stdout = io.StringIO()
+            call_command('bench_search', sizes=[30], iterations=2, output=output, compare=output, stdout=stdout)
+            self.assertIn('StrictRecipeIndexer.build_index', stdout.getvalue())
+
+
+class SearchBatchTests(ApiTestCase):
+    """search-batch/ : un lot évalué sur un même index, mêmes tops que les requêtes une à une"""
+
+    def test_invalid_json(self):
+        self.assertError(self.post_json('/api/search-batch/', '{"queries": ['), 400)
+        self.assertError(self.post_json('/api/search-batch/', '[1, 2]'), 400)
+        self.assertError(self.post_json('/api/search-batch/', '"tajine"'), 400)
+
+    def test_invalid_queries(self):
+        self.assertError(self.post_json('/api/search-batch/', '{}'), 400)
+        self.assertError(self.post_json('/api/search-batch/', '{"queries": "tajine"}'), 400)
+        self.assertError(self.post_json('/api/search-batch/', '{"queries": [{"nom_recette": ""}]}'), 400)
+        body = json.dumps({'queries': [{'nom_recette': 'tajine'}], 'limit': 'x'})
+        self.assertError(self.post_json('/api/search-batch/', body), 400)
+
+    @override_settings(SEARCH_BATCH_MAX_QUERIES=2)
+    def test_too_many_queries(self):
+        body = json.dumps({'queries': [{'nom_recette': 'tajine'}] * 3})
+        self.assertError(self.post_json('/api/search-batch/', body), 400)
+
+    @override_settings(SEARCH_SCORING_BACKEND='dict')
+    def test_same_top_as_single_queries(self):
+        inverted_index = views.load_inverted_index()
+        for query, top in zip(QUERIES, views.search_recipes_batch(QUERIES, inverted_index, 5)):
+            with self.subTest(query=query):
+                self.assertEqual(top, exhaustive_top(query, inverted_index))
+
+    def test_endpoint(self):
+        body = json.dumps({
+            'queries': [{'nom_recette': nom, 'ingredients_visibles': visibles} for nom, visibles in QUERIES[:2]],
+            'limit': 3,
+        })
+        response = self.post_json('/api/search-batch/', body)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['index'] for r in results], [0, 1])
+        for result in results:
+            self.assertTrue(1 <= result['count'] <= 3)
+
+
+class SparseScoringTests(SimpleTestCase):
+    """Produit matriciel CSR : mêmes tops (et même départage par nom de fichier) que les boucles dict"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.inverted_index = synthetic_index(400)
+        cls.sparse = SparseRecipeIndex(cls.inverted_index)
+
+    def test_same_top_k_as_dict_scoring(self):
+        weights_list = random_weights(self.inverted_index, random.Random(1), 200)
+        for limit in (1, 5, 50):
+            for weights, top in zip(weights_list, self.sparse.top_k(weights_list, limit)):
+                self.assertEqual(top, dict_top(self.inverted_index, weights, limit))
+
+    def test_file_listed_twice_counts_twice(self):
+        sparse = SparseRecipeIndex({'lemon': ['a.json', 'a.json', 'b.json'], 'olive': ['b.json']})
+        self.assertEqual(sparse.top_k([{'lemon': 1.0}], 5), [[('a.json', 2.0), ('b.json', 1.0)]])
+        self.assertEqual(sparse.top_k([{'lemon': 1.0, 'olive': 1.0}], 1), [[('a.json', 2.0)]])
+
+    def test_backends_agree_on_search(self):
+        inverted_index = views.load_inverted_index()
+        expected = [exhaustive_top(query, inverted_index) for query in QUERIES]
+        with override_settings(SEARCH_SCORING_BACKEND='sparse'):
+            self.assertIsInstance(views.get_scoring_index(inverted_index), SparseRecipeIndex)
+            self.assertEqual(views.search_recipes_batch(QUERIES, inverted_index, 5), expected)
+
+
+class SimilarRecipesTests(ApiTestCase):
+    """Table TF-IDF des voisins (build_similar_recipes.py) et recipes/<id>/similar/"""
+
+    def test_table(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_recipes(directory, {
+                'a.json': {'name': 'Chicken tagine', 'ingredients': ['chicken', 'preserved lemon', 'olives'],
+                           'steps': ['Simmer the chicken with lemon and olives']},
+                'b.json': {'name': 'Chicken with olives', 'ingredients': ['chicken', 'lemon', 'green olives'],
+                           'steps': ['Cook the chicken, add the olives']},
+                'c.json': {'name': 'Almond cookies', 'ingredients': ['almonds', 'sugar', 'flour'],
+                           'steps': ['Bake the cookies']},
+                'd.json': {'name': 'Honey cookies', 'ingredients': ['honey', 'sugar', 'flour'],
+                           'steps': ['Bake the cookies with honey']},
+                'e.json': {'name': 'Lentil soup', 'ingredients': ['lentils', 'tomato', 'cumin'],
+                           'steps': ['Simmer the lentils']},
+            })
+            table = build_similar_recipes.build_similarity_table(directory, top_k=2)
+            # Blocs d'une ligne : même table que le calcul en un bloc
+            with mock.patch.object(build_similar_recipes, 'BLOCK_CELLS', 1):
+                self.assertEqual(build_similar_recipes.build_similarity_table(directory, top_k=2), table)
+
+        self.assertEqual(sorted(table), ['a.json', 'b.json', 'c.json', 'd.json', 'e.json'])
+        self.assertEqual(table['a.json'][0][0], 'b.json')
+        self.assertEqual(table['c.json'][0][0], 'd.json')
+        for filename, neighbours in table.items():
+            self.assertLessEqual(len(neighbours), 2)
+            self.assertNotIn(filename, [f for f, _ in neighbours])
+            self.assertEqual(neighbours, sorted(neighbours, key=lambda n: (-n[1], n[0])))
+            self.assertTrue(all(score > 0 for _, score in neighbours))
+
+    def test_endpoint(self):
+        table = views.load_similar_recipes()
+        response = self.client.get('/api/recipes/7_tangia/similar/', {'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], 3)
+        self.assertEqual([r['similarity'] for r in body['similar_recipes']],
+                         [score for _, score in table['7_tangia.json'][:3]])
+
+    def test_errors(self):
+        self.assertError(self.client.get('/api/recipes/7_tangia/similar/', {'limit': 'x'}), 400)
+        self.assertError(self.client.get('/api/recipes/not_a_recipe/similar/'), 404)
+
+    def test_limit_capped(self):
+        response = self.client.get('/api/recipes/7_tangia/similar/', {'limit': 100000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], settings.SIMILAR_RECIPES_MAX_LIMIT)
+
+
+class DuplicateTests(SimpleTestCase):
+    """Quasi-doublons (MinHash/LSH) et top dédoublonné des recherches"""
+
+    def test_clusters(self):
+        term_sets = {
+            'b.json': {'chicken', 'lemon', 'olive', 'tagine', 'onion'},
+            'a.json': {'chicken', 'lemon', 'olive', 'tagine', 'onion'},
+            'c.json': {'chicken', 'lemon', 'olive', 'tagine', 'garlic'},
+            'd.json': {'almond', 'honey', 'flour', 'sugar'},
+        }
+        report = find_near_duplicates(term_sets)
+        self.assertEqual(report['analyzer'], ANALYZER_ID)
+        self.assertEqual(report['clusters'], [['a.json', 'b.json']])
+        # La recette canonique d'un groupe est le plus petit nom de fichier
+        self.assertEqual(report['canonical'], {'b.json': 'a.json'})
+        # Jaccard 4/6 : assez proche pour être signalé, pas un doublon
+        self.assertIn(['a.json', 'c.json', 0.6667], report['pairs'])
+
+    def test_large_bucket(self):
+        term_sets = {f'{i:03d}.json': {'harira', 'lentil', 'chickpea', 'tomato'} for i in range(MAX_PAIRWISE_BUCKET + 10)}
+        report = find_near_duplicates(term_sets)
+        self.assertEqual(report['clusters'], [sorted(term_sets)])
+        self.assertEqual(set(report['canonical'].values()), {'000.json'})
+
+    def test_top_refilled_past_a_large_cluster(self):
+        # 20 variantes d'une même recette devant 10 recettes distinctes
+        scores = {f'dup{i:02d}.json': 10.0 for i in range(20)}
+        scores.update({f'other{i}.json': float(10 - i) / 2 for i in range(10)})
+        canonical = {f'dup{i:02d}.json': 'dup00.json' for i in range(1, 20)}
+        top = views.top_distinct(lambda k: views.rank_recipe_scores(scores, k), 5, canonical)
+        self.assertEqual(top, [('dup00.json', 10.0), ('other0.json', 5.0), ('other1.json', 4.5),
+                               ('other2.json', 4.0), ('other3.json', 3.5)])
+        # Moins de groupes que demandé : tous les groupes, sans boucler
+        top = views.top_distinct(lambda k: views.rank_recipe_scores(scores, k), 50, canonical)
+        self.assertEqual(len(top), 11)
+
+    def test_search_collapses_large_cluster(self):
+        inverted_index = views.load_inverted_index()
+        query = ('tagine', ['chicken', 'lemon'])
+        scores = views.score_recipes_by_analysis(*query, inverted_index)
+        ranked = views.rank_recipe_scores(scores, len(scores))
+        # Les 30 premières recettes forment un seul groupe : le top doit aller les chercher au-delà
+        canonical = {filename: ranked[0][0] for filename, _ in ranked[1:30]}
+        with mock.patch.object(views, 'load_duplicate_canonicals', return_value=canonical):
+            expected = exhaustive_top(query, inverted_index)
+            self.assertEqual(len(expected), 5)
+            for backend in ('dict', 'maxscore', 'sparse'):
+                with self.subTest(backend=backend), override_settings(SEARCH_SCORING_BACKEND=backend):
+                    self.assertEqual(views.search_recipes_batch([query], inverted_index, 5), [expected])
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        found = views.search_recipes_by_analysis(*query, inverted_index)
+                    self.assertEqual([r['match_score'] for r in found], [score for _, score in expected])
+
+    @override_settings(SEARCH_COLLAPSE_DUPLICATES=False)
+    def test_collapse_disabled(self):
+        self.assertEqual(views.load_duplicate_canonicals(), {})
+
+
+class LocalRecognizerTests(SimpleTestCase):
+    """Photos de référence reconnues sans Gemini ; repli local quand Gemini est limité"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(local_recognizer.DESCRIPTORS_PATH, 'r', encoding='utf-8') as f:
+            cls.descriptors = json.load(f)
+        cls.reference = cls.descriptors['references'][0]
+        with open(os.path.join(local_recognizer.IMAGES_DIR, cls.reference['image']), 'rb') as f:
+            cls.photo = f.read()
+
+    def setUp(self):
+        patcher = mock.patch.object(views, 'analyze_image_with_gemini',
+                                    return_value={'nom_recette': 'couscous', 'ingredients_visibles': []})
+        self.gemini = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def noise_photo(self):
+        from PIL import Image
+        rng = np.random.default_rng(0)
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def test_labels_match_recipes(self):
+        # Étiquettes de image_descriptors.json : celles que déduirait une reconstruction
+        labels = local_recognizer.label_references()
+        for reference in self.descriptors['references']:
+            with self.subTest(image=reference['image']):
+                expected = labels[reference['image']]
+                self.assertEqual(reference['nom_recette'], expected['nom_recette'])
+                self.assertEqual(reference['recipes'], expected['recipes'])
+
+    def test_reference_photo_recognized_locally(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            analysis = views.recognize_dish(self.photo)
+        self.assertEqual(analysis['source'], 'local')
+        self.assertEqual(analysis['nom_recette'], self.reference['nom_recette'])
+        self.assertEqual(analysis['reference'], self.reference['image'])
+        self.assertGreaterEqual(analysis['confidence'], 0.99)
+        self.gemini.assert_not_called()
+
+    def test_unknown_photo_goes_to_gemini(self):
+        photo = self.noise_photo()
+        self.assertLess(views.recognize_dish_locally(photo)['confidence'], settings.IMAGE_LOCAL_CONFIDENT)
+        with contextlib.redirect_stdout(io.StringIO()):
+            analysis = views.recognize_dish(photo)
+        self.assertEqual(analysis, {'nom_recette': 'couscous', 'ingredients_visibles': [], 'source': 'gemini'})
+
+    @override_settings(IMAGE_LOCAL_CONFIDENT=1.01)
+    def test_local_fallback_when_rate_limited(self):
+        self.gemini.side_effect = gemini_client.RateLimitedError()
+        with contextlib.redirect_stdout(io.StringIO()):
+            analysis = views.recognize_dish(self.photo)
+            self.assertEqual(analysis['source'], 'local_fallback')
+            with override_settings(IMAGE_LOCAL_FALLBACK_MIN=1.01), \
+                    self.assertRaises(gemini_client.RateLimitedError):
+                views.recognize_dish(self.photo)
+
+    @override_settings(IMAGE_LOCAL_RECOGNIZER=False)
+    def test_disabled(self):
+        self.assertIsNone(views.recognize_dish_locally(self.photo))
+
+
+class WhatCanICookTests(ApiTestCase):
+    """what-can-i-cook/ : masques d'ingrédients, exclusions par ingrédient ou par famille"""
+
+    def brute_force(self, inverted_index, vocabulary, have, exclude, limit, max_missing=None):
+        recipes = {}
+        for ingredient in vocabulary:
+            for filename in inverted_index.get(ingredient, []):
+                recipes.setdefault(filename, set()).add(ingredient)
+        ranked = []
+        for filename, ingredients in recipes.items():
+            matched = len(ingredients & have)
+            missing = sorted(ingredients - have)
+            if matched and not ingredients & exclude and (max_missing is None or len(missing) <= max_missing):
+                ranked.append((filename, matched / len(ingredients), matched, missing))
+        return sorted(ranked, key=lambda r: (-r[1], len(r[3]), r[0]))[:limit]
+
+    def test_bitmaps_match_brute_force(self):
+        inverted_index = synthetic_index(300)
+        vocabulary = views.INGREDIENT_EXTRACTOR.valid_ingredients
+        bitmaps = IngredientBitmapIndex(inverted_index, vocabulary)
+        rng = random.Random(3)
+        present = sorted(v for v in vocabulary if v in inverted_index)
+        for _ in range(100):
+            have = set(rng.sample(present, rng.randint(1, 10)))
+            exclude = set(rng.sample(present, rng.randint(0, 2))) - have
+            max_missing = rng.choice([None, 0, 2, 5])
+            limit = rng.choice([1, 10, 50])
+            self.assertEqual(
+                bitmaps.query(have, exclude, limit, max_missing),
+                self.brute_force(inverted_index, vocabulary, have, exclude, limit, max_missing),
+            )
+
+    def test_invalid_body(self):
+        self.assertError(self.post_json('/api/what-can-i-cook/', 'not json'), 400)
+        self.assertError(self.post_json('/api/what-can-i-cook/', '["chicken"]'), 400)
+        self.assertError(self.post_json('/api/what-can-i-cook/', '{"ingredients": "chicken"}'), 400)
+        self.assertError(self.post_json('/api/what-can-i-cook/', '{"ingredients": ["chicken"], "limit": "x"}'), 400)
+
+    def test_no_known_ingredient(self):
+        response = self.post_json('/api/what-can-i-cook/', '{"ingredients": ["zzqx"]}')
+        self.assertError(response, 400)
+        self.assertEqual(response.json()['unknown_ingredients'], ['zzqx'])
+
+    def test_exclusion_expands_families(self):
+        inverted_index = views.load_inverted_index()
+        for excluded in ('fish', 'Fish fillets', 'no seafood'):
+            with self.subTest(excluded=excluded):
+                body = json.dumps({'ingredients': ['tomato', 'onion', 'garlic', 'lemon'], 'exclude': [excluded],
+                                   'limit': 50})
+                response = self.post_json('/api/what-can-i-cook/', body)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertLessEqual(EXCLUSION_GROUPS['fish'], set(data['excluded']))
+                self.assertGreater(data['count'], 0)
+                for recipe in data['recipes']:
+                    for ingredient in EXCLUSION_GROUPS['fish']:
+                        self.assertNotIn(f"{recipe['id']}.json", inverted_index.get(ingredient, []))
+
+    def test_exclusion_of_one_ingredient(self):
+        response = self.post_json('/api/what-can-i-cook/', '{"ingredients": ["tomato"], "exclude": ["sardines"]}')
+        self.assertEqual(response.json()['excluded'], ['sardine'])
+
+
+class AutocompleteTests(ApiTestCase):
+    """Complétion de préfixes : classement par fréquence, mots de titre, bornes de 'limit'"""
+
+    def test_ranking(self):
+        index = AutocompleteIndex(
+            {'chicken': 40, 'chickpea': 12, 'cumin': 30, 'ras-el-hanout': 19},
+            [('Tajine de poulet', '16'), ('Tajine de poulet', '17'), ('Chicken Pastilla', '24'), ('Crème brûlée', None)],
+        )
+        self.assertEqual([s['text'] for s in index.complete('chi')], ['chicken', 'chickpea', 'Chicken Pastilla'])
+        # Titre trouvé par un mot du milieu, poids = nombre de recettes qui le portent
+        self.assertEqual(index.complete('poul'), [{'text': 'Tajine de poulet', 'type': 'recipe', 'weight': 2, 'id': '16'}])
+        self.assertEqual([s['text'] for s in index.complete('Ras El')], ['ras-el-hanout'])
+        self.assertEqual([s['text'] for s in index.complete('creme b')], ['Crème brûlée'])
+        self.assertEqual([s['text'] for s in index.complete('c', limit=2)], ['chicken', 'cumin'])
+        self.assertEqual(index.complete('  '), [])
+        self.assertEqual(index.complete('zz'), [])
+
+    def test_dense_prefixes_match_brute_force(self):
+        rng = random.Random(5)
+        terms = {''.join(rng.choice('abc') for _ in range(rng.randint(2, 9))): rng.randint(1, 50) for _ in range(3000)}
+        index = AutocompleteIndex(terms, [], max_suggestions=60)
+        expected_order = sorted(terms, key=lambda t: (-terms[t], t))
+        lo, hi = index.prefix_range('a')
+        self.assertGreater(hi - lo, DENSE_RANGE)
+        # Deux passages sur 'a' et 'b' : le second lit le top mémorisé
+        for prefix in ('a', 'b', 'ab', 'ca', 'abc', 'a', 'b'):
+            for limit in (5, 60, 100):
+                with self.subTest(prefix=prefix, limit=limit):
+                    expected = [t for t in expected_order if t.startswith(prefix)][:min(limit, 60)]
+                    self.assertEqual([s['text'] for s in index.complete(prefix, limit)], expected)
+
+    def test_endpoint_limits(self):
+        self.assertError(self.client.get('/api/autocomplete/', {'q': 'taj', 'limit': 'x'}), 400)
+        response = self.client.get('/api/autocomplete/', {'q': 'c', 'limit': 1000})
+        self.assertEqual(response.json()['count'], settings.AUTOCOMPLETE_MAX_LIMIT)
+        # Une borne relevée par la configuration est respectée, y compris pour les préfixes mémorisés
+        with override_settings(AUTOCOMPLETE_MAX_LIMIT=30):
+            response = self.client.get('/api/autocomplete/', {'q': 'c', 'limit': 1000})
+            self.assertEqual(response.json()['count'], 30)
+            suggestions = response.json()['suggestions']
+            self.assertTrue(all(normalize_text(s['text']).startswith('c') or ' c' in normalize_text(s['text'])
+                                for s in suggestions))
+
+
+class DarijaLexiconTests(ApiTestCase):
+    """Résolution locale des requêtes darija / françaises ; le reste part vers Gemini"""
+
+    def resolve(self, text):
+        return darija_lexicon.resolve_query(text, views.load_inverted_index(), views.STOP_WORDS)
+
+    def test_known_words_resolve_locally(self):
+        self.assertEqual(self.resolve('bghit tajine djaj b l7amed'), (['tajine', 'chicken', 'lemon'], []))
+        self.assertEqual(self.resolve('bghit ldjaj m3a btata'), (['chicken', 'potato'], []))
+        self.assertEqual(self.resolve('pomme de terre et ras el hanout'), (['potato', 'ras-el-hanout'], []))
+        self.assertEqual(self.resolve('bghit msmen'), (['msemen'], []))
+        # rghaif est un plat à part entière de l'index, pas un msemen
+        self.assertEqual(self.resolve('bghit rghayef'), (['rghaif'], []))
+        self.assertEqual(self.resolve('ka3b el ghzal'), (['kaab_ghzal'], []))
+
+    def test_unknown_words_fall_back(self):
+        self.assertEqual(self.resolve('bghit fromage qwerty'), (['cheese'], ['qwerty']))
+        # Un aliment traduit vers un terme absent de l'index est inconnu
+        self.assertEqual(darija_lexicon.resolve_query('btata', {'tomato'}), ([], ['btata']))
+        self.assertEqual(darija_lexicon.resolve_query('btata'), (['potato'], []))
+
+    def test_targets_are_index_terms(self):
+        inverted_index = views.load_inverted_index()
+        self.assertEqual({t for t in darija_lexicon.FOOD_EXACT.values() if t not in inverted_index}, set())
+
+    def test_endpoint_uses_lexicon_without_gemini(self):
+        response = self.post_json('/api/text-search/', {'text': 'bghit tajine djaj'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['analysis_source'], 'lexicon')
+        self.assertGreater(response.json()['count'], 0)
+        with mock.patch.object(gemini_client, 'generate_content',
+                               return_value=mock.Mock(text='vegetables')) as generate:
+            response = self.post_json('/api/text-search/', {'text': 'bghit khodra'})
+        generate.assert_called_once()
+        self.assertEqual(response.json()['analysis_source'], 'gemini')
+
+
+class PhraseMatcherTests(SimpleTestCase):
+    """Automate d'Aho-Corasick des requêtes texte, comparé à un balayage naïf"""
+
+    @staticmethod
+    def naive_matches(phrases, text):
+        matches = set()
+        for phrase, value in phrases.items():
+            start = text.find(phrase)
+            while start != -1:
+                end = start + len(phrase)
+                if end < len(text) and text[end] == 's' and (end + 1 == len(text) or text[end + 1] == ' '):
+                    end += 1
+                if (start == 0 or text[start - 1] == ' ') and (end == len(text) or text[end] == ' '):
+                    matches.add((start, end, phrase, value))
+                start = text.find(phrase, start + 1)
+        return matches
+
+    def test_matches_naive_scan(self):
+        rng = random.Random(11)
+        words = ['ab', 'ba', 'aba', 'b', 'abab', 'bab']
+        for _ in range(200):
+            phrases = {' '.join(rng.choice(words) for _ in range(rng.randint(1, 3))): i for i in range(6)}
+            text = ' '.join(rng.choice(words + ['abs', 'bas']) for _ in range(rng.randint(1, 12)))
+            with self.subTest(text=text, phrases=phrases):
+                matcher = PhraseMatcher(phrases)
+                self.assertEqual(set(matcher.iter_matches(text)), self.naive_matches(phrases, text))
+
+    def test_leftmost_longest_without_overlap(self):
+        matcher = PhraseMatcher({'pomme': 1, 'pomme de terre': 2, 'terre': 3, 'ail': 4})
+        self.assertEqual([m[3] for m in matcher.find('pomme de terre et ail')], [2, 4])
+        self.assertEqual(matcher.find('tail'), [])
+
+    def test_analyze_text_query(self):
+        self.assertEqual(views.analyze_text_query('Je veux un tajine au poulet avec pommes de terre et olives'),
+                         {'nom_recette': 'tajine', 'ingredients_visibles': ['chicken', 'potato', 'olive']})
+        self.assertEqual(views.analyze_text_query('couscous agneau carottes'),
+                         {'nom_recette': 'couscous', 'ingredients_visibles': ['lamb', 'carrot']})
+        # Le premier plat du texte donne le nom, quel que soit l'ordre des ensembles
+        self.assertEqual(views.analyze_text_query('harira puis couscous')['nom_recette'], 'harira')
+        self.assertEqual(views.analyze_text_query('the tail of a fish')['ingredients_visibles'], ['fish'])
+
+
+class PositionalIndexTests(ApiTestCase):
+    """Expressions exactes et proches sur un petit corpus construit à la volée"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with tempfile.TemporaryDirectory() as directory:
+            write_recipes(directory, {
+                'a_exact.json': {
+                    'name': 'Chicken with preserved lemon',
+                    'ingredients': ['1 chicken', '2 preserved lemons'],
+                    'steps': ['Add the preserved lemon and the olives'],
+                },
+                'b_gap.json': {'name': 'Lamb tagine', 'ingredients': ['1 preserved sweet lemon'], 'steps': []},
+                'c_reversed.json': {'name': 'Lemon cake', 'ingredients': ['lemon preserved in salt'], 'steps': []},
+                'd_lines.json': {'name': 'Salad', 'ingredients': ['salt preserved', 'lemon juice'], 'steps': []},
+            })
+            cls.index = PositionalIndex(build_positional_index(directory))
+
+    def test_exact_phrase(self):
+        # Titre, ingrédient (pluriel ramené au singulier) et étape de a_exact
+        self.assertEqual(self.index.phrase('preserved lemon'), {'a_exact.json': 3})
+        self.assertEqual(self.index.phrase('lemon preserved'), {'c_reversed.json': 1})
+
+    def test_slop_allows_words_between(self):
+        self.assertNotIn('b_gap.json', self.index.phrase('preserved lemon', slop=0))
+        self.assertEqual(self.index.phrase('preserved lemon', slop=1), {'a_exact.json': 3, 'b_gap.json': 1})
+
+    def test_phrase_never_spans_two_lines(self):
+        # Slop au-delà de l'écart entre deux lignes : ramené à line_gap - 1
+        self.assertNotIn('d_lines.json', self.index.phrase('preserved lemon', slop=LINE_GAP * 4))
+
+    def test_unknown_words(self):
+        self.assertEqual(self.index.phrase('saffron pistachio'), {})
+        self.assertEqual(self.index.phrase(''), {})
+
+    def test_endpoint(self):
+        self.assertError(self.client.get('/api/phrase-search/', {'q': 'preserved lemon', 'slop': 'x'}), 400)
+        response = self.client.get('/api/phrase-search/', {'q': 'preserved lemon', 'slop': 1000})
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(response.json()['slop'], 1000)
+        self.assertTrue(all(recipe['phrase_count'] > 0 for recipe in response.json()['recipes']))
+
+
+class FieldIndexTests(ApiTestCase):
+    """BM25F multi-champs comparé à un calcul direct sur les recettes"""
+
+    QUERIES = ['tajine poulet citron', 'preserved lemon olives', 'harira', 'msemen honey', 'saffron', 'zzqx']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.index = FieldIndex(build_field_index(RECIPES_DIR))
+        cls.fields = {}
+        for filename in cls.index.documents:
+            with open(os.path.join(RECIPES_DIR, filename), 'r', encoding='utf-8') as f:
+                cls.fields[filename] = recipe_fields(json.load(f))
+
+    def naive_scores(self, text, boosts):
+        n_docs = len(self.fields)
+        average = {field: sum(len(f[field]) for f in self.fields.values()) / n_docs for field in FIELD_B}
+        scores = {}
+        for term in dict.fromkeys(t for t in analyze(text) if t not in STOP_WORDS):
+            df = sum(any(term in f[field] for field in FIELD_B) for f in self.fields.values())
+            if not df:
+                continue
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for filename, fields in self.fields.items():
+                tf = sum(
+                    boosts[field] * fields[field].count(term)
+                    / (1.0 - FIELD_B[field] + FIELD_B[field] * len(fields[field]) / average[field])
+                    for field in FIELD_B
+                )
+                if tf:
+                    scores[filename] = scores.get(filename, 0.0) + idf * tf * (K1 + 1.0) / (tf + K1)
+        return scores
+
+    def test_matches_naive_bm25f(self):
+        for boosts in ({'title': 3.0, 'ingredients': 2.0, 'steps': 1.0}, {'title': 0.0, 'ingredients': 1.0, 'steps': 5.0}):
+            for query in self.QUERIES:
+                with self.subTest(query=query, boosts=boosts):
+                    expected = sorted(self.naive_scores(query, boosts).items(), key=lambda item: (-item[1], item[0]))[:8]
+                    ranked = self.index.top_k(query, boosts, 8)
+                    self.assertEqual([filename for filename, *_ in ranked], [filename for filename, _ in expected])
+                    for (_, score, _), (_, reference) in zip(ranked, expected):
+                        self.assertAlmostEqual(score, reference)
+
+    def test_matched_fields(self):
+        for filename, _, fields in self.index.top_k('harira', {'title': 1.0, 'ingredients': 0.0, 'steps': 1.0}, 3):
+            self.assertNotIn('ingredients', fields)
+            self.assertEqual(fields, [f for f in ('title', 'steps') if 'harira' in self.fields[filename][f]])
+
+    def test_endpoint(self):
+        self.assertError(self.client.get('/api/fulltext-search/', {'q': 'tajine', 'limit': 'x'}), 400)
+        self.assertError(self.client.get('/api/fulltext-search/', {'q': 'tajine', 'boost_title': 'x'}), 400)
+        response = self.client.get('/api/fulltext-search/', {'q': 'harira', 'boost_steps': -1, 'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['boosts']['steps'], 0.0)
+        self.assertLessEqual(response.json()['count'], 3)
+        self.assertTrue(all('steps' not in recipe['matched_fields'] for recipe in response.json()['recipes']))
+
+
+class AnalyzerTests(ApiTestCase):
+    """Chaîne d'analyse partagée : artefacts livrés, orthographes et occasions des requêtes"""
+
+    ARTIFACTS = ['inverted_index.json', 'positional_index.json', 'field_index.json', 'term_statistics.json',
+                 'document_metadata.json', 'duplicates.json']
+    # Recettes sans numéro, indexées depuis la reconstruction avec l'analyseur
+    UNNUMBERED = ['bastila.json', 'batbout.json', 'couscous.json', 'harira.json', 'poulet.json', 'taginedepoulet.json']
+
+    def test_artifacts_stamped_with_current_analyzer(self):
+        for name in self.ARTIFACTS:
+            with self.subTest(artifact=name):
+                with open(os.path.join(RECIPES_DIR, '..', name), 'r', encoding='utf-8') as f:
+                    self.assertEqual(built_with(json.load(f)), ANALYZER_ID)
+
+    def test_shipped_index_is_a_rebuild(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            rebuilt = StrictRecipeIndexer().build_index(RECIPES_DIR)
+        self.assertEqual(rebuilt, views.load_inverted_index())
+        indexed = {filename for files in rebuilt.values() for filename in files}
+        self.assertEqual(set(self.UNNUMBERED) - indexed, set())
+
+    def test_folding_is_idempotent(self):
+        for filename in os.listdir(RECIPES_DIR):
+            with open(os.path.join(RECIPES_DIR, filename), 'r', encoding='utf-8') as f:
+                recipe = json.load(f)
+            for text in [recipe.get('name', '')] + recipe.get('ingredients', []):
+                for term in analyze(text):
+                    self.assertEqual(fold_word(term), term)
+        # Chaque clé de l'index est retrouvée telle quelle par la normalisation des requêtes
+        for key in views.load_inverted_index():
+            self.assertIn(key, views.normalize_keyword(key).split())
+
+    def test_spellings_and_occasions_find_recipes(self):
+        inverted_index = views.load_inverted_index()
+        self.assertEqual({t for terms in QUERY_EXPANSIONS.values() for t in terms} - set(inverted_index), set())
+        for query, dish in [('bastilla', 'pastilla'), ('tanjia', 'tang'), ('chbakiya', 'chebakia'), ('kaab', 'kaab_ghzal')]:
+            with self.subTest(query=query):
+                recipes = views.search_recipes_by_analysis(query, [], inverted_index)
+                self.assertTrue(recipes)
+                self.assertTrue(all(dish in recipe['id'] for recipe in recipes))
+        for occasion in ('ramadan', 'aid', 'festival', 'wedding'):
+            with self.subTest(query=occasion):
+                self.assertEqual(len(views.search_recipes_by_analysis(occasion, [], inverted_index)), 5)
+
+
+class ShardedFieldIndexTests(SimpleTestCase):
+    """Index par champ découpé en shards : mêmes résultats que l'index unique"""
+
+    QUERIES = ['tajine poulet citron', 'preserved lemon olives', 'harira', 'couscous', 'msemen honey', 'saffron']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.full = FieldIndex(build_field_index(RECIPES_DIR))
+        build_field_shards(RECIPES_DIR, cls.directory.name, 3, workers=1)
+        with open(os.path.join(cls.directory.name, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            cls.manifest = json.load(f)
+        cls.sharded = ShardedFieldIndex(cls.manifest, cls.directory.name, processes=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded.close()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def test_manifest(self):
+        self.assertEqual(built_with(self.manifest), ANALYZER_ID)
+        self.assertEqual(len(self.manifest['shards']), 3)
+        self.assertEqual(self.manifest['documents'], len(self.full.documents))
+
+    def test_same_results_as_single_index(self):
+        for boosts in (settings.SEARCH_FIELD_BOOSTS, {'title': 1, 'ingredients': 5, 'steps': 0.5}):
+            for query in self.QUERIES:
+                with self.subTest(query=query, boosts=boosts):
+                    expected = self.full.search(query, boosts, 10)
+                    self.assertTrue(expected)
+                    self.assertEqual(self.sharded.search(query, boosts, 10), expected)
+                    self.assertEqual(self.sharded.search(query, boosts, 3), expected[:3])
+
+    def test_shard_processes(self):
+        sharded = ShardedFieldIndex(self.manifest, self.directory.name, processes=True)
+        try:
+            boosts = settings.SEARCH_FIELD_BOOSTS
+            self.assertEqual(sharded.search('harira', boosts, 5), self.full.search('harira', boosts, 5))
+        finally:
+            sharded.close()
+
+
+class PrunedScoringTests(SimpleTestCase):
+    """MaxScore : mêmes tops (et même départage par nom de fichier) que les boucles dict"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.inverted_index = synthetic_index(400, seed=3)
+        cls.pruned = PrunedRecipeIndex(cls.inverted_index)
+
+    def test_same_top_k_as_dict_scoring(self):
+        weights_list = random_weights(self.inverted_index, random.Random(2), 200)
+        for limit in (1, 5, 50):
+            for weights, top in zip(weights_list, self.pruned.top_k(weights_list, limit)):
+                self.assertEqual(top, dict_top(self.inverted_index, weights, limit))
+
+    def test_file_listed_twice_counts_twice(self):
+        pruned = PrunedRecipeIndex({'lemon': ['a.json', 'a.json', 'b.json'], 'olive': ['b.json']})
+        self.assertEqual(pruned.top_k([{'lemon': 1.0}], 5), [[('a.json', 2.0), ('b.json', 1.0)]])
+        self.assertEqual(pruned.top_k([{'lemon': 1.0, 'olive': 1.0}], 1), [[('a.json', 2.0)]])
+        self.assertEqual(pruned.top_k([{}], 5), [[]])
+
+    def test_backends_agree_on_search(self):
+        inverted_index = views.load_inverted_index()
+        expected = [exhaustive_top(query, inverted_index) for query in QUERIES]
+        with override_settings(SEARCH_SCORING_BACKEND='maxscore'):
+            self.assertIsInstance(views.get_scoring_index(inverted_index), PrunedRecipeIndex)
+            self.assertEqual(views.search_recipes_batch(QUERIES, inverted_index, 5), expected)
+        # auto : MaxScore sous SPARSE_SCORING_MIN_DOCS, CSR au-dessus
+        with override_settings(SEARCH_SCORING_BACKEND='auto', SPARSE_SCORING_MIN_DOCS=10 ** 9):
+            self.assertIsInstance(views.get_scoring_index(inverted_index), PrunedRecipeIndex)
+        with override_settings(SEARCH_SCORING_BACKEND='auto', SPARSE_SCORING_MIN_DOCS=1):
+            self.assertIsInstance(views.get_scoring_index(inverted_index), SparseRecipeIndex)
+
+
+class SnapshotTests(SimpleTestCase):
+    """Snapshots versionnés : publication atomique, retour arrière, nettoyage, snapshot figé par requête"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+
+    def build(self, content):
+        staging = snapshots.begin_snapshot(self.root)
+        with open(os.path.join(staging, 'inverted_index.json'), 'w', encoding='utf-8') as f:
+            f.write(content)
+        # Une construction en cours n'est ni listée ni servie
+        self.assertNotIn(os.path.basename(staging), snapshots.list_snapshots(self.root))
+        return snapshots.commit_snapshot(self.root, staging, ['inverted_index.json'])
+
+    def test_publish_and_rollback(self):
+        first, second = self.build('1'), self.build('2')
+        self.assertEqual(snapshots.list_snapshots(self.root), [first, second])
+        self.assertEqual(snapshots.current_version(self.root), second)
+        with open(os.path.join(self.root, snapshots.CURRENT_LINK, snapshots.MANIFEST), 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['analyzer'], ANALYZER_ID)
+        self.assertEqual(snapshots.rollback(self.root), first)
+        self.assertEqual(snapshots.current_version(self.root), first)
+        self.assertRaises(ValueError, snapshots.rollback, self.root)
+        self.assertRaises(ValueError, snapshots.publish, self.root, 'missing')
+        self.assertEqual(snapshots.rollback(self.root, second), second)
+
+    def test_prune_keeps_current_and_recent_staging(self):
+        versions = [self.build(str(i)) for i in range(4)]
+        snapshots.rollback(self.root, versions[0])
+        stale, running = snapshots.begin_snapshot(self.root), snapshots.begin_snapshot(self.root)
+        old = os.path.getmtime(stale) - snapshots.STALE_STAGING_SECONDS - 1
+        os.utime(stale, (old, old))
+        self.assertEqual(snapshots.prune(self.root, keep=2), [versions[1]])
+        self.assertEqual(snapshots.list_snapshots(self.root), [versions[0]] + versions[2:])
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(running))
+
+    def test_request_reads_one_snapshot(self):
+        first = self.build('1')
+        with mock.patch.object(index_snapshot, 'INDEX_DIR', self.root):
+            path = os.path.join(self.root, 'inverted_index.json')
+            self.assertEqual(index_snapshot.artifact_path(path),
+                             os.path.join(self.root, snapshots.SNAPSHOTS_DIR, first, 'inverted_index.json'))
+            outside = os.path.join(RECIPES_DIR, 'x.json')
+            self.assertEqual(index_snapshot.artifact_path(outside), os.path.abspath(outside))
+
+            token = index_snapshot.pin_snapshot()
+            try:
+                second = self.build('2')
+                # La requête en cours garde son snapshot ; les suivantes lisent le nouveau
+                self.assertIn(first, index_snapshot.artifact_path(path))
+                self.assertTrue(index_snapshot.is_stale(index_snapshot.artifact_path(path)))
+            finally:
+                index_snapshot.unpin_snapshot(token)
+            self.assertIn(second, index_snapshot.artifact_path(path))
+            self.assertFalse(index_snapshot.is_stale(index_snapshot.artifact_path(path)))
+
+    def test_flat_layout_without_current_link(self):
+        with mock.patch.object(index_snapshot, 'INDEX_DIR', self.root):
+            path = os.path.join(self.root, 'inverted_index.json')
+            self.assertEqual(index_snapshot.artifact_path(path), path)
+            self.assertFalse(index_snapshot.is_stale(path))
+
+
+class TranscribeTests(ApiTestCase):
+    """Réception des fichiers audio : refus (400, 413, 415) avant tout appel à Gemini"""
+
+    def test_without_file(self):
+        self.assertError(self.client.post('/api/transcribe/', {}), 400)
+
+    def test_unknown_format(self):
+        self.assertError(self.client.post('/api/transcribe/', {'audio': upload(b'not audio at all' * 64, 'a.wav')}), 415)
+
+    @override_settings(AUDIO_MAX_BYTES=64 * 1024)
+    def test_too_large(self):
+        self.assertError(self.client.post('/api/transcribe/', {'audio': upload(wav_bytes(20, rate=16000), 'clip.wav')}), 413)
+
+    @override_settings(AUDIO_MAX_SECONDS=30)
+    def test_declared_too_long(self):
+        # Durée annoncée dans l'en-tête : refus avant de recevoir le reste du fichier
+        audio = upload(wav_bytes(1, declared_seconds=120), 'clip.wav')
+        self.assertError(self.client.post('/api/transcribe/', {'audio': audio}), 413)
+
+    @override_settings(AUDIO_MAX_SECONDS=5)
+    def test_container_too_long(self):
+        # Pas de durée dans l'en-tête MP3 : lue dans le fichier reçu
+        self.assertError(self.client.post('/api/transcribe/', {'audio': upload(mp3_bytes(8), 'clip.mp3')}), 413)
+
+    @override_settings(AUDIO_PREPROCESS=False, AUDIO_SPOOL_MEMORY_BYTES=1024)
+    def test_accepted_clip_is_uploaded_as_received(self):
+        data = wav_bytes(2)
+        client = mock.Mock()
+        client.files.get.return_value = mock.Mock(state='ACTIVE')
+        client.models.generate_content.return_value = mock.Mock(
+            text='TRANSCRIPTION: bghit tajine\nTRANSLATION: I want a tagine')
+        uploaded = []
+        client.files.upload.side_effect = lambda file, config: uploaded.append((file.read(), config)) or mock.Mock()
+        with mock.patch.object(gemini_client, 'get_client', return_value=client):
+            response = self.client.post('/api/transcribe/', {'audio': upload(data, 'clip.wav')})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['translation'], 'I want a tagine')
+        # Fichier passé par le disque (au-delà de AUDIO_SPOOL_MEMORY_BYTES) puis envoyé intact
+        self.assertEqual(uploaded, [(data, {'mime_type': 'audio/x-wav'})])
+
+
+@override_settings(AUDIO_FFMPEG='')
+class AudioPreprocessTests(ApiTestCase):
+    """Prétraitement sans ffmpeg : WAV décodé, mono 16 kHz, silences retirés, en-têtes invalides refusés"""
+
+    @staticmethod
+    def stereo_wav(rate=44100):
+        """1 s de silence, 1 s de la 440 Hz (canal gauche seulement), 1 s de silence ; stéréo 16 bits"""
+        tone = 0.5 * np.sin(2 * np.pi * 440 * np.arange(rate) / rate)
+        left = np.concatenate([np.zeros(rate), tone, np.zeros(rate)])
+        frames = np.stack([left, np.zeros_like(left)], axis=1)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as out:
+            out.setnchannels(2)
+            out.setsampwidth(2)
+            out.setframerate(rate)
+            out.writeframes((frames * 32767).astype('<i2').tobytes())
+        return buffer.getvalue()
+
+    @staticmethod
+    def with_fmt(data, channels=None, bits=None):
+        """WAV dont le bloc fmt (en tête du fichier) annonce d'autres canaux ou bits par échantillon"""
+        data = bytearray(data)
+        if channels is not None:
+            struct.pack_into('<H', data, 22, channels)
+        if bits is not None:
+            struct.pack_into('<H', data, 34, bits)
+        return bytes(data)
+
+    def test_decode_wav(self):
+        samples, rate = preprocess.decode_wav(self.stereo_wav())
+        self.assertEqual((samples.shape, rate), ((3 * 44100, 2), 44100))
+        self.assertAlmostEqual(float(np.abs(samples[:, 0]).max()), 0.5, places=3)
+        self.assertEqual(float(np.abs(samples[:, 1]).max()), 0.0)
+
+    def test_mono_16k_with_silence_trimmed(self):
+        data = self.stereo_wav()
+        audio = preprocess.preprocess_audio(SimpleUploadedFile('clip.wav', data, content_type='audio/x-wav'))
+        self.assertEqual((audio.method, audio.mime_type, audio.original_bytes), ('wav', 'audio/x-wav', len(data)))
+        self.assertAlmostEqual(audio.original_seconds, 3.0)
+        # La seconde de parole, plus la marge de part et d'autre
+        self.assertAlmostEqual(audio.seconds, 1.0 + 2 * preprocess.VAD_PADDING_SECONDS, delta=2 * preprocess.FRAME_SECONDS)
+        with wave.open(audio.file, 'rb') as decoded:
+            self.assertEqual((decoded.getnchannels(), decoded.getframerate()), (1, preprocess.TARGET_RATE))
+
+    def test_invalid_fmt_is_a_value_error(self):
+        data = wav_bytes(1)
+        for channels, bits in ((None, 0), (None, 4), (None, 12), (0, None)):
+            with self.subTest(channels=channels, bits=bits):
+                with self.assertRaises(ValueError):
+                    preprocess.decode_wav(self.with_fmt(data, channels, bits))
+                # Prétraitement impossible : le fichier reçu est envoyé tel quel
+                upload_file = SimpleUploadedFile('clip.wav', self.with_fmt(data, channels, bits), content_type='audio/x-wav')
+                self.assertEqual(preprocess.preprocess_audio(upload_file).method, 'original')
+
+    def test_invalid_fmt_refused_by_endpoint(self):
+        for channels, bits in ((None, 0), (0, None)):
+            with self.subTest(channels=channels, bits=bits):
+                audio = upload(self.with_fmt(wav_bytes(1), channels, bits), 'clip.wav')
+                self.assertError(self.client.post('/api/transcribe/', {'audio': audio}), 415)
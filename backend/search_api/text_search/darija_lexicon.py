@@ -0,0 +1,265 @@
+"""
+Lexique local darija / français → termes anglais de l'index (chemin rapide de text-search/)
+- Tokenizer qui normalise la translittération (mêmes conventions que le prompt de transcription :
+  3 = ع, 7 = ح, 9 = ق, ch = ش, gh = غ, kh = خ) et les variantes d'orthographe
+  (djaj / dajaj / djej, tajine / tagine, l7am / lham)
+- Chaque mot est un aliment (traduit), un mot vide (ignoré) ou inconnu :
+  sans mot inconnu, la requête est résolue sans appeler Gemini
+- Un aliment dont le terme n'est pas dans l'index compte comme inconnu : Gemini plutôt qu'aucun résultat
+"""
+
+import re
+import unicodedata
+
+# Terme anglais de l'index → orthographes darija / françaises / anglaises usuelles
+# (chaque terme doit être une clé de inverted_index.json)
+FOOD_LEXICON = {
+    # Plats
+    'tajine': ['tajine', 'tagine', 'tajin', 'tagin', 'tajines', 'tagines'],
+    'couscous': ['couscous', 'kesksou', 'seksou', 'sekssou', 'kuskus', 'taam', 't3am'],
+    'pastilla': ['pastilla', 'bastilla', 'bastila', 'bstila', 'bestila', 'pastila'],
+    'harira': ['harira', '7rira', 'lhrira', 'l7rira', 'hrira'],
+    'rfissa': ['rfissa', 'rfisa', 'trid'],
+    'seffa': ['seffa', 'saffa', 'sffa'],
+    'msemen': ['msemen', 'msmen', 'msemmen'],
+    'rghaif': ['rghaif', 'rghayef', 'rghayf', 'rghifa'],
+    'baghrir': ['baghrir', 'beghrir', 'bghrir'],
+    'harcha': ['harcha', '7archa', 'harsha'],
+    'batbout': ['batbout', 'mkhamer', 'mkhamrin'],
+    'mlaoui': ['mlaoui', 'mlawi', 'mlaoi'],
+    'zaalouk': ['zaalouk', 'za3louk', 'zalouk'],
+    'taktouka': ['taktouka', 'tektouka', 'tektuka'],
+    'bissara': ['bissara', 'bessara', 'bisara', 'bsara'],
+    'mechoui': ['mechoui', 'mchoui', 'mechwi', 'michoui'],
+    'tangia': ['tangia', 'tanjia', 'tanjiya'],
+    'mrouzia': ['mrouzia', 'mrozia', 'mrouziya'],
+    'chebakia': ['chebakia', 'chbakia', 'chebbakia', 'chbakiya', 'chebakiya', 'shebakia'],
+    'sellou': ['sellou', 'slilou', 'zmita', 'sfouf'],
+    'ghriba': ['ghriba', 'ghoriba', 'ghryba'],
+    'fekkas': ['fekkas', 'feqqas', 'fkas'],
+    'makrout': ['makrout', 'maqrout', 'makroud'],
+    'briouate': ['briouate', 'briouat', 'briwat', 'briouats'],
+    'kaab_ghzal': ['kaab', 'ka3b', 'kaab ghzal', 'ka3b ghzal', 'kaab el ghzal', 'ka3b el ghzal', 'cornes de gazelle'],
+    'halwa': ['halwa', '7elwa', 'hlwa', 'helwa'],
+    'chorba': ['chorba', 'chorbat', 'shorba'],
+    'chermoula': ['chermoula', 'chermla', 'charmoula'],
+    'kefta': ['kefta', 'kafta', 'kofta', 'kfta'],
+    'merguez': ['merguez', 'mergaz'],
+    'khlii': ['khlii', 'khli3', 'khlie'],
+    'soup': ['soup', 'soupe', 'sopa'],
+    'salad': ['salad', 'salade', 'chlada', 'shlada', 'chalada'],
+    # Viandes et poissons
+    'chicken': ['chicken', 'poulet', 'djaj', 'dajaj', 'djej', 'jaj', 'djaja'],
+    'meat': ['meat', 'viande', 'l7am', 'lham', 'l7em', 'lhem', '7am'],
+    'lamb': ['lamb', 'agneau', 'ghanmi', 'ghenmi', 'kebch', 'houli', '7ouli'],
+    'mutton': ['mutton', 'mouton'],
+    'beef': ['beef', 'boeuf', 'begri', 'bagri', 'baqri', 'begar'],
+    'veal': ['veal', 'veau', '3jel', 'ajel'],
+    'fish': ['fish', 'poisson', 'hout', '7out', 'hut', 'l7out', 'lhout'],
+    'sardine': ['sardine', 'sardines', 'sardin', 'srdin'],
+    'shrimp': ['shrimp', 'crevette', 'crevettes', 'kamroun', 'qamroun'],
+    'tuna': ['tuna', 'thon', 'ton', 'tonn'],
+    'liver': ['liver', 'foie', 'kebda', 'kabda', 'kbda'],
+    'tripe': ['tripe', 'tripes', 'kerch', 'karcha', 'kercha'],
+    'brain': ['brain', 'cervelle', 'mokh', 'mkh'],
+    'feet': ['feet', 'pieds', 'kra3', 'kwera3', 'kouira3'],
+    'head': ['head', 'tete', 'ras'],
+    'egg': ['egg', 'eggs', 'oeuf', 'oeufs', 'bid', 'bayd', 'bida'],
+    # Laitages, graisses
+    'milk': ['milk', 'lait', '7lib', 'hlib', 'lhlib'],
+    'butter': ['butter', 'beurre', 'zebda', 'zobda', 'zbda'],
+    'smen': ['smen', 'smin', 'dhen'],
+    'cheese': ['cheese', 'fromage', 'jben', 'jbn', 'formaj'],
+    'cream': ['cream', 'creme'],
+    'oil': ['oil', 'huile', 'zit', 'zite'],
+    'olive': ['olive', 'olives', 'zitoun', 'zitun', 'zaytoun', 'zitoune'],
+    # Légumes, légumineuses, fruits
+    'lemon': ['lemon', 'citron', 'l7amed', 'lhamed', 'hamed', '7amed', 'l7amd', 'mraqed', 'm9ssar'],
+    'tomato': ['tomato', 'tomate', 'tomates', 'matecha', 'maticha', 'tomatich', 'mtecha'],
+    'potato': ['potato', 'patate', 'patates', 'btata', 'batata', 'pomme de terre', 'pommes de terre'],
+    'onion': ['onion', 'oignon', 'oignons', 'bsla', 'besla', 'bssla', 'lbsla', 'basla'],
+    'garlic': ['garlic', 'ail', 'touma', 'tooma', 'toum', 'toma'],
+    'carrot': ['carrot', 'carotte', 'carottes', 'khizou', 'khizzo', 'khizo'],
+    'zucchini': ['zucchini', 'courgette', 'courgettes', 'gar3a', '9ar3a', 'ker3a', 'slawi'],
+    'chickpea': ['chickpea', 'chickpeas', 'pois chiche', 'pois chiches', '7mes', 'hommes', 'hummus'],
+    'lentil': ['lentil', 'lentils', 'lentille', 'lentilles', '3des', 'ades', 'l3des'],
+    'loubia': ['loubia', 'loubya', 'lubia', 'haricot', 'haricots', 'haricots blancs'],
+    'fava': ['fava', 'feve', 'feves', 'foul', 'fol'],
+    'pepper': ['pepper', 'poivre', 'poivron', 'poivrons', 'felfla', 'filfil', 'felfel', 'lbzar', 'bzar'],
+    'chili': ['chili', 'piment', 'felfla 7arra', 'felfla harra', 'soudaniya'],
+    'harissa': ['harissa', 'hrissa'],
+    'date': ['date', 'dates', 'datte', 'dattes', 'tmer', 'tmar', 'tamr'],
+    'raisin': ['raisin', 'raisins', 'raisins secs', 'zbib', 'zbiba'],
+    'prune': ['prune', 'prunes', 'pruneau', 'pruneaux', 'bar9o9', 'berkouk', 'barkouk'],
+    'almond': ['almond', 'almonds', 'amande', 'amandes', 'louz', 'lluz'],
+    'orange': ['orange', 'oranges', 'limoun', 'lmoun', 'tchina'],
+    'pickle': ['pickle', 'pickles', 'cornichon', 'cornichons', 'mrqed'],
+    # Céréales, sucres
+    'semolina': ['semolina', 'semoule', 'smida', 'smid'],
+    'flour': ['flour', 'farine', 'dgig', 'd9i9', 'dqiq', 'dguig'],
+    'wheat': ['wheat', 'ble', 'l9am7', 'gm7', 'gemh', 'zra3'],
+    'barley': ['barley', 'orge', 'cha3ir', 'chaair', 'belboula'],
+    'bread': ['bread', 'pain', 'pains'],
+    'khobz': ['khobz', 'khubz', 'khbz', 'lkhobz'],
+    'rice': ['rice', 'riz', 'rouz', 'ruz', 'rz'],
+    'honey': ['honey', 'miel', '3sel', 'asel', 'l3sel', 'assel'],
+    'sugar': ['sugar', 'sucre', 'sokkar', 'sukkar', 'sukar', 'sokar'],
+    'yeast': ['yeast', 'levure', 'lkhmira', 'khmira'],
+    # Épices, herbes
+    'cumin': ['cumin', 'kamoun', 'kamun', 'lkamoun'],
+    'ginger': ['ginger', 'gingembre', 'skinjbir', 'sknjbir', 'skenjbir'],
+    'cinnamon': ['cinnamon', 'cannelle', '9rfa', '9erfa', 'karfa', 'qarfa', 'qerfa'],
+    'saffron': ['saffron', 'safran', 'za3fran', 'za3faran', 'zaafran', 'zafran'],
+    'turmeric': ['turmeric', 'curcuma', 'l5rkoum', 'khorkom', 'kharkoum', 'lkharkoum'],
+    'paprika': ['paprika', 'tahmira', 'ta7mira'],
+    'ras-el-hanout': ['ras el hanout', 'ras el 7anout', 'ras-el-hanout', 'ras lhanout'],
+    'anise': ['anise', 'anis', 'nafa', 'nafaa', 'habbat hlawa', '7abbat 7lawa'],
+    'cilantro': ['cilantro', 'coriandre', 'coriander', 'kosbor', 'kezbour', '9ezbour', 'kasbour', 'qesbour'],
+    'parsley': ['parsley', 'persil', 'ma3dnous', 'm3dnous', 'madnous', 'maadnous', 'madnouss'],
+    'mint': ['mint', 'menthe', 'na3na3', 'ne3ne3', 'naanaa', 'nanaa'],
+    'fennel': ['fennel', 'fenouil', 'besbas', 'bsbas'],
+}
+
+# Mots vides darija et français (les mots vides anglais sont fournis par l'appelant)
+DARIJA_STOP_WORDS = {
+    'ana', 'nta', 'nti', 'ntouma', 'ntoma', '7na', 'hna', 'howa', 'hiya', 'homa',
+    'bghit', 'bghina', 'bgha', 'bghat', 'baghi', 'baghia', 'baghin', 'nbghi', 'kanbghi',
+    'nakol', 'nakul', 'nakoul', 'nkol', 'kol', 'klit', 'nchri', 'ndir', 'dir', 'n9der', 'nteyeb',
+    'ntyeb', 'nsayeb', 'nsawb', 'tayeb', 'tiyeb', 'tib', 'wjjed', 'nwjjed', 'tjib', '3tini', 'atini',
+    'dyal', 'dial', 'dyali', 'diali', 'nta3', 'm3a', 'mea', 'maa', 'bla', 'bzaf', 'bezzaf', 'chwiya',
+    'chwia', 'chi', 'shi', 'wach', 'wash', 'kifach', 'kifash', 'kif', 'fin', 'fen', 'ach', 'chno',
+    'chnou', 'achno', 'achmen', '3afak', 'afak', 'lah', 'yrham', 'lwalidin', 'salam', 'smahli',
+    'wahed', 'wa7ed', 'wahd', 'jouj', 'zouj', 'lyoum', 'lyouma', 'ghda', 'ghedda', 'lghda', '3cha',
+    'l3cha', 'ftour', 'lftour', 'fdour', 'mzyan', 'mzyana', 'mzyanin', 'bnin', 'bnina', 'zwin', 'zwina',
+    'kayn', 'kayna', 'makaynch', 'ila', 'kan', 'ola', 'wla', 'hadi', 'had', 'hada', 'hadik', 'dak',
+    'dik', 'dakchi', 'hadchi', 'beldi', 'beldiya', 'mghribi', 'mghribia', 'lmghrib', 'tbakh',
+    'tabkha', 'makla', 'lmakla', 'tbikh', '7aja', 'haja', 'chi7aja', 'l', 'w', 'b', 'f', 'd', 'fi', 'o',
+    'ou', 'u', 'bl', 'wl', 'fl', 'dl', 'bel', 'fel', 'del',
+    'je', 'veux', 'voudrais', 'cherche', 'une', 'un', 'des', 'les', 'le', 'la', 'de', 'du', 'au',
+    'aux', 'et', 'avec', 'sans', 'pour', 'en', 'recette', 'recettes', 'plat', 'plats', 'cuisine',
+    'marocain', 'marocaine', 'traditionnel', 'traditionnelle', 'maison',
+}
+
+# Préfixes collés fréquents en darija : l- (article), b- (avec), w- (et), d- (de), f- (dans)
+GLUED_PREFIXES = ('l', 'b', 'w', 'd', 'f')
+# Longueur minimale d'un squelette consonantique utilisé seul (en dessous, trop de collisions)
+MIN_SKELETON = 3
+# Longueur maximale d'une expression du lexique, en mots
+MAX_PHRASE = 3
+
+VOWELS = set('aeiouy32')
+
+
+def normalize_token(word):
+    """Minuscules, sans accents, lettres et chiffres de translittération uniquement"""
+    word = ''.join(
+        c for c in unicodedata.normalize('NFD', word.lower())
+        if unicodedata.category(c) != 'Mn'
+    )
+    return re.sub(r'[^a-z0-9]', '', word)
+
+
+def skeleton(word):
+    """
+    Squelette consonantique d'un mot translittéré : les chiffres et digrammes sont ramenés à une
+    seule lettre (7 → h, 9/q → k, kh/5 → X, gh/8 → G, sh → ch, g → j), les voyelles et le 3/2
+    (ع / ء, souvent omis) disparaissent, les consonnes doublées fusionnent.
+    """
+    word = word.replace('kh', 'X').replace('5', 'X').replace('gh', 'G').replace('8', 'G')
+    word = word.replace('sh', 'ch').replace('7', 'h').replace('9', 'k').replace('q', 'k').replace('g', 'j')
+    consonants = []
+    for c in word:
+        if c in VOWELS:
+            continue
+        if not consonants or consonants[-1] != c:
+            consonants.append(c)
+    return ''.join(consonants)
+
+
+def build_tables():
+    """(orthographes exactes, squelettes) → terme ; les squelettes ambigus sont écartés"""
+    exact, skeletons, ambiguous = {}, {}, set()
+    for term, spellings in FOOD_LEXICON.items():
+        for spelling in spellings:
+            key = ' '.join(normalize_token(w) for w in spelling.split())
+            exact[key] = term
+            if ' ' in key:
+                continue
+            shape = skeleton(key)
+            if len(shape) >= MIN_SKELETON:
+                if skeletons.get(shape, term) != term:
+                    ambiguous.add(shape)
+                skeletons[shape] = term
+    for shape in ambiguous:
+        del skeletons[shape]
+    return exact, skeletons
+
+
+FOOD_EXACT, FOOD_SKELETONS = build_tables()
+STOP_EXACT = {normalize_token(w) for w in DARIJA_STOP_WORDS}
+# Un squelette déjà pris par un aliment n'en fait pas un mot vide
+STOP_SKELETONS = {
+    skeleton(w) for w in STOP_EXACT if len(skeleton(w)) >= MIN_SKELETON
+} - set(FOOD_SKELETONS)
+
+
+def tokenize(text):
+    """Mots normalisés d'un texte darija / français (les chiffres de translittération sont conservés)"""
+    return [token for token in (normalize_token(w) for w in re.split(r"[\s'’\-,.;:!?()/]+", text)) if token]
+
+
+def classify_token(token, vocabulary, stop_words):
+    """
+    ('food', terme) ou ('stop', None) ou None (inconnu). Ordre : orthographes exactes
+    (aliments, termes de l'index, pluriels, mots vides), puis squelettes, puis préfixe collé.
+    """
+    candidates = [token]
+    if len(token) > 3 and token[-1] in 'sx':
+        candidates.append(token[:-1])
+    if len(token) > 4 and token.endswith('es'):
+        candidates.append(token[:-2])
+    for candidate in candidates:
+        if candidate in FOOD_EXACT:
+            return 'food', FOOD_EXACT[candidate]
+        if candidate in vocabulary:
+            return 'food', candidate
+    if token in STOP_EXACT or token in stop_words or token.isdigit():
+        return 'stop', None
+
+    shape = skeleton(token)
+    if len(shape) >= MIN_SKELETON:
+        if shape in FOOD_SKELETONS:
+            return 'food', FOOD_SKELETONS[shape]
+        if shape in STOP_SKELETONS:
+            return 'stop', None
+    if token[0] in GLUED_PREFIXES and len(token) > 3:
+        return classify_token(token[1:], vocabulary, stop_words)
+    return None
+
+
+def resolve_query(text, vocabulary=None, stop_words=()):
+    """
+    Résout une requête mot à mot. Retourne (termes anglais dans l'ordre, mots inconnus) ;
+    la requête est entièrement locale quand il y a au moins un terme et aucun mot inconnu.
+    vocabulary : termes de l'index ; un aliment traduit vers un terme absent de l'index est
+    inconnu (None : pas de contrôle).
+    """
+    tokens = tokenize(text)
+    terms, unknown = [], []
+    i = 0
+    while i < len(tokens):
+        # Expressions de plusieurs mots d'abord (« pomme de terre », « ras el hanout »)
+        for size in range(min(MAX_PHRASE, len(tokens) - i), 1, -1):
+            phrase = ' '.join(tokens[i:i + size])
+            if phrase in FOOD_EXACT:
+                kind, word = ('food', FOOD_EXACT[phrase]), phrase
+                i += size
+                break
+        else:
+            kind, word = classify_token(tokens[i], vocabulary or (), stop_words), tokens[i]
+            i += 1
+        if kind is None or (kind[0] == 'food' and vocabulary is not None and kind[1] not in vocabulary):
+            unknown.append(word)
+        elif kind[0] == 'food':
+            terms.append(kind[1])
+    return list(dict.fromkeys(terms)), unknown
@@ -0,0 +1,74 @@
+"""
+Reconnaissance de plats et d'ingrédients dans une requête texte (automate d'Aho-Corasick)
+- Toutes les expressions (plats, alias, ingrédients de plusieurs mots) sont compilées une fois
+- Une seule passe linéaire sur la requête trouve toutes les occurrences
+- Seules les occurrences alignées sur des mots comptent (« ail » ne matche pas dans « tail »),
+  un « s » final de pluriel est toléré
+- Sélection déterministe : la plus à gauche, puis la plus longue, sans chevauchement
+"""
+
+from collections import deque
+
+
+class PhraseMatcher:
+    """Automate d'Aho-Corasick sur des expressions normalisées (mots séparés par un espace)"""
+
+    def __init__(self, phrases):
+        """phrases: {expression normalisée: valeur}"""
+        self.phrases = list(phrases.items())
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for phrase_id, (phrase, _) in enumerate(self.phrases):
+            node = 0
+            for char in phrase:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = next_node
+            self.output[node].append(phrase_id)
+
+        # Liens d'échec en largeur ; chaque nœud hérite des sorties de son lien d'échec
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+                queue.append(child)
+
+    def iter_matches(self, text):
+        """Toutes les occurrences alignées sur des mots : (début, fin, expression, valeur)"""
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for phrase_id in self.output[node]:
+                phrase, value = self.phrases[phrase_id]
+                start, end = position + 1 - len(phrase), position + 1
+                if start > 0 and text[start - 1] != ' ':
+                    continue
+                if end < len(text) and text[end] != ' ':
+                    # Pluriel : « tajines », « olives » pour « tajine », « olive »
+                    if text[end] != 's' or (end + 1 < len(text) and text[end + 1] != ' '):
+                        continue
+                    end += 1
+                yield start, end, phrase, value
+
+    def find(self, text):
+        """Occurrences retenues (la plus à gauche, puis la plus longue), dans l'ordre du texte"""
+        selected, covered_until = [], 0
+        for start, end, phrase, value in sorted(self.iter_matches(text), key=lambda m: (m[0], -(m[1] - m[0]))):
+            if start >= covered_until:
+                selected.append((start, end, phrase, value))
+                covered_until = end
+        return selected
@@ -5,6 +5,7 @@ CORRECTION FINALE: Suppression des doublons et ordre correct des routes
 
 from django.urls import path
 from . import views
+from .metrics import metrics_view
 from .voice_search.speech_to_text import transcribe
 
 urlpatterns = [
@@ -13,14 +14,23 @@ urlpatterns = [
     
     # Recherche de recettes
     path('search/', views.search_recipes, name='search_recipes'),
+    path('search-batch/', views.search_recipes_batch_view, name='search_recipes_batch'),
+    path('what-can-i-cook/', views.what_can_i_cook, name='what_can_i_cook'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
+    path('phrase-search/', views.phrase_search, name='phrase_search'),
+    path('fulltext-search/', views.fulltext_search, name='fulltext_search'),
     
     # Analyse d'image avec Gemini (AVANT les routes dynamiques)
     path('analyze-image/', views.analyze_recipe_image, name='analyze_recipe_image'),
+    path('analyze-images/', views.analyze_recipe_images, name='analyze_recipe_images'),
     
     # Recettes créées par les utilisateurs (AVANT les routes dynamiques)
     path('recipes/create/', views.create_user_recipe, name='create_user_recipe'),
     path('recipes/user/', views.get_user_recipes, name='get_user_recipes'),
     
+    # 🔗 Recettes similaires (table TF-IDF précalculée à la construction de l'index)
+    path('recipes/<str:recipe_id>/similar/', views.get_similar_recipes, name='get_similar_recipes'),
+    
     # 🔧 ROUTE DYNAMIQUE POUR LES DÉTAILS (doit être EN DERNIER)
     # Utilise <str:recipe_id> pour accepter "16_tajine_poulet" et pas seulement "16"
     path('recipes/<str:recipe_id>/', views.get_recipe_details, name='get_recipe_details'),
@@ -32,6 +42,9 @@ urlpatterns = [
     path('transcribe/', transcribe, name='transcribe'),
     path('text-search/', views.text_search, name='text_search'),
 
+    # 📊 Histogrammes des temps par phase (format Prometheus)
+    path('metrics/', metrics_view, name='metrics'),
+
 
 
 ]
\ No newline at end of file
@@ -1,28 +1,42 @@
 """
 Views pour l'API de recherche de recettes marocaines avec Inverted Index
-(Version corrigée - API Gemini unifiée)
+(Version corrigée - API Gemini unifiée, client google-genai partagé)
 """
 
+import contextlib
+import contextvars
+import hashlib
+import io
 import json
 import os
+import threading
 import time
 import uuid
 import traceback
 import re
-import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-import google.generativeai as genai
-from PIL import Image
+from . import gemini_client
+from .autocomplete import AutocompleteIndex
+from .image_search import local_recognizer
+from .indexing.Recipies.PythonScripts.analyzer import ANALYZER_ID, analyze, built_with, compound_terms, expand_query
+from .indexing.Recipies.PythonScripts.build_inverted_index import StrictRecipeIndexer, index_terms
+from .ingredient_bitmaps import EXCLUSION_GROUPS, IngredientBitmapIndex
+from .field_index import FieldIndex
+from .index_snapshot import artifact_path, is_stale
+from .metrics import timed, timed_function
+from .positional_index import PositionalIndex
+from .pruned_scoring import PrunedRecipeIndex
+from .sharded_search import ShardedFieldIndex
+from .text_search import darija_lexicon
+from .text_search.phrase_matcher import PhraseMatcher
 from .voice_search.speech_to_text import transcribe
 
-# Import pour charger les variables d'environnement
-from dotenv import load_dotenv
-
-# Charger les variables d'environnement depuis le fichier .env
-load_dotenv()
+# Variables d'environnement (.env) déjà chargées par settings.py
+# Imports lourds (SDK Gemini, PIL, SciPy) faits au premier usage : démarrage plus rapide
 
 # ============================================================
 # CONSTANTES ET CONFIGURATION
@@ -36,13 +50,39 @@ INVERTED_INDEX_PATHS = [
     os.path.join(BASE_DIR, './indexing/Recipies/inverted_index.json'),
 ]
 RECIPES_FOLDER_PATH = os.path.join(BASE_DIR, './indexing/Recipies/recipes')
+SIMILAR_RECIPES_PATH = os.path.join(BASE_DIR, './indexing/Recipies/similar_recipes.json')
+DUPLICATES_PATH = os.path.join(BASE_DIR, './indexing/Recipies/duplicates.json')
+POSITIONAL_INDEX_PATH = os.path.join(BASE_DIR, './indexing/Recipies/positional_index.json')
+FIELD_INDEX_PATH = os.path.join(BASE_DIR, './indexing/Recipies/field_index.json')
+FIELD_SHARDS_MANIFEST_PATH = os.path.join(BASE_DIR, './indexing/Recipies/field_shards/manifest.json')
+
+# Candidats classés d'abord quand le top est dédoublonné (limit × facteur, doublé tant que le top est incomplet)
+DUPLICATE_OVERFETCH = 3
 
-# Configuration Gemini (à faire une seule fois au démarrage)
+# Configuration Gemini : le client partagé (gemini_client) est créé au premier appel
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("❌ ERREUR: GEMINI_API_KEY non trouvée dans les variables d'environnement. "
                      "Veuillez la définir dans le fichier .env")
-genai.configure(api_key=GEMINI_API_KEY)
+
+# Borne process-wide des appels Gemini lancés par les lots d'images (analyze-images/)
+IMAGE_BATCH_SEMAPHORE = threading.BoundedSemaphore(settings.IMAGE_BATCH_CONCURRENCY)
+
+# Artefacts d'index gardés en mémoire (chemin → (clé, contenu)) et versions compilées de l'index
+_artifact_cache = {}
+_sparse_cache = {'source': None, 'sparse': None}
+_pruned_cache = {'source': None, 'pruned': None}
+_document_count_cache = {'source': None, 'count': 0}
+_bitmap_cache = {'source': None, 'bitmaps': None}
+_positional_cache = {'source': None, 'positional': None}
+_field_cache = {'source': None, 'fields': None}
+_autocomplete_cache = {'source': None, 'titles': None, 'key': None, 'autocomplete': None}
+# Magasin de documents : fichier → ((mtime, taille), recette adaptée)
+_document_cache = {}
+# Vérification de l'analyseur des artefacts : chemin → (contenu vérifié, compatible)
+_analyzer_checks = {}
+INGREDIENT_EXTRACTOR = StrictRecipeIndexer()
+_index_lock = threading.Lock()
 
 # Mots vides (stop words) étendus
 STOP_WORDS = {
@@ -109,33 +149,258 @@ def load_user_recipes():
     return load_json_file(USER_RECIPES_PATH)
 
 
+def load_cached_json(abs_path):
+    """Charge un artefact JSON et le garde en mémoire tant que le fichier ne change pas"""
+    stat = os.stat(abs_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _index_lock:
+        cached = _artifact_cache.get(abs_path)
+        if cached is None or cached[0] != key:
+            # Nouveau snapshot publié : les artefacts des anciens quittent le cache
+            # (les requêtes encore en cours gardent leurs propres références)
+            for path in [path for path in _artifact_cache if is_stale(path)]:
+                del _artifact_cache[path]
+                _analyzer_checks.pop(path, None)
+            print(f"🔍 Chargé depuis: {abs_path}")
+            cached = (key, load_json_file(abs_path))
+            _artifact_cache[abs_path] = cached
+        return cached[1]
+
+
+def analyzer_compatible(abs_path, data):
+    """
+    Vrai si l'artefact a été construit avec la chaîne d'analyse du serveur (ANALYZER_ID de son en-tête).
+    Sinon ses termes divergent de ceux des requêtes : refusé, ou seulement signalé si
+    SEARCH_ANALYZER_STRICT est désactivé. Vérifié une fois par contenu chargé.
+    """
+    with _index_lock:
+        checked = _analyzer_checks.get(abs_path)
+        if checked is not None and checked[0] is data:
+            return checked[1]
+        stored = built_with(data)
+        compatible = stored == ANALYZER_ID
+        if not compatible:
+            print(f"❌ {os.path.basename(abs_path)} construit avec l'analyseur {stored or 'inconnu'}, "
+                  f"le serveur utilise {ANALYZER_ID} : reconstruire les index (build_inverted_index.py)")
+            compatible = not settings.SEARCH_ANALYZER_STRICT
+        _analyzer_checks[abs_path] = (data, compatible)
+        return compatible
+
+
+@timed_function('index_load')
 def load_inverted_index():
-    """Charge l'inverted index depuis le premier chemin disponible"""
+    """Charge l'inverted index ({terme: [fichiers]}) depuis le premier chemin disponible"""
     for path in INVERTED_INDEX_PATHS:
-        abs_path = os.path.abspath(path)
+        abs_path = artifact_path(path)
         if os.path.exists(abs_path):
-            print(f"🔍 Inverted index chargé depuis: {abs_path}")
-            return load_json_file(abs_path)
+            data = load_cached_json(abs_path)
+            return index_terms(data) if analyzer_compatible(abs_path, data) else {}
     
     print("❌ Aucun fichier inverted_index.json trouvé")
     return {}
 
 
+@timed_function('index_load')
+def load_similar_recipes():
+    """Charge la table des voisins TF-IDF précalculée (fichier → [[fichier, score], ...])"""
+    abs_path = artifact_path(SIMILAR_RECIPES_PATH)
+    if not os.path.exists(abs_path):
+        print("❌ Aucun fichier similar_recipes.json trouvé")
+        return {}
+    data = load_cached_json(abs_path)
+    return data.get('similar', {}) if isinstance(data, dict) else {}
+
+
+@timed_function('index_load')
+def load_duplicate_canonicals():
+    """Table fichier → recette canonique de son groupe de quasi-doublons (vide si désactivé)"""
+    if not settings.SEARCH_COLLAPSE_DUPLICATES:
+        return {}
+    abs_path = artifact_path(DUPLICATES_PATH)
+    if not os.path.exists(abs_path):
+        return {}
+    data = load_cached_json(abs_path)
+    # Groupes calculés sur les termes d'une autre chaîne d'analyse : pas de dédoublonnage
+    if not isinstance(data, dict) or not analyzer_compatible(abs_path, data):
+        return {}
+    return data.get('canonical', {})
+
+
+@timed_function('index_load')
+def load_positional_index():
+    """Index positionnel (postings décodés à la demande), None s'il n'a pas été construit"""
+    abs_path = artifact_path(POSITIONAL_INDEX_PATH)
+    if not os.path.exists(abs_path):
+        print("❌ Aucun fichier positional_index.json trouvé")
+        return None
+    data = load_cached_json(abs_path)
+    if not analyzer_compatible(abs_path, data):
+        return None
+    with _index_lock:
+        if _positional_cache['source'] is not data:
+            _positional_cache['positional'] = PositionalIndex(data)
+            _positional_cache['source'] = data
+        return _positional_cache['positional']
+
+
+@timed_function('index_load')
+def load_field_index():
+    """
+    Index plein texte multi-champs compilé, None s'il n'a pas été construit.
+    Les shards (field_shards/manifest.json) sont prioritaires sur field_index.json.
+    """
+    manifest_path = artifact_path(FIELD_SHARDS_MANIFEST_PATH)
+    if os.path.exists(manifest_path):
+        return load_sharded_field_index(manifest_path)
+    abs_path = artifact_path(FIELD_INDEX_PATH)
+    if not os.path.exists(abs_path):
+        print("❌ Aucun fichier field_index.json trouvé")
+        return None
+    data = load_cached_json(abs_path)
+    if not analyzer_compatible(abs_path, data):
+        return None
+    with _index_lock:
+        if _field_cache['source'] is not data:
+            with timed('index_compile'):
+                _field_cache['fields'] = FieldIndex(data)
+            _field_cache['source'] = data
+        return _field_cache['fields']
+
+
+def load_sharded_field_index(manifest_path):
+    """Shards ouverts chacun dans son processus (SEARCH_SHARD_PROCESSES) ; rouverts si le manifeste change"""
+    manifest = load_cached_json(manifest_path)
+    if not analyzer_compatible(manifest_path, manifest):
+        return None
+    with _index_lock:
+        if _field_cache['source'] is not manifest:
+            previous = _field_cache['fields']
+            with timed('index_compile'):
+                _field_cache['fields'] = ShardedFieldIndex(
+                    manifest, os.path.dirname(manifest_path), settings.SEARCH_SHARD_PROCESSES
+                )
+            _field_cache['source'] = manifest
+            if isinstance(previous, ShardedFieldIndex):
+                previous.close()
+        return _field_cache['fields']
+
+
+def get_scoring_index(inverted_index):
+    """Index compilé pour le top-k selon SEARCH_SCORING_BACKEND (MaxScore ou CSR), None pour les boucles dict"""
+    backend = settings.SEARCH_SCORING_BACKEND
+    if backend == 'dict' or not inverted_index:
+        return None
+    if backend == 'auto':
+        large = count_indexed_documents(inverted_index) >= settings.SPARSE_SCORING_MIN_DOCS
+        backend = 'sparse' if large else 'maxscore'
+    if backend == 'sparse':
+        return get_sparse_index(inverted_index)
+    return get_pruned_index(inverted_index)
+
+
+def count_indexed_documents(inverted_index):
+    """Nombre de recettes distinctes de l'index, compté une fois par index chargé"""
+    with _index_lock:
+        if _document_count_cache['source'] is not inverted_index:
+            _document_count_cache['count'] = len({f for recipe_files in inverted_index.values() for f in recipe_files})
+            _document_count_cache['source'] = inverted_index
+        return _document_count_cache['count']
+
+
+def get_sparse_index(inverted_index):
+    """Version CSR de l'index (produit matriciel SciPy), compilée une fois par index chargé"""
+    with _index_lock:
+        if _sparse_cache['source'] is not inverted_index:
+            from .sparse_scoring import SparseRecipeIndex
+            with timed('index_compile'):
+                _sparse_cache['sparse'] = SparseRecipeIndex(inverted_index)
+            _sparse_cache['source'] = inverted_index
+        return _sparse_cache['sparse']
+
+
+def get_pruned_index(inverted_index):
+    """Postings triés par document pour le top-k élagué (MaxScore), compilés une fois par index chargé"""
+    with _index_lock:
+        if _pruned_cache['source'] is not inverted_index:
+            with timed('index_compile'):
+                _pruned_cache['pruned'] = PrunedRecipeIndex(inverted_index)
+            _pruned_cache['source'] = inverted_index
+        return _pruned_cache['pruned']
+
+
+def get_bitmap_index(inverted_index):
+    """Masques d'ingrédients des recettes, construits une fois par index chargé"""
+    with _index_lock:
+        if _bitmap_cache['source'] is not inverted_index:
+            with timed('index_compile'):
+                _bitmap_cache['bitmaps'] = IngredientBitmapIndex(
+                    inverted_index, INGREDIENT_EXTRACTOR.valid_ingredients
+                )
+            _bitmap_cache['source'] = inverted_index
+        return _bitmap_cache['bitmaps']
+
+
+def file_state(path):
+    """(mtime, taille) d'un fichier, None s'il n'existe pas"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_indexed_titles(inverted_index):
+    """[(titre, identifiant)] des recettes présentes dans l'index (champ 'name' des fichiers)"""
+    titles = []
+    for filename in sorted({f for recipe_files in inverted_index.values() for f in recipe_files}):
+        try:
+            with open(os.path.join(RECIPES_FOLDER_PATH, filename), 'r', encoding='utf-8') as f:
+                titles.append((json.load(f).get('name', ''), filename.replace('.json', '')))
+        except Exception as e:
+            print(f"⚠️ Titre illisible pour {filename}: {e}")
+    return titles
+
+
+def get_autocomplete_index():
+    """
+    Index d'autocomplétion : termes de l'index inversé, titres des recettes indexées,
+    de recipes.json et des recettes utilisateurs. Reconstruit quand l'index est rechargé
+    ou quand un des deux fichiers JSON change (création d'une recette utilisateur).
+    """
+    inverted_index = load_inverted_index()
+    key = (file_state(RECIPES_JSON_PATH), file_state(USER_RECIPES_PATH), settings.AUTOCOMPLETE_MAX_LIMIT)
+    with _index_lock:
+        if _autocomplete_cache['source'] is not inverted_index or _autocomplete_cache['key'] != key:
+            with timed('index_compile'):
+                if _autocomplete_cache['source'] is not inverted_index:
+                    _autocomplete_cache['titles'] = load_indexed_titles(inverted_index)
+                titles = _autocomplete_cache['titles'] + [
+                    (recipe.get('title', ''), recipe.get('id'))
+                    for recipe in load_recipes_data() + load_user_recipes()
+                ]
+                _autocomplete_cache['autocomplete'] = AutocompleteIndex(
+                    {term: len(recipe_files) for term, recipe_files in inverted_index.items()}, titles,
+                    settings.AUTOCOMPLETE_MAX_LIMIT,
+                )
+            _autocomplete_cache['source'] = inverted_index
+            _autocomplete_cache['key'] = key
+        return _autocomplete_cache['autocomplete']
+
+
 def normalize_keyword(keyword):
-    """Normalise un mot-clé pour la recherche"""
-    keyword = keyword.lower().strip()
-    keyword = re.sub(r'[^a-z\s]', ' ', keyword)
-    keyword = ''.join(
-        c for c in unicodedata.normalize('NFD', keyword)
-        if unicodedata.category(c) != 'Mn' or c == ' '
-    )
-    
-    words = keyword.split()
-    filtered_words = [w for w in words if len(w) > 2 and w not in STOP_WORDS]
+    """
+    Normalise un mot-clé pour la recherche avec la chaîne d'analyse des index
+    (accents, pluriels, orthographes, termes composés comme « ras el hanout »), sans mots vides
+    ni nombres ; « kaab » et les occasions (« ramadan ») deviennent les plats correspondants
+    """
+    words = analyze(keyword)
+    words = expand_query(words + sorted(compound_terms(words)))
+    filtered_words = [w for w in words if len(w) > 2 and w not in STOP_WORDS and not w[0].isdigit()]
     
     return ' '.join(filtered_words) if filtered_words else ''
 
 
+@timed_function('hydrate')
 def get_recipe_by_filename(filename):
     """Récupère une recette à partir de son fichier JSON"""
     if not filename.endswith('.json'):
@@ -143,10 +408,16 @@ def get_recipe_by_filename(filename):
     
     file_path = os.path.join(RECIPES_FOLDER_PATH, filename)
     
-    if not os.path.exists(file_path):
+    key = file_state(file_path)
+    if key is None:
         print(f"❌ Fichier non trouvé: {file_path}")
         return None
     
+    # Recette déjà lue et adaptée (préchargée par le maître gunicorn ou par une requête précédente)
+    cached = _document_cache.get(filename)
+    if cached is not None and cached[0] == key:
+        return dict(cached[1])
+    
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             recipe_data = json.load(f)
@@ -157,7 +428,8 @@ def get_recipe_by_filename(filename):
         recipe_data = handle_recipe_image(recipe_data)
         log_recipe_info(recipe_data)
         
-        return recipe_data
+        _document_cache[filename] = (key, recipe_data)
+        return dict(recipe_data)
         
     except Exception as e:
         print(f"⚠️ Erreur lors de la lecture du fichier {filename}: {e}")
@@ -239,15 +511,22 @@ def log_recipe_info(recipe_data):
 # FONCTIONS DE RECHERCHE
 # ============================================================
 
+@timed_function('search')
 def search_recipes_by_analysis(nom_recette, ingredients_visibles, inverted_index):
     """Recherche des recettes avec pondération"""
     print(f"\n🧠 Recherche pondérée: Nom='{nom_recette}', Ingrédients={ingredients_visibles}")
     
-    recipe_scores = {}
-    search_terms = build_search_terms(nom_recette, ingredients_visibles)
+    scoring_index = get_scoring_index(inverted_index)
+    if scoring_index is not None:
+        canonical = load_duplicate_canonicals()
+        weights = query_term_weights(nom_recette, ingredients_visibles, SearchTermCache(inverted_index))
+        top_ranked = top_distinct(lambda k: scoring_index.top_k([weights], k)[0], 5, canonical)
+        if not top_ranked:
+            print("❌ Aucune recette trouvée")
+            return []
+        return hydrate_top_recipes(top_ranked)
     
-    for term, weight in search_terms:
-        search_term_in_index(term, weight, inverted_index, recipe_scores)
+    recipe_scores = score_recipes_by_analysis(nom_recette, ingredients_visibles, inverted_index)
     
     if not recipe_scores:
         print("❌ Aucune recette trouvée")
@@ -256,6 +535,14 @@ def search_recipes_by_analysis(nom_recette, ingredients_visibles, inverted_index
     return get_top_recipes(recipe_scores)
 
 
+def score_recipes_by_analysis(nom_recette, ingredients_visibles, inverted_index):
+    """Calcule les scores pondérés (fichier → score) sans hydrater les recettes"""
+    recipe_scores = {}
+    for term, weight in build_search_terms(nom_recette, ingredients_visibles):
+        search_term_in_index(term, weight, inverted_index, recipe_scores)
+    return recipe_scores
+
+
 def build_search_terms(nom_recette, ingredients_visibles):
     """Construit la liste des termes de recherche avec leurs poids"""
     search_terms = []
@@ -304,14 +591,150 @@ def add_score_to_recipes(recipe_files, score, recipe_scores):
         recipe_scores[recipe_file] += score
 
 
-def get_top_recipes(recipe_scores, limit=5):
-    """Récupère les meilleures recettes basées sur leur score"""
-    sorted_recipe_ids = sorted(recipe_scores.items(), key=lambda x: x[1], reverse=True)
+@timed_function('search')
+def search_recipes_batch(queries, inverted_index, limit=5):
+    """Évalue un lot de requêtes (nom, ingrédients) sur un même index : top-k (fichier, score) par requête"""
+    term_cache = SearchTermCache(inverted_index)
+    canonical = load_duplicate_canonicals()
+    fetch = fetch_size(limit, canonical)
+    
+    scoring_index = get_scoring_index(inverted_index)
+    if scoring_index is not None:
+        weights_list = [query_term_weights(nom, visibles, term_cache) for nom, visibles in queries]
+        ranked = scoring_index.top_k(weights_list, fetch)
+        rankers = [lambda k, weights=weights: scoring_index.top_k([weights], k)[0] for weights in weights_list]
+    else:
+        ranked, rankers = [], []
+        for nom_recette, ingredients_visibles in queries:
+            recipe_scores = {}
+            for term, weight in build_search_terms(nom_recette, ingredients_visibles):
+                for index_key, factor in term_cache.postings(term):
+                    add_score_to_recipes(inverted_index[index_key], weight * factor, recipe_scores)
+            ranked.append(rank_recipe_scores(recipe_scores, fetch))
+            rankers.append(lambda k, recipe_scores=recipe_scores: rank_recipe_scores(recipe_scores, k))
     
-    print(f"📊 Top {limit} fichiers trouvés: {sorted_recipe_ids[:limit]}")
+    # Le premier classement est commun au lot ; seules les requêtes au top incomplet sont reclassées
+    return [top_distinct(rank, limit, canonical, top) for rank, top in zip(rankers, ranked)]
+
+
+def query_term_weights(nom_recette, ingredients_visibles, term_cache):
+    """Poids cumulé de chaque clé d'index pour une requête (vecteur creux de la requête)"""
+    weights = {}
+    for term, weight in build_search_terms(nom_recette, ingredients_visibles):
+        for index_key, factor in term_cache.postings(term):
+            weights[index_key] = weights.get(index_key, 0.0) + weight * factor
+    return weights
+
+
+class SearchTermCache:
+    """Cache partagé par un lot de requêtes : terme → [(clé d'index, facteur)]
+    Normalisation et recherche partielle (parcours de tout l'index) ne sont faites qu'une fois par mot.
+    Les scores obtenus sont identiques à ceux de search_term_in_index."""
+
+    def __init__(self, inverted_index):
+        self.inverted_index = inverted_index
+        self._terms = {}
+        self._words = {}
+
+    def postings(self, term):
+        postings = self._terms.get(term)
+        if postings is None:
+            postings = []
+            for word in normalize_keyword(term).split():
+                postings.extend(self.word_postings(word))
+            self._terms[term] = postings
+        return postings
+
+    def word_postings(self, word):
+        postings = self._words.get(word)
+        if postings is None:
+            postings = []
+            if len(word) < 3:
+                pass
+            elif word in self.inverted_index:
+                postings.append((word, 1.0))
+            elif len(word) >= 4:
+                postings = [
+                    (index_key, 0.5) for index_key in self.inverted_index
+                    if word in index_key or index_key in word
+                ]
+            self._words[word] = postings
+        return postings
+
+
+def rank_recipe_scores(recipe_scores, limit=5):
+    """Retourne les `limit` meilleurs (fichier, score), par score décroissant puis nom de fichier"""
+    return sorted(recipe_scores.items(), key=lambda x: (-x[1], x[0]))[:limit]
+
+
+def fetch_size(limit, canonical):
+    """Candidats classés d'abord pour qu'il reste en général `limit` recettes après dédoublonnage"""
+    return limit * DUPLICATE_OVERFETCH if canonical else limit
+
+
+def top_distinct(rank, limit, canonical, ranked=None):
+    """
+    Top `limit` (fichier, score) avec une seule recette par groupe de quasi-doublons.
+    rank(k) classe les k meilleurs candidats ; ranked est un premier classement déjà fait
+    (fetch_size candidats). Tant qu'un grand groupe laisse le top incomplet et qu'il reste
+    des candidats, on en classe deux fois plus.
+    """
+    fetch = fetch_size(limit, canonical)
+    if ranked is None:
+        ranked = rank(fetch)
+    while True:
+        kept = collapse_duplicates(ranked, limit, canonical)
+        if len(kept) >= limit or len(ranked) < fetch:
+            return kept
+        fetch *= 2
+        ranked = rank(fetch)
+
+
+def collapse_duplicates(ranked, limit, canonical):
+    """Ne garde que la mieux classée de chaque groupe de quasi-doublons (lecture O(1) par résultat)"""
+    if not canonical:
+        return ranked[:limit]
+    
+    seen_groups = set()
+    kept = []
+    for filename, score in ranked:
+        group = canonical.get(filename, filename)
+        if group in seen_groups:
+            continue
+        seen_groups.add(group)
+        kept.append((filename, score))
+        if len(kept) == limit:
+            break
+    return kept
+
+
+def hydrate_recipes(filenames):
+    """Charge chaque recette une seule fois (fichier → recette), en ignorant les absentes"""
+    documents = {}
+    for filename in filenames:
+        if filename in documents:
+            continue
+        recipe = get_recipe_by_filename(filename)
+        if recipe:
+            documents[filename] = recipe
+        else:
+            print(f"⚠️ Fichier non trouvé: '{filename}'")
+    return documents
+
+
+def get_top_recipes(recipe_scores, limit=5):
+    """Récupère les meilleures recettes basées sur leur score (quasi-doublons regroupés)"""
+    canonical = load_duplicate_canonicals()
+    top_ranked = top_distinct(lambda k: rank_recipe_scores(recipe_scores, k), limit, canonical)
+    return hydrate_top_recipes(top_ranked)
+
+
+def hydrate_top_recipes(top_ranked):
+    """Charge les recettes d'un top (fichier, score) en y ajoutant match_score"""
+    print(f"📊 Top {len(top_ranked)} fichiers trouvés: {top_ranked}")
     
     top_recipes = []
-    for filename, score in sorted_recipe_ids[:limit]:
+    for filename, score in top_ranked:
         recipe = get_recipe_by_filename(filename)
         if recipe:
             recipe['match_score'] = score
@@ -355,6 +778,97 @@ def search_recipes(request):
     return JsonResponse({'success': True, 'recipes': results})
 
 
+@require_http_methods(["GET"])
+def autocomplete(request):
+    """Suggestions de saisie pour un préfixe (paramètres: q, limit)"""
+    prefix = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 8)), settings.AUTOCOMPLETE_MAX_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': "'limit' doit être un entier"}, status=400)
+    
+    autocomplete_index = get_autocomplete_index()
+    with timed('autocomplete'):
+        suggestions = autocomplete_index.complete(prefix, limit)
+    
+    return JsonResponse({
+        'success': True,
+        'query': prefix,
+        'suggestions': suggestions,
+        'count': len(suggestions)
+    })
+
+
+@require_http_methods(["GET"])
+def phrase_search(request):
+    """Recettes contenant une expression exacte ou proche (paramètres: q, slop, limit)"""
+    phrase = request.GET.get('q', '').strip()
+    if not phrase:
+        return JsonResponse({'success': True, 'recipes': [], 'count': 0})
+    try:
+        slop = int(request.GET.get('slop', 0))
+        limit = max(1, min(int(request.GET.get('limit', 5)), settings.SEARCH_BATCH_MAX_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': "'slop' et 'limit' doivent être des entiers"}, status=400)
+    
+    positional_index = load_positional_index()
+    if positional_index is None:
+        return JsonResponse({'success': False, 'error': 'Index positionnel non disponible'}, status=500)
+    
+    with timed('search'):
+        matches = positional_index.phrase(phrase, slop)
+        ranked = rank_recipe_scores(matches, limit)
+    
+    documents = hydrate_recipes(filename for filename, _ in ranked)
+    recipes = [dict(documents[filename], phrase_count=count) for filename, count in ranked if filename in documents]
+    
+    return JsonResponse({
+        'success': True,
+        'query': phrase,
+        'slop': max(0, min(slop, positional_index.max_slop)),
+        'total_matches': len(matches),
+        'recipes': recipes,
+        'count': len(recipes)
+    })
+
+
+@require_http_methods(["GET"])
+def fulltext_search(request):
+    """Recherche plein texte titre / ingrédients / étapes (paramètres: q, limit, boost_title, boost_ingredients, boost_steps)"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'success': True, 'recipes': [], 'count': 0})
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 5)), settings.SEARCH_BATCH_MAX_LIMIT))
+        boosts = {
+            field: max(0.0, float(request.GET.get(f'boost_{field}', default)))
+            for field, default in settings.SEARCH_FIELD_BOOSTS.items()
+        }
+    except ValueError:
+        return JsonResponse({'success': False, 'error': "'limit' et les boosts doivent être des nombres"}, status=400)
+    
+    field_index = load_field_index()
+    if field_index is None:
+        return JsonResponse({'success': False, 'error': 'Index multi-champs non disponible'}, status=500)
+    
+    with timed('search'):
+        ranked = field_index.search(query, boosts, limit)
+    
+    documents = hydrate_recipes(filename for filename, *_ in ranked)
+    recipes = [
+        dict(documents[filename], match_score=score, matched_fields=fields)
+        for filename, score, fields in ranked if filename in documents
+    ]
+    
+    return JsonResponse({
+        'success': True,
+        'query': query,
+        'boosts': boosts,
+        'recipes': recipes,
+        'count': len(recipes)
+    })
+
+
 @require_http_methods(["GET"])
 def get_recipe_details(request, recipe_id):
     """Récupère les détails d'une recette spécifique"""
@@ -378,6 +892,38 @@ def get_recipe_details(request, recipe_id):
         return JsonResponse({'success': False, 'error': 'Recette non trouvée'}, status=404)
 
 
+@require_http_methods(["GET"])
+def get_similar_recipes(request, recipe_id):
+    """Recettes similaires, lues dans la table TF-IDF précalculée (paramètre optionnel: limit)"""
+    recipe_id = recipe_id.strip('/')
+    similar_table = load_similar_recipes()
+    if not similar_table:
+        return JsonResponse({'success': False, 'error': 'Table de similarité non disponible'}, status=500)
+    
+    neighbours = similar_table.get(f"{recipe_id}.json")
+    if neighbours is None:
+        return JsonResponse({'success': False, 'error': 'Recette non trouvée'}, status=404)
+    
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 5)), settings.SIMILAR_RECIPES_MAX_LIMIT))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': "'limit' doit être un entier"}, status=400)
+    neighbours = neighbours[:limit]
+    
+    documents = hydrate_recipes(filename for filename, _ in neighbours)
+    similar_recipes = [
+        dict(documents[filename], similarity=score)
+        for filename, score in neighbours if filename in documents
+    ]
+    
+    return JsonResponse({
+        'success': True,
+        'recipe_id': recipe_id,
+        'similar_recipes': similar_recipes,
+        'count': len(similar_recipes)
+    })
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def analyze_recipe_image(request):
@@ -388,8 +934,14 @@ def analyze_recipe_image(request):
         if 'image' not in request.FILES:
             return JsonResponse({'error': 'Aucune image fournie'}, status=400)
         
-        image_file = request.FILES['image']
-        analysis_result = analyze_image_with_gemini(image_file)
+        try:
+            analysis_result = recognize_dish(request.FILES['image'].read())
+        except gemini_client.RateLimitedError:
+            return JsonResponse({
+                'success': False,
+                'error': 'Quota API dépassé. Veuillez réessayer dans quelques minutes.',
+                'details': 'Le modèle Gemini a atteint sa limite et aucune photo de référence ne correspond.'
+            }, status=429)
         
         if not analysis_result:
             return JsonResponse({'success': False, 'error': 'Erreur d\'analyse d\'image'}, status=500)
@@ -408,6 +960,7 @@ def analyze_recipe_image(request):
         
         return JsonResponse({
             'success': True,
+            'analysis_source': analysis_result['source'],
             'matching_recipes': matching_recipes,
             'count': len(matching_recipes)
         })
@@ -417,8 +970,303 @@ def analyze_recipe_image(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def analyze_recipe_images(request):
+    """Analyse plusieurs images en parallèle (champ 'images', répétable)"""
+    try:
+        image_files = request.FILES.getlist('images') or request.FILES.getlist('image')
+        print(f"📸 Analyse par lot de {len(image_files)} image(s)")
+        
+        if not image_files:
+            return JsonResponse({'error': 'Aucune image fournie'}, status=400)
+        
+        max_images = settings.IMAGE_BATCH_MAX_IMAGES
+        if len(image_files) > max_images:
+            return JsonResponse({
+                'success': False,
+                'error': f'Trop d\'images ({len(image_files)}), maximum {max_images} par lot'
+            }, status=400)
+        
+        # Déduplication : deux uploads identiques ne coûtent qu'un appel Gemini
+        uploads = []
+        unique_images = {}
+        for image_file in image_files:
+            data = image_file.read()
+            digest = hashlib.sha256(data).hexdigest()
+            unique_images.setdefault(digest, data)
+            uploads.append((image_file.name, digest))
+        
+        analyses = analyze_images_concurrently(unique_images)
+        
+        # Un seul instantané de l'index pour tout le lot
+        ranked = {}
+        recognized = [(digest, analysis) for digest, (analysis, _) in analyses.items() if analysis]
+        if recognized:
+            inverted_index = load_inverted_index()
+            if not inverted_index:
+                return JsonResponse({'success': False, 'error': 'Index non disponible'}, status=500)
+            
+            top_lists = search_recipes_batch(
+                [(a['nom_recette'], a['ingredients_visibles']) for _, a in recognized], inverted_index
+            )
+            ranked = {digest: top for (digest, _), top in zip(recognized, top_lists)}
+        
+        # Hydratation en une passe : chaque recette n'est lue qu'une fois pour tout le lot
+        documents = hydrate_recipes(filename for top in ranked.values() for filename, _ in top)
+        
+        results = []
+        first_positions = {}
+        for position, (name, digest) in enumerate(uploads):
+            result = {'index': position, 'filename': name}
+            if digest in first_positions:
+                result['duplicate_of'] = first_positions[digest]
+            else:
+                first_positions[digest] = position
+            
+            analysis, error = analyses[digest]
+            if not analysis:
+                result.update({'success': False, 'error': error})
+            else:
+                matching_recipes = [
+                    dict(documents[filename], match_score=score)
+                    for filename, score in ranked[digest] if filename in documents
+                ]
+                result.update({
+                    'success': True,
+                    'analysis': analysis,
+                    'matching_recipes': matching_recipes,
+                    'count': len(matching_recipes),
+                })
+            results.append(result)
+        
+        print(f"✅ Lot analysé: {len(uploads)} image(s), {len(unique_images)} unique(s), "
+              f"{len(documents)} recette(s) chargée(s)")
+        
+        return JsonResponse({
+            'success': True,
+            'results': results,
+            'count': len(results),
+            'unique_images': len(unique_images),
+        })
+        
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def search_recipes_batch_view(request):
+    """Recherche par lot : {"queries": [{"nom_recette": ..., "ingredients_visibles": [...]}], "limit": 5}"""
+    try:
+        data = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'JSON invalide'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'success': False, 'error': 'JSON invalide'}, status=400)
+    
+    try:
+        queries = parse_batch_queries(data.get('queries'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    try:
+        limit = int(data.get('limit', 5))
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': "'limit' doit être un entier"}, status=400)
+    
+    max_queries = settings.SEARCH_BATCH_MAX_QUERIES
+    if not 1 <= len(queries) <= max_queries:
+        return JsonResponse({
+            'success': False,
+            'error': f'Le lot doit contenir entre 1 et {max_queries} requêtes'
+        }, status=400)
+    limit = max(1, min(limit, settings.SEARCH_BATCH_MAX_LIMIT))
+    
+    try:
+        print(f"🧠 Recherche par lot: {len(queries)} requête(s), top {limit}")
+        inverted_index = load_inverted_index()
+        if not inverted_index:
+            return JsonResponse({'success': False, 'error': 'Index non disponible'}, status=500)
+        
+        top_lists = search_recipes_batch(queries, inverted_index, limit)
+        documents = hydrate_recipes(filename for top in top_lists for filename, _ in top)
+        
+        results = []
+        for position, top in enumerate(top_lists):
+            matching_recipes = [
+                dict(documents[filename], match_score=score)
+                for filename, score in top if filename in documents
+            ]
+            results.append({'index': position, 'matching_recipes': matching_recipes, 'count': len(matching_recipes)})
+        
+        print(f"✅ Lot de {len(queries)} requête(s) évalué, {len(documents)} recette(s) chargée(s)")
+        return JsonResponse({'success': True, 'results': results, 'count': len(results)})
+    
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def what_can_i_cook(request):
+    """Recettes réalisables avec des ingrédients donnés : {"ingredients": [...], "exclude": [...], "limit": 10, "max_missing": 2}"""
+    try:
+        data = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'JSON invalide'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'success': False, 'error': 'JSON invalide'}, status=400)
+    
+    raw_have = data.get('ingredients', [])
+    raw_exclude = data.get('exclude', [])
+    if not all(isinstance(v, list) and all(isinstance(i, str) for i in v) for v in (raw_have, raw_exclude)):
+        return JsonResponse({
+            'success': False,
+            'error': "'ingredients' et 'exclude' doivent être des listes de textes"
+        }, status=400)
+    
+    try:
+        limit = max(1, min(int(data.get('limit', 10)), settings.SEARCH_BATCH_MAX_LIMIT))
+        max_missing = data.get('max_missing')
+        max_missing = None if max_missing is None else int(max_missing)
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': "'limit' et 'max_missing' doivent être des entiers"}, status=400)
+    
+    have, unknown = extract_known_ingredients(raw_have)
+    exclude, unknown_excluded = extract_known_ingredients(raw_exclude, groups=EXCLUSION_GROUPS)
+    if not have:
+        return JsonResponse({
+            'success': False,
+            'error': 'Aucun ingrédient reconnu',
+            'unknown_ingredients': unknown
+        }, status=400)
+    
+    inverted_index = load_inverted_index()
+    if not inverted_index:
+        return JsonResponse({'success': False, 'error': 'Index non disponible'}, status=500)
+    
+    print(f"🧺 Avec: {sorted(have)} | Sans: {sorted(exclude)}")
+    with timed('search'):
+        ranked = get_bitmap_index(inverted_index).query(have, exclude, limit, max_missing)
+    
+    documents = hydrate_recipes(filename for filename, *_ in ranked)
+    recipes = [
+        dict(documents[filename], coverage=round(coverage, 4), matched_count=matched, missing_ingredients=missing)
+        for filename, coverage, matched, missing in ranked if filename in documents
+    ]
+    
+    return JsonResponse({
+        'success': True,
+        'ingredients': sorted(have),
+        'excluded': sorted(exclude),
+        'unknown_ingredients': unknown + unknown_excluded,
+        'recipes': recipes,
+        'count': len(recipes)
+    })
+
+
+def extract_known_ingredients(values, groups=None):
+    """
+    Ramène des saisies libres (« tomatoes », « preserved lemon ») au vocabulaire de l'index.
+    Chaque mot analysé qui nomme une famille de groups y ajoute toute la famille
+    (« fish fillets » → fish, tuna, sardine).
+    """
+    known, unknown = set(), []
+    for value in values:
+        found = INGREDIENT_EXTRACTOR.extract_valid_ingredients(value)
+        for word in analyze(value):
+            found |= (groups or {}).get(word, set())
+        if found:
+            known |= found
+        else:
+            unknown.append(value)
+    return known, unknown
+
+
+def parse_batch_queries(raw_queries):
+    """Valide le champ 'queries' et retourne une liste de (nom_recette, ingrédients)"""
+    if not isinstance(raw_queries, list):
+        raise ValueError("Le champ 'queries' doit être une liste")
+    
+    queries = []
+    for position, query in enumerate(raw_queries):
+        if not isinstance(query, dict):
+            raise ValueError(f"Requête {position}: objet attendu")
+        nom_recette = query.get('nom_recette', '')
+        ingredients = query.get('ingredients_visibles', [])
+        if not isinstance(nom_recette, str) or not isinstance(ingredients, list) \
+                or not all(isinstance(ing, str) for ing in ingredients):
+            raise ValueError(f"Requête {position}: 'nom_recette' (texte) et 'ingredients_visibles' (liste de textes) attendus")
+        if not nom_recette.strip() and not ingredients:
+            raise ValueError(f"Requête {position}: vide")
+        queries.append((nom_recette.lower().strip(), [ing.lower().strip() for ing in ingredients]))
+    return queries
+
+
+def analyze_images_concurrently(images):
+    """Identifie chaque image (empreinte → octets) en parallèle : empreinte → (analyse, erreur)"""
+    workers = max(1, min(len(images), settings.IMAGE_BATCH_CONCURRENCY))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Chaque tâche reçoit une copie du contexte : ses phases remontent dans Server-Timing
+        futures = {
+            digest: pool.submit(contextvars.copy_context().run, analyze_image_bounded, data)
+            for digest, data in images.items()
+        }
+        return {digest: future.result() for digest, future in futures.items()}
+
+
+def analyze_image_bounded(data):
+    """Identifie une image ; les appels Gemini respectent la borne globale d'appels simultanés"""
+    try:
+        analysis = recognize_dish(data, gemini_slot=IMAGE_BATCH_SEMAPHORE)
+    except gemini_client.RateLimitedError:
+        return None, 'Quota API dépassé. Veuillez réessayer dans quelques minutes.'
+    return analysis, None if analysis else 'Erreur d\'analyse d\'image'
+
+
+def recognize_dish(data, gemini_slot=None):
+    """Identifie le plat : photo de référence si la correspondance est sûre, sinon Gemini (repli local sur 429)"""
+    local = recognize_dish_locally(data)
+    if local and local['confidence'] >= settings.IMAGE_LOCAL_CONFIDENT:
+        print(f"⚡ Reconnaissance locale ({local['confidence']:.2f}): {local['nom_recette']} ← {local['reference']}")
+        return dict(local, source='local')
+    
+    try:
+        with gemini_slot or contextlib.nullcontext():
+            analysis = analyze_image_with_gemini(io.BytesIO(data))
+    except gemini_client.RateLimitedError:
+        if local and local['confidence'] >= settings.IMAGE_LOCAL_FALLBACK_MIN:
+            print(f"🔁 Gemini limité (429), repli local ({local['confidence']:.2f}): {local['nom_recette']}")
+            return dict(local, source='local_fallback')
+        raise
+    
+    return dict(analysis, source='gemini') if analysis else None
+
+
+@timed_function('local_recognizer')
+def recognize_dish_locally(data):
+    """kNN sur les descripteurs des photos de référence (None si indisponible)"""
+    if not settings.IMAGE_LOCAL_RECOGNIZER:
+        return None
+    abs_path = os.path.abspath(local_recognizer.DESCRIPTORS_PATH)
+    if not os.path.exists(abs_path):
+        return None
+    from PIL import Image
+    try:
+        recognizer = local_recognizer.get_recognizer(load_cached_json(abs_path))
+        return recognizer.recognize(Image.open(io.BytesIO(data)))
+    except Exception as e:
+        print(f"⚠️ Reconnaissance locale impossible: {e}")
+        return None
+
+
+@timed_function('gemini_image')
 def analyze_image_with_gemini(image_file):
     """Analyse une image avec l'API Gemini"""
+    from PIL import Image
     try:
         image = Image.open(image_file)
     except Exception:
@@ -436,8 +1284,7 @@ IMPORTANT:
 - Réponds UNIQUEMENT avec le JSON, sans texte additionnel"""
     
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content([prompt, image])
+        response = gemini_client.generate_content([prompt, image])
         response_text = response.text.strip().replace('```json', '').replace('```', '').strip()
         
         result = json.loads(response_text)
@@ -447,6 +1294,8 @@ IMPORTANT:
         }
     except Exception as e:
         print(f"❌ Erreur Gemini: {e}")
+        if gemini_client.is_rate_limited(e):
+            raise gemini_client.RateLimitedError(str(e)) from e
         return None
 
 
@@ -603,44 +1452,71 @@ def voice_search(request):
     })
 
 
+# Plats et ingrédients reconnus par analyze_text_query, en plus des orthographes du lexique darija
+MOROCCAN_DISHES = {
+    'tagine', 'tajine', 'couscous', 'pastilla', 'harira', 'rfissa', 'taktouka',
+    'zaalouk', 'briouat', 'msemen', 'baghrir', 'shebakia', 'makouda',
+    'kefta', 'merguez', 'tanjia', 'mrouzia', 'bastilla', 'bessara',
+    'seffa', 'harcha', 'makrout', 'ghriba', 'kaab'
+}
+
+COMMON_INGREDIENTS = {
+    'poulet', 'chicken', 'agneau', 'lamb', 'boeuf', 'beef', 'poisson', 'fish',
+    'légumes', 'vegetables', 'carottes', 'carrots', 'pommes de terre', 'potatoes',
+    'oignons', 'onions', 'ail', 'garlic', 'citron', 'lemon', 'olives', 'olives',
+    'amandes', 'almonds', 'noix', 'walnuts', 'raisins', 'raisins', 'pruneaux', 'prunes',
+    'abricots', 'apricots', 'figues', 'figs', 'dattes', 'dates', 'miel', 'honey',
+    'cannelle', 'cinnamon', 'gingembre', 'ginger', 'curcuma', 'turmeric',
+    'cumin', 'cumin', 'paprika', 'paprika', 'safran', 'saffron', 'coriandre', 'coriander',
+    'persil', 'parsley', 'menthe', 'mint', 'semoule', 'semolina', 'farine', 'flour',
+    'oeufs', 'eggs', 'beurre', 'butter', 'huile', 'oil', 'sel', 'salt', 'poivre', 'pepper'
+}
+
+
+def normalize_query_text(text):
+    """Mots normalisés (minuscules, sans accents) séparés par un espace"""
+    return ' '.join(darija_lexicon.tokenize(text))
+
+
+def build_query_matcher():
+    """Automate des plats et ingrédients : expression normalisée → (type, terme de l'index)"""
+    dishes = MOROCCAN_DISHES | {dish.replace('_', ' ') for dish in INGREDIENT_EXTRACTOR.main_dishes}
+    # Une orthographe qui est déjà un terme de l'index (« tagine » et « tajine ») est gardée telle quelle
+    index_terms = INGREDIENT_EXTRACTOR.main_dishes | INGREDIENT_EXTRACTOR.valid_ingredients
+    phrases = {}
+    for term, spellings in darija_lexicon.FOOD_LEXICON.items():
+        kind = 'dish' if term in dishes else 'ingredient'
+        for spelling in spellings:
+            phrase = normalize_query_text(spelling)
+            phrases[phrase] = (kind, spelling if spelling in index_terms else term)
+    for ingredient in COMMON_INGREDIENTS:
+        phrase = normalize_query_text(ingredient)
+        phrases.setdefault(phrase, ('ingredient', darija_lexicon.FOOD_EXACT.get(phrase, phrase)))
+    for dish in dishes:
+        phrase = normalize_query_text(dish)
+        phrases[phrase] = ('dish', dish if dish in index_terms else darija_lexicon.FOOD_EXACT.get(phrase, phrase))
+    return PhraseMatcher(phrases)
+
+
+QUERY_MATCHER = build_query_matcher()
+
+
 def analyze_text_query(query_text):
-    """Analyse une requête texte pour extraire nom de recette et ingrédients"""
-    query_lower = query_text.lower().strip()
-    
-    moroccan_dishes = {
-        'tagine', 'tajine', 'couscous', 'pastilla', 'harira', 'rfissa', 'taktouka',
-        'zaalouk', 'briouat', 'msemen', 'baghrir', 'shebakia', 'makouda',
-        'kefta', 'merguez', 'tanjia', 'mrouzia', 'bastilla', 'bessara',
-        'seffa', 'harcha', 'makrout', 'ghriba'
-    }
-    
+    """
+    Analyse une requête texte pour extraire nom de recette et ingrédients.
+    Une passe de l'automate sur la requête : le premier plat (le plus à gauche, le plus long)
+    donne le nom, les ingrédients suivent l'ordre du texte, ramenés aux termes de l'index.
+    """
     detected_dish = None
-    for dish in moroccan_dishes:
-        if dish in query_lower:
-            detected_dish = dish
-            break
-    
-    common_ingredients = {
-        'poulet', 'chicken', 'agneau', 'lamb', 'boeuf', 'beef', 'poisson', 'fish',
-        'légumes', 'vegetables', 'carottes', 'carrots', 'pommes de terre', 'potatoes',
-        'oignons', 'onions', 'ail', 'garlic', 'citron', 'lemon', 'olives', 'olives',
-        'amandes', 'almonds', 'noix', 'walnuts', 'raisins', 'raisins', 'pruneaux', 'prunes',
-        'abricots', 'apricots', 'figues', 'figs', 'dattes', 'dates', 'miel', 'honey',
-        'cannelle', 'cinnamon', 'gingembre', 'ginger', 'curcuma', 'turmeric',
-        'cumin', 'cumin', 'paprika', 'paprika', 'safran', 'saffron', 'coriandre', 'coriander',
-        'persil', 'parsley', 'menthe', 'mint', 'semoule', 'semolina', 'farine', 'flour',
-        'oeufs', 'eggs', 'beurre', 'butter', 'huile', 'oil', 'sel', 'salt', 'poivre', 'pepper'
-    }
-    
     detected_ingredients = []
-    words = query_lower.split()
-    
-    for word in words:
-        clean_word = re.sub(r'[^a-zéèêëàâäôöûüç]', '', word)
-        if clean_word in common_ingredients:
-            detected_ingredients.append(clean_word)
+    for _, _, _, (kind, term) in QUERY_MATCHER.find(normalize_query_text(query_text)):
+        if kind == 'dish':
+            detected_dish = detected_dish or term
+        elif term not in detected_ingredients:
+            detected_ingredients.append(term)
     
     if not detected_ingredients:
+        words = query_text.lower().strip().split()
         meaningful_words = [w for w in words if len(w) > 3 and w not in STOP_WORDS]
         if meaningful_words:
             detected_ingredients = meaningful_words[:3]
@@ -651,6 +1527,18 @@ def analyze_text_query(query_text):
     }
 
 
+@timed_function('local_lexicon')
+def resolve_text_locally(text):
+    """Traduction locale (lexique darija / français) si tous les mots sont connus, sinon None"""
+    if not settings.TEXT_LOCAL_LEXICON:
+        return None
+    terms, unknown_words = darija_lexicon.resolve_query(text, load_inverted_index(), STOP_WORDS)
+    if unknown_words:
+        print(f"🔤 Mots hors lexique {unknown_words} → Gemini")
+        return None
+    return ' '.join(terms) or None
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def text_search(request):
@@ -697,59 +1585,64 @@ def text_search(request):
                 "success": False
             }, status=400)
         
-        print(f"\n🔑 VÉRIFICATION CLÉ API GEMINI")
-        if not GEMINI_API_KEY or GEMINI_API_KEY == "":
-            print("❌ ERREUR: Clé API Gemini non configurée")
-            return JsonResponse({
-                'success': False,
-                'error': 'Configuration API manquante',
-                'details': 'GEMINI_API_KEY non configurée'
-            }, status=500)
+        dish_name_en = resolve_text_locally(text)
+        analysis_source = 'lexicon' if dish_name_en else 'gemini'
         
-        print(f"✅ Clé API configurée (longueur: {len(GEMINI_API_KEY)})")
+        if dish_name_en:
+            print(f"\n⚡ LEXIQUE LOCAL: '{dish_name_en}' (Gemini non appelé)")
+        else:
+            print(f"\n🔑 VÉRIFICATION CLÉ API GEMINI")
+            if not GEMINI_API_KEY or GEMINI_API_KEY == "":
+                print("❌ ERREUR: Clé API Gemini non configurée")
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Configuration API manquante',
+                    'details': 'GEMINI_API_KEY non configurée'
+                }, status=500)
         
-        print(f"\n🤖 ANALYSE AVEC GEMINI")
-        print(f"   Texte à analyser: '{text[:50]}...'")
+            print(f"✅ Clé API configurée (longueur: {len(GEMINI_API_KEY)})")
         
-        try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            
-            prompt = f"""This is Moroccan Darija written with French characters. Translate the text to English, but **do NOT translate any food names**. Keep the food names exactly as they appear. Translate all verbs, pronouns, and other words to English. Answer with the full translated sentence, keeping the food names intact. 
+            print(f"\n🤖 ANALYSE AVEC GEMINI")
+            print(f"   Texte à analyser: '{text[:50]}...'")
+        
+            try:
+                prompt = f"""This is Moroccan Darija written with French characters. Translate the text to English, but **do NOT translate any food names**. Keep the food names exactly as they appear. Translate all verbs, pronouns, and other words to English. Answer with the full translated sentence, keeping the food names intact. 
 
 Text: "{text}"
 
 Answer:"""
             
-            print(f"📤 Envoi prompt à Gemini...")
+                print(f"📤 Envoi prompt à Gemini...")
             
-            response = model.generate_content(prompt)
-            dish_name_en = response.text.strip().lower()
+                with timed('gemini_text'):
+                    response = gemini_client.generate_content(prompt)
+                dish_name_en = response.text.strip().lower()
             
-            print(f"📥 Réponse Gemini brute: '{dish_name_en}'")
+                print(f"📥 Réponse Gemini brute: '{dish_name_en}'")
             
-            dish_name_en = re.sub(r'[^\w\s]', '', dish_name_en)
-            dish_name_en = dish_name_en.strip()
+                dish_name_en = re.sub(r'[^\w\s]', '', dish_name_en)
+                dish_name_en = dish_name_en.strip()
             
-            print(f"✅ NOM DE PLAT NETTOYÉ: '{dish_name_en}'")
+                print(f"✅ NOM DE PLAT NETTOYÉ: '{dish_name_en}'")
             
-            if not dish_name_en or dish_name_en in ['', 'n/a', 'none', 'unknown']:
-                print("❌ ERREUR: Nom de plat vide ou invalide")
+                if not dish_name_en or dish_name_en in ['', 'n/a', 'none', 'unknown']:
+                    print("❌ ERREUR: Nom de plat vide ou invalide")
+                    return JsonResponse({
+                        'success': False,
+                        'error': 'Impossible d\'extraire le nom du plat',
+                        'text': text,
+                        'details': 'Réponse Gemini invalide ou vide'
+                    }, status=500)
+                
+            except Exception as gemini_err:
+                print(f"❌ ERREUR GEMINI: {gemini_err}")
+                traceback.print_exc()
                 return JsonResponse({
                     'success': False,
-                    'error': 'Impossible d\'extraire le nom du plat',
+                    'error': 'Erreur lors de l\'analyse Gemini',
                     'text': text,
-                    'details': 'Réponse Gemini invalide ou vide'
+                    'details': str(gemini_err)
                 }, status=500)
-                
-        except Exception as gemini_err:
-            print(f"❌ ERREUR GEMINI: {gemini_err}")
-            traceback.print_exc()
-            return JsonResponse({
-                'success': False,
-                'error': 'Erreur lors de l\'analyse Gemini',
-                'text': text,
-                'details': str(gemini_err)
-            }, status=500)
         
         print(f"\n📚 CHARGEMENT INDEX INVERSE")
         inverted_index = load_inverted_index()
@@ -801,6 +1694,7 @@ Answer:"""
                 'message': 'Aucune recette trouvée',
                 'original_text': text,
                 'dish_name_english': dish_name_en,
+                'analysis_source': analysis_source,
                 'matching_recipes': [],
                 'count': 0
             })
@@ -825,6 +1719,7 @@ Answer:"""
             'message': 'Recherche Darija réussie',
             'original_text': text,
             'dish_name_english': dish_name_en,
+            'analysis_source': analysis_source,
             'matching_recipes': matching_recipes,
             'count': len(matching_recipes)
         })
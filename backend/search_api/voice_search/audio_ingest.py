@@ -0,0 +1,533 @@
+"""
+Réception des fichiers audio (transcribe/, voice-search/)
+- Upload écrit dans un SpooledTemporaryFile : en mémoire jusqu'à AUDIO_SPOOL_MEMORY_BYTES, sur disque au-delà
+- Taille bornée (AUDIO_MAX_BYTES) : Content-Length vérifié avant de lire le corps, puis chaque chunk
+  compté ; la réception s'arrête au premier dépassement
+- Format détecté sur les premiers octets (signatures), pas sur l'extension du nom de fichier ;
+  un WAV sans canal ou à taille d'échantillon invalide est refusé (415)
+- Durée bornée (AUDIO_MAX_SECONDS) : refus pendant la réception quand l'en-tête la donne
+  (WAV, FLAC, AIFF) ; un WAV en flux (taille inconnue) est coupé dès que les octets reçus
+  dépassent débit × durée max. Pour les autres formats (WebM/Matroska, OGG, M4A, MP3, AAC),
+  la durée est lue dans le conteneur une fois le fichier reçu
+- Le fichier spoolé est passé tel quel au client Gemini (files.upload lit un flux) : aucune copie
+"""
+
+import struct
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+AUDIO_FIELD = "audio"
+# Octets lus avant de détecter le format (en-têtes WAV/FLAC compris)
+SNIFF_BYTES = 4096
+# Part du corps multipart qui n'est pas le fichier (frontières, en-têtes de parties)
+MULTIPART_OVERHEAD = 64 * 1024
+# Octets lus au début et à la fin du fichier reçu pour trouver sa durée dans le conteneur
+PROBE_HEAD_BYTES = 64 * 1024
+PROBE_TAIL_BYTES = 256 * 1024
+# Taille max d'une boîte 'moov' (M4A) lue pour sa durée
+MAX_MOOV_BYTES = 4 * 1024 * 1024
+
+# Octets par échantillon d'un WAV décodable (8 à 32 bits entiers, flottants 32 et 64 bits)
+WAV_SAMPLE_WIDTHS = (1, 2, 3, 4, 8)
+
+# Types MIME : ceux que le SDK déduisait auparavant de l'extension (mimetypes)
+WEBM_MIME = "video/webm"
+MATROSKA_MIME = "video/x-matroska"
+
+
+class AudioRejected(Exception):
+    """Upload refusé : message et statut HTTP de la réponse"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def sniff_audio_format(head):
+    """Type MIME d'après la signature des premiers octets, None si le format n'est pas reconnu"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/x-wav"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "audio/x-aiff"
+    if head[:4] == b"OggS":
+        return "audio/ogg"
+    if head[:4] == b"fLaC":
+        return "audio/flac"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        # EBML : le DocType distingue WebM (enregistreur du navigateur) de Matroska
+        return WEBM_MIME if b"webm" in head[:64] else MATROSKA_MIME
+    if head[4:8] == b"ftyp":
+        return "audio/mp4"
+    if head[:3] == b"ID3":
+        return "audio/mpeg"
+    if len(head) >= 2 and head[0] == 0xFF:
+        # Trame MPEG (MP3) ou ADTS (AAC) : synchro 11 bits, couche 00 pour l'AAC
+        if head[1] & 0xF6 == 0xF0:
+            return "audio/aac"
+        if head[1] & 0xE0 == 0xE0 and head[1] & 0x06:
+            return "audio/mpeg"
+    return None
+
+
+def wav_profile(head):
+    """
+    (durée déclarée en s ou None, octets audio par seconde ou None) d'un en-tête WAV.
+    Lève ValueError si le bloc fmt n'a pas de canal ou une taille d'échantillon invalide.
+    """
+    byte_rate, data_size = None, None
+    offset = 12
+    while offset + 8 <= len(head):
+        chunk_id, size = head[offset:offset + 4], struct.unpack_from("<I", head, offset + 4)[0]
+        if chunk_id == b"fmt " and offset + 24 <= len(head):
+            check_wav_format(struct.unpack_from("<H", head, offset + 10)[0],
+                             struct.unpack_from("<H", head, offset + 22)[0])
+            byte_rate = struct.unpack_from("<I", head, offset + 16)[0] or None
+        elif chunk_id == b"data":
+            # Enregistrement en flux : taille laissée à 0 ou au maximum
+            data_size = size if 0 < size < 0xFFFFFFFF else None
+            break
+        offset += 8 + size + (size & 1)
+    if byte_rate is None:
+        return None, None
+    return (data_size / byte_rate if data_size else None), byte_rate
+
+
+def check_wav_format(channels, bits):
+    """ValueError si le bloc fmt d'un WAV ne peut pas décrire des échantillons (0 canal, 0 à 7 bits...)"""
+    if not channels:
+        raise ValueError("WAV sans canal")
+    if bits % 8 or bits // 8 not in WAV_SAMPLE_WIDTHS:
+        raise ValueError(f"échantillons de {bits} bits non supportés")
+
+
+def flac_duration(head):
+    """Durée d'après le bloc STREAMINFO (échantillons / fréquence), None si non renseignée"""
+    if len(head) < 26 or head[4] & 0x7F != 0:
+        return None
+    packed = int.from_bytes(head[18:26], "big")
+    sample_rate = packed >> 44
+    total_samples = packed & 0xFFFFFFFFF
+    return total_samples / sample_rate if sample_rate and total_samples else None
+
+
+def aiff_duration(head):
+    """Durée d'après le bloc COMM (trames / fréquence en flottant étendu 80 bits), None si absent"""
+    offset = 12
+    while offset + 8 <= len(head):
+        chunk_id, size = head[offset:offset + 4], struct.unpack_from(">I", head, offset + 4)[0]
+        if chunk_id == b"COMM" and offset + 26 <= len(head):
+            frames = struct.unpack_from(">I", head, offset + 10)[0]
+            exponent, mantissa = struct.unpack_from(">HQ", head, offset + 16)
+            rate = mantissa * 2.0 ** ((exponent & 0x7FFF) - 16383 - 63)
+            return frames / rate if rate and frames else None
+        offset += 8 + size + (size & 1)
+    return None
+
+
+def read_head_tail(file):
+    """(début, fin) du fichier reçu, PROBE_HEAD_BYTES et PROBE_TAIL_BYTES au plus"""
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    head = file.read(PROBE_HEAD_BYTES)
+    file.seek(max(0, size - PROBE_TAIL_BYTES))
+    return head, file.read(PROBE_TAIL_BYTES)
+
+
+def ogg_duration(file):
+    """Position (granule) de la dernière page / fréquence : 48 kHz moins le pre-skip en Opus, en-tête Vorbis"""
+    head, tail = read_head_tail(file)
+    opus = head.find(b"OpusHead")
+    vorbis = head.find(b"\x01vorbis")
+    if opus >= 0:
+        rate, skip = 48000, struct.unpack_from("<H", head, opus + 10)[0]
+    elif vorbis >= 0:
+        rate, skip = struct.unpack_from("<I", head, vorbis + 12)[0], 0
+    else:
+        return None
+    page = tail.rfind(b"OggS")
+    while page >= 0:
+        # Granule -1 : aucun paquet ne se termine dans la page, la précédente porte la position
+        granule = struct.unpack_from("<q", tail, page + 6)[0] if page + 14 <= len(tail) else -1
+        if granule >= 0:
+            return max(0, granule - skip) / rate if rate else None
+        page = tail.rfind(b"OggS", 0, page)
+    return None
+
+
+EBML_SEGMENT, EBML_INFO, EBML_CLUSTER = 0x18538067, 0x1549A966, 0x1F43B675
+EBML_TIMECODE_SCALE, EBML_DURATION, EBML_TIMECODE = 0x2AD7B1, 0x4489, 0xE7
+EBML_SIMPLE_BLOCK, EBML_BLOCK_GROUP, EBML_BLOCK = 0xA3, 0xA0, 0xA1
+# Éléments permis partout (somme de contrôle, remplissage)
+EBML_CRC32, EBML_VOID = 0xBF, 0xEC
+
+
+def read_vint(data, pos, marker=False):
+    """(valeur, longueur) d'un entier EBML ; marker=True garde le bit de longueur (identifiants)"""
+    first = data[pos]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise ValueError("entier EBML invalide")
+    value = first if marker else first & ((0x80 >> (length - 1)) - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    return value, length
+
+
+def ebml_elements(data, pos, end):
+    """(identifiant, début des données, taille ou None si inconnue) des éléments de data[pos:end]"""
+    while pos < end:
+        element_id, id_length = read_vint(data, pos, marker=True)
+        size, size_length = read_vint(data, pos + id_length)
+        start = pos + id_length + size_length
+        # Tous les bits de la taille à 1 : taille inconnue
+        unknown = size == (1 << (7 * size_length)) - 1
+        yield element_id, start, None if unknown else size
+        # Taille inconnue (enregistrement en direct) : les éléments fils suivent directement
+        pos = start if unknown else start + size
+
+
+def matroska_duration(file):
+    """
+    Durée du segment (Info/Duration × TimecodeScale) ; MediaRecorder ne l'écrit pas : on prend
+    alors le dernier bloc du dernier cluster (timecode du cluster + timecode relatif du bloc)
+    """
+    head, tail = read_head_tail(file)
+    try:
+        scale, duration = segment_info(head)
+    except (ValueError, IndexError, struct.error):
+        scale, duration = 1000000, None
+    if duration:
+        return duration * scale / 1e9
+
+    cluster = tail.rfind(EBML_CLUSTER.to_bytes(4, "big"))
+    while cluster >= 0:
+        try:
+            return cluster_end(tail, cluster) * scale / 1e9
+        except (ValueError, IndexError, struct.error, StopIteration):
+            cluster = tail.rfind(EBML_CLUSTER.to_bytes(4, "big"), 0, cluster)
+    return None
+
+
+def segment_info(head):
+    """(TimecodeScale en ns, Duration en ticks ou None) du bloc Info du segment"""
+    scale, duration = 1000000, None
+    for element_id, start, size in ebml_elements(head, 0, len(head)):
+        if element_id != EBML_SEGMENT:
+            continue
+        for child_id, child_start, child_size in ebml_elements(head, start, len(head)):
+            if child_id == EBML_CLUSTER:
+                break
+            if child_id != EBML_INFO or child_size is None:
+                continue
+            for info_id, info_start, info_size in ebml_elements(head, child_start, child_start + child_size):
+                value = head[info_start:info_start + info_size]
+                if info_id == EBML_TIMECODE_SCALE:
+                    scale = int.from_bytes(value, "big") or scale
+                elif info_id == EBML_DURATION and info_size in (4, 8):
+                    duration = struct.unpack(">f" if info_size == 4 else ">d", value)[0]
+            break
+        break
+    return scale, duration
+
+
+def cluster_end(data, pos):
+    """Timecode (en ticks) du dernier bloc du cluster qui commence à data[pos]"""
+    _, start, size = next(ebml_elements(data, pos, len(data)))
+    end = len(data) if size is None else min(len(data), start + size)
+    children = ebml_elements(data, start, end)
+    # Le Timecode ouvre le cluster : sinon les 4 octets trouvés étaient dans des données audio
+    element_id, child_start, child_size = next(children)
+    while element_id in (EBML_CRC32, EBML_VOID):
+        element_id, child_start, child_size = next(children)
+    if element_id != EBML_TIMECODE or child_size is None:
+        raise ValueError("cluster sans timecode")
+    timecode = int.from_bytes(data[child_start:child_start + child_size], "big")
+    last_block = 0
+    try:
+        for element_id, child_start, child_size in children:
+            if element_id == EBML_CLUSTER or child_size is None:
+                break
+            if element_id in (EBML_SIMPLE_BLOCK, EBML_BLOCK_GROUP):
+                block = child_start
+                if element_id == EBML_BLOCK_GROUP:
+                    block_id, block, _ = next(ebml_elements(data, child_start, child_start + child_size))
+                    if block_id != EBML_BLOCK:
+                        continue
+                _, track_length = read_vint(data, block)
+                last_block = max(last_block, struct.unpack_from(">h", data, block + track_length)[0])
+    except (ValueError, IndexError, struct.error):
+        # Cluster coupé par la fin du fichier : les blocs déjà lus suffisent
+        pass
+    return timecode + last_block
+
+
+def full_box_times(data, box):
+    """(timescale, durée) d'une boîte 'mvhd' ou 'mdhd' dont le type commence à data[box]"""
+    if data[box + 4] == 1:
+        return struct.unpack_from(">IQ", data, box + 24)
+    return struct.unpack_from(">II", data, box + 16)
+
+
+def fragment_end(moof, timescale):
+    """Fin (en s) d'un fragment 'moof' : 'tfdt' (début) + durées des échantillons de 'trun'"""
+    tfdt = moof.find(b"tfdt")
+    if tfdt < 0:
+        return None
+    start = struct.unpack_from(">Q" if moof[tfdt + 4] == 1 else ">I", moof, tfdt + 8)[0]
+    length = 0
+    trun = moof.find(b"trun")
+    if trun >= 0:
+        flags = int.from_bytes(moof[trun + 5:trun + 8], "big")
+        count = struct.unpack_from(">I", moof, trun + 8)[0]
+        entry = trun + 12 + (4 if flags & 0x1 else 0) + (4 if flags & 0x4 else 0)
+        entry_size = 4 * sum(1 for bit in (0x100, 0x200, 0x400, 0x800) if flags & bit)
+        if flags & 0x100:
+            length = sum(struct.unpack_from(">I", moof, entry + i * entry_size)[0] for i in range(count))
+        else:
+            tfhd = moof.find(b"tfhd")
+            tfhd_flags = int.from_bytes(moof[tfhd + 5:tfhd + 8], "big") if tfhd >= 0 else 0
+            if tfhd_flags & 0x8:
+                default = tfhd + 12 + (8 if tfhd_flags & 0x1 else 0) + (4 if tfhd_flags & 0x2 else 0)
+                length = count * struct.unpack_from(">I", moof, default)[0]
+    return (start + length) / timescale
+
+
+def mp4_duration(file):
+    """
+    Durée de l'en-tête 'mvhd' de la boîte 'moov', où qu'elle soit dans le fichier. Un MP4 fragmenté
+    (enregistrement en direct, Safari) y laisse 0 : la fin du dernier fragment 'moof' la donne alors
+    """
+    file.seek(0, 2)
+    size = file.tell()
+    offset = 0
+    moov, last_moof = None, None
+    while offset + 8 <= size:
+        file.seek(offset)
+        box_size, box_type = struct.unpack(">I4s", file.read(8))
+        header = 8
+        if box_size == 1:
+            box_size, header = struct.unpack(">Q", file.read(8))[0], 16
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < header:
+            return None
+        if box_type == b"moov":
+            moov = file.read(min(box_size - header, MAX_MOOV_BYTES))
+            mvhd = moov.find(b"mvhd")
+            if mvhd < 0:
+                return None
+            timescale, duration = full_box_times(moov, mvhd)
+            if timescale and duration:
+                return duration / timescale
+        elif box_type == b"moof":
+            last_moof = (offset + header, box_size - header)
+        offset += box_size
+
+    if moov is None or last_moof is None:
+        return None
+    # Temps des fragments exprimés dans l'échelle de la piste ('mdhd'), pas dans celle du film
+    mdhd = moov.find(b"mdhd")
+    timescale = full_box_times(moov, mdhd)[0] if mdhd >= 0 else 0
+    if not timescale:
+        return None
+    file.seek(last_moof[0])
+    return fragment_end(file.read(min(last_moof[1], MAX_MOOV_BYTES)), timescale)
+
+
+MP3_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def mp3_duration(file):
+    """Durée d'un MP3 (couche III) : nombre de trames de l'en-tête Xing/Info, sinon taille / débit (CBR)"""
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    head = file.read(PROBE_HEAD_BYTES)
+    start = 0
+    if head[:3] == b"ID3" and len(head) >= 10:
+        # Taille ID3v2 en entier « syncsafe » (7 bits par octet), plus le pied de page éventuel
+        start = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+        start += 10 if head[5] & 0x10 else 0
+    while start + 4 <= len(head) and not (head[start] == 0xFF and head[start + 1] & 0xE0 == 0xE0):
+        start += 1
+    if start + 4 > len(head):
+        return None
+    version, layer = (head[start + 1] >> 3) & 3, (head[start + 1] >> 1) & 3
+    bitrate_index, rate_index = head[start + 2] >> 4, (head[start + 2] >> 2) & 3
+    if layer != 1 or version == 1 or rate_index == 3 or bitrate_index in (0, 15):
+        return None
+    rate = MP3_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+    mono = head[start + 3] >> 6 == 3
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = start + 4 + side_info
+    if head[xing:xing + 4] in (b"Xing", b"Info") and head[xing + 7] & 1:
+        frames = struct.unpack_from(">I", head, xing + 8)[0]
+        return frames * samples_per_frame / rate
+    bitrate = MP3_BITRATES[3 if version == 3 else 2][bitrate_index] * 1000
+    return (size - start) * 8 / bitrate
+
+
+AAC_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350]
+
+
+def adts_duration(file):
+    """Durée d'un flux AAC ADTS : trames parcourues une à une (1024 échantillons par bloc)"""
+    data = file.read()
+    pos, samples, rate = 0, 0, None
+    while pos + 7 <= len(data) and data[pos] == 0xFF and data[pos + 1] & 0xF6 == 0xF0:
+        rate_index = (data[pos + 2] >> 2) & 0xF
+        if rate_index >= len(AAC_SAMPLE_RATES):
+            return None
+        rate = AAC_SAMPLE_RATES[rate_index]
+        length = ((data[pos + 3] & 3) << 11) | (data[pos + 4] << 3) | (data[pos + 5] >> 5)
+        if length < 7:
+            break
+        samples += 1024 * ((data[pos + 6] & 3) + 1)
+        pos += length
+    return samples / rate if rate else None
+
+
+# Formats dont la durée n'est connue qu'une fois le fichier reçu
+DURATION_PROBES = {
+    "audio/ogg": ogg_duration,
+    WEBM_MIME: matroska_duration,
+    MATROSKA_MIME: matroska_duration,
+    "audio/mp4": mp4_duration,
+    "audio/mpeg": mp3_duration,
+    "audio/aac": adts_duration,
+}
+
+
+def container_duration(file, mime_type):
+    """Durée en secondes lue dans le conteneur du fichier reçu, None si elle n'y est pas"""
+    probe = DURATION_PROBES.get(mime_type)
+    if probe is None:
+        return None
+    try:
+        file.seek(0)
+        return probe(file)
+    except (ValueError, IndexError, struct.error, StopIteration):
+        return None
+    finally:
+        file.seek(0)
+
+
+class AudioUploadHandler(FileUploadHandler):
+    """
+    Reçoit le champ 'audio' dans un SpooledTemporaryFile et l'interrompt dès qu'une limite est
+    dépassée. Le refus est gardé dans self.rejection ; les autres fichiers sont ignorés.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = settings.AUDIO_MAX_BYTES
+        self.max_seconds = settings.AUDIO_MAX_SECONDS
+        self.rejection = None
+        self.file = None
+        self.skipping = False
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        # Pas de SkipFile : le parseur fermerait aussi self.file (l'audio déjà reçu)
+        self.skipping = field_name != AUDIO_FIELD or self.file is not None
+        if self.skipping:
+            return
+        self.file = tempfile.SpooledTemporaryFile(max_size=settings.AUDIO_SPOOL_MEMORY_BYTES)
+        self.head = b""
+        self.received = 0
+        self.mime_type = None
+        self.duration = None
+        self.byte_limit = self.max_bytes
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.skipping:
+            # Chaque partie compte dans le corps déjà borné par Content-Length
+            return None
+        self.received += len(raw_data)
+        if self.received > self.byte_limit:
+            if self.byte_limit < self.max_bytes:
+                self.reject(f"Audio trop long (max {self.max_seconds} s)", 413)
+            else:
+                self.reject(f"Fichier audio trop volumineux (max {self.max_bytes // (1024 * 1024)} Mo)", 413)
+        if self.mime_type is None:
+            self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self.inspect_head()
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.skipping:
+            return None
+        if self.mime_type is None:
+            self.inspect_head()
+        self.file.seek(0)
+        return UploadedFile(file=self.file, name=self.file_name, content_type=self.mime_type,
+                            size=file_size, charset=None)
+
+    def inspect_head(self):
+        """Format et durée d'après l'en-tête : refus immédiat, avant de recevoir la suite"""
+        self.mime_type = sniff_audio_format(self.head)
+        if self.mime_type is None:
+            self.reject("Format audio non reconnu (WAV, MP3, OGG, FLAC, AAC, M4A, AIFF ou WebM)", 415)
+        duration, byte_rate = None, None
+        if self.mime_type == "audio/x-wav":
+            try:
+                duration, byte_rate = wav_profile(self.head)
+            except ValueError as e:
+                self.reject(f"WAV non supporté ({e})", 415)
+        elif self.mime_type == "audio/flac":
+            duration = flac_duration(self.head)
+        elif self.mime_type == "audio/x-aiff":
+            duration = aiff_duration(self.head)
+        self.duration = duration
+        if duration is not None and duration > self.max_seconds:
+            self.reject(f"Audio trop long ({duration:.0f} s, max {self.max_seconds} s)", 413)
+        if duration is None and byte_rate:
+            # Durée inconnue mais débit fixe : la borne de durée devient une borne d'octets
+            self.byte_limit = min(self.max_bytes, SNIFF_BYTES + byte_rate * self.max_seconds)
+            if self.received > self.byte_limit:
+                self.reject(f"Audio trop long (max {self.max_seconds} s)", 413)
+
+    def reject(self, message, status):
+        self.rejection = AudioRejected(message, status)
+        # Le reste du corps n'est pas lu ; le parseur ferme self.file
+        raise StopUpload(connection_reset=True)
+
+
+def receive_audio(request):
+    """
+    Fichier audio de la requête (UploadedFile sur un SpooledTemporaryFile, type MIME détecté).
+    Lève AudioRejected si l'upload manque ou dépasse une limite.
+    """
+    content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+    if content_length > settings.AUDIO_MAX_BYTES + MULTIPART_OVERHEAD:
+        raise AudioRejected(
+            f"Fichier audio trop volumineux (max {settings.AUDIO_MAX_BYTES // (1024 * 1024)} Mo)", 413)
+
+    handler = AudioUploadHandler(request)
+    request.upload_handlers = [handler]
+    audio_file = request.FILES.get(AUDIO_FIELD)
+    if handler.rejection is not None:
+        raise handler.rejection
+    if audio_file is None:
+        raise AudioRejected("Aucun fichier envoyé", 400)
+
+    # Durée absente de l'en-tête (WebM, OGG, M4A, MP3...) : lue dans le conteneur reçu
+    if handler.duration is None:
+        duration = container_duration(audio_file.file, audio_file.content_type)
+        if duration is not None and duration > settings.AUDIO_MAX_SECONDS:
+            audio_file.close()
+            raise AudioRejected(f"Audio trop long ({duration:.0f} s, max {settings.AUDIO_MAX_SECONDS} s)", 413)
+    return audio_file
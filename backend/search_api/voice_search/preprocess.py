@@ -0,0 +1,216 @@
+"""
+Prétraitement local de l'audio avant l'envoi à Gemini (transcribe/, voice-search/)
+- Décodage : WAV lu directement (PCM 8/16/24/32 bits, flottant) ; autres conteneurs (WebM/Opus du
+  navigateur, OGG, MP3, M4A...) décodés par ffmpeg s'il est installé (AUDIO_FFMPEG)
+- Mono (moyenne des canaux), 16 kHz (rééchantillonnage polyphase), silences de début et de fin
+  retirés par un VAD à énergie (trames de 30 ms comparées à la plus forte)
+- Ré-encodage : Opus 24 kbit/s dans OGG avec ffmpeg, sinon WAV PCM 16 bits
+- Le fichier reçu est gardé tel quel si rien ne peut le décoder ou si le résultat n'est pas plus petit
+- Durée vérifiée sur l'audio décodé : ffmpeg s'arrête juste après AUDIO_MAX_SECONDS, au-delà
+  AudioRejected (413), même quand le conteneur ne donnait pas la durée
+"""
+
+import io
+import shutil
+import struct
+import subprocess
+import wave
+from math import gcd
+
+import numpy as np
+from django.conf import settings
+
+from .audio_ingest import AudioRejected, check_wav_format
+
+TARGET_RATE = 16000
+# VAD : trames de 30 ms ; parole = plus de -50 dBFS et moins de 35 dB sous la trame la plus forte
+FRAME_SECONDS = 0.03
+VAD_FLOOR_DB = -50.0
+VAD_RANGE_DB = 35.0
+# Marge gardée avant la première et après la dernière trame de parole
+VAD_PADDING_SECONDS = 0.25
+OPUS_BITRATE = "24k"
+FFMPEG_TIMEOUT = 60
+# Décodage poussé un peu au-delà de AUDIO_MAX_SECONDS : assez pour voir que la limite est dépassée
+DECODE_MARGIN_SECONDS = 1
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class PreparedAudio:
+    """Audio prêt à l'envoi, avec tailles et durées avant / après prétraitement"""
+
+    def __init__(self, file, mime_type, original_bytes, size, original_seconds=None, seconds=None,
+                 method="original"):
+        self.file = file
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+        self.size = size
+        self.original_seconds = original_seconds
+        self.seconds = seconds
+        # "original" (envoyé tel quel), "opus" ou "wav"
+        self.method = method
+
+
+def ffmpeg_path():
+    """Exécutable ffmpeg configuré (AUDIO_FFMPEG), None s'il est introuvable"""
+    return shutil.which(settings.AUDIO_FFMPEG) if settings.AUDIO_FFMPEG else None
+
+
+def decode_wav(data):
+    """
+    (échantillons float32 [n, canaux] dans [-1, 1], fréquence) d'un WAV, None si non supporté.
+    Lève ValueError si le bloc fmt est invalide (aucun canal, taille d'échantillon hors 8 à 64 bits).
+    """
+    fmt, samples = None, None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, size = data[offset:offset + 4], struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                tag = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            # Enregistrement en flux : taille à 0 ou au maximum, les données vont jusqu'à la fin
+            end = body + size if 0 < size < 0xFFFFFFFF else len(data)
+            samples = data[body:min(end, len(data))]
+            break
+        offset = body + size + (size & 1)
+    if fmt is None or samples is None:
+        return None
+
+    tag, channels, rate, bits = fmt
+    check_wav_format(channels, bits)
+    if not rate:
+        raise ValueError("WAV sans fréquence d'échantillonnage")
+    width = bits // 8
+    samples = samples[:len(samples) - len(samples) % (width * channels)]
+    if tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        pcm = np.frombuffer(samples, dtype=f"<f{width}").astype(np.float32)
+    elif tag == WAVE_FORMAT_PCM and bits == 8:
+        pcm = (np.frombuffer(samples, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif tag == WAVE_FORMAT_PCM and bits in (16, 32):
+        pcm = np.frombuffer(samples, dtype=f"<i{width}").astype(np.float32) / 2 ** (bits - 1)
+    elif tag == WAVE_FORMAT_PCM and bits == 24:
+        raw = np.frombuffer(samples, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        pcm = (np.where(value >= 1 << 23, value - (1 << 24), value)).astype(np.float32) / 2 ** 23
+    else:
+        return None
+    return pcm.reshape(-1, channels), rate
+
+
+def decode_with_ffmpeg(ffmpeg, data):
+    """Échantillons float32 mono à TARGET_RATE décodés par ffmpeg (mixage et rééchantillonnage compris)"""
+    result = subprocess.run(
+        [ffmpeg, "-nostdin", "-v", "error", "-i", "pipe:0",
+         "-t", str(settings.AUDIO_MAX_SECONDS + DECODE_MARGIN_SECONDS),
+         "-f", "f32le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+        input=data, capture_output=True, timeout=FFMPEG_TIMEOUT,
+    )
+    if result.returncode != 0 or not result.stdout:
+        return None
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def to_mono_16k(samples, rate):
+    """Moyenne des canaux puis rééchantillonnage polyphase vers TARGET_RATE"""
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    if rate == TARGET_RATE:
+        return mono
+    from scipy.signal import resample_poly
+    divisor = gcd(rate, TARGET_RATE)
+    return resample_poly(mono, TARGET_RATE // divisor, rate // divisor).astype(np.float32)
+
+
+def speech_bounds(samples, rate=TARGET_RATE):
+    """(début, fin) en échantillons de la zone de parole : VAD à énergie par trames de 30 ms"""
+    frame = int(rate * FRAME_SECONDS)
+    count = len(samples) // frame
+    if count == 0:
+        return 0, len(samples)
+    frames = samples[:count * frame].reshape(count, frame).astype(np.float64)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+    threshold = max(VAD_FLOOR_DB, energy_db.max() - VAD_RANGE_DB)
+    voiced = np.flatnonzero(energy_db > threshold)
+    if len(voiced) == 0:
+        # Aucune trame au-dessus du plancher : rien à couper avec certitude
+        return 0, len(samples)
+    padding = int(rate * VAD_PADDING_SECONDS)
+    return max(0, voiced[0] * frame - padding), min(len(samples), (voiced[-1] + 1) * frame + padding)
+
+
+def encode_pcm16(samples):
+    """Octets PCM 16 bits little-endian d'échantillons dans [-1, 1]"""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def encode_wav(samples):
+    """WAV mono 16 bits à TARGET_RATE"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(TARGET_RATE)
+        out.writeframes(encode_pcm16(samples))
+    return buffer.getvalue()
+
+
+def encode_opus(ffmpeg, samples):
+    """OGG/Opus mono (parole, OPUS_BITRATE), None si l'encodeur échoue"""
+    result = subprocess.run(
+        [ffmpeg, "-nostdin", "-v", "error", "-f", "s16le", "-ar", str(TARGET_RATE), "-ac", "1", "-i", "pipe:0",
+         "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1"],
+        input=encode_pcm16(samples), capture_output=True, timeout=FFMPEG_TIMEOUT,
+    )
+    return result.stdout if result.returncode == 0 and result.stdout else None
+
+
+def preprocess_audio(audio_file):
+    """
+    Audio allégé pour la transcription à partir d'un UploadedFile (receive_audio).
+    Retourne un PreparedAudio ; en cas d'échec, le fichier d'origine non modifié.
+    Lève AudioRejected si l'audio décodé dépasse AUDIO_MAX_SECONDS.
+    """
+    original = PreparedAudio(audio_file.file, audio_file.content_type, audio_file.size, audio_file.size)
+    data = audio_file.file.read()
+    audio_file.file.seek(0)
+    ffmpeg = ffmpeg_path()
+
+    try:
+        decoded = decode_wav(data) if audio_file.content_type == "audio/x-wav" else None
+        if decoded is not None:
+            samples, rate = decoded
+            original.original_seconds = len(samples) / rate
+            samples = to_mono_16k(samples, rate)
+        elif ffmpeg:
+            samples = decode_with_ffmpeg(ffmpeg, data)
+            if samples is None:
+                return original
+            original.original_seconds = len(samples) / TARGET_RATE
+        else:
+            return original
+    except (ValueError, struct.error, subprocess.SubprocessError, OSError) as e:
+        print(f"⚠️ Prétraitement audio impossible, fichier envoyé tel quel: {e}")
+        return original
+
+    if original.original_seconds > settings.AUDIO_MAX_SECONDS:
+        raise AudioRejected(f"Audio trop long (max {settings.AUDIO_MAX_SECONDS} s)", 413)
+
+    start, end = speech_bounds(samples)
+    samples = samples[start:end]
+    encoded, mime_type, method = None, None, None
+    if ffmpeg:
+        encoded = encode_opus(ffmpeg, samples)
+        mime_type, method = "audio/ogg", "opus"
+    if encoded is None:
+        encoded, mime_type, method = encode_wav(samples), "audio/x-wav", "wav"
+
+    if len(encoded) >= original.original_bytes:
+        return original
+    return PreparedAudio(io.BytesIO(encoded), mime_type, original.original_bytes, len(encoded),
+                         original.original_seconds, len(samples) / TARGET_RATE, method)
@@ -1,22 +1,19 @@
 """
 Module de transcription audio avec Gemini API (nouvelle syntaxe Client)
-Utilise gemini-2.5-flash (modèle qui fonctionne avec google-genai)
+Utilise gemini-2.5-flash via le client google-genai partagé (gemini_client)
 """
 
-from django.http import JsonResponse
 from django.conf import settings
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from google import genai
-from google.genai import types
-import tempfile
-import os
 import time
-from dotenv import load_dotenv
-
-load_dotenv()
+from .. import gemini_client
+from ..metrics import timed
+from .audio_ingest import AudioRejected, receive_audio
+from .preprocess import PreparedAudio, preprocess_audio
 
 # ✅ MODÈLE CORRECT pour l'API google-genai
-MODEL_NAME = "gemini-2.5-flash"
+MODEL_NAME = gemini_client.MODEL_NAME
 
 def parse_response(text):
     """Parse la réponse formatée de Gemini"""
@@ -47,30 +44,33 @@ def transcribe(request):
     if request.method != "POST":
         return JsonResponse({"error": "POST required"}, status=400)
 
-    # Vérifier le fichier
-    audio_file = request.FILES.get("audio")
-    if not audio_file:
-        return JsonResponse({"error": "Aucun fichier envoyé"}, status=400)
-
-    # Obtenir l'extension du fichier
-    file_ext = audio_file.name.split('.')[-1].lower() if '.' in audio_file.name else 'webm'
-    
-    # Sauvegarder temporairement
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}") as temp:
-        for chunk in audio_file.chunks():
-            temp.write(chunk)
-        temp_path = temp.name
+    # Fichier reçu en mémoire (ou sur disque s'il est gros), taille, durée et format vérifiés
+    try:
+        audio_file = receive_audio(request)
+    except AudioRejected as e:
+        return JsonResponse({"error": e.message, "success": False}, status=e.status)
 
     uploaded_file = None
     client = None
     
     try:
-        # ✅ NOUVELLE SYNTAXE : Client API (comme speachV2.py)
-        client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        # ✅ Client partagé : connexions HTTP réutilisées d'une requête à l'autre
+        client = gemini_client.get_client()
+
+        # Mono 16 kHz sans les silences de début et de fin : moins d'octets à envoyer et à transcrire
+        if settings.AUDIO_PREPROCESS:
+            with timed('audio_preprocess'):
+                audio = preprocess_audio(audio_file)
+            if audio.method != "original":
+                print(f"🎚️ Audio prétraité ({audio.method}): {audio.original_bytes} → {audio.size} octets, "
+                      f"{audio.original_seconds:.1f} s → {audio.seconds:.1f} s")
+        else:
+            audio = PreparedAudio(audio_file.file, audio_file.content_type, audio_file.size, audio_file.size)
         
-        # Upload du fichier via client.files.upload()
-        print(f"📤 Upload du fichier: {temp_path}")
-        uploaded_file = client.files.upload(file=temp_path)
+        # Upload direct depuis le tampon : type MIME détecté sur le contenu
+        print(f"📤 Upload du fichier: {audio_file.name} ({audio.mime_type}, {audio.size} octets)")
+        with timed('gemini_upload'):
+            uploaded_file = client.files.upload(file=audio.file, config={'mime_type': audio.mime_type})
         print(f"✅ Fichier uploadé: {uploaded_file.name}")
         
         # Attendre que le fichier soit ACTIVE
@@ -78,21 +78,23 @@ def transcribe(request):
         poll_interval = 2
         elapsed = 0
         
-        while elapsed < max_wait_time:
-            file_info = client.files.get(name=uploaded_file.name)
+        # Attente côté Gemini mesurée comme une seule phase (appels + pauses)
+        with timed('gemini_poll'):
+            while elapsed < max_wait_time:
+                file_info = client.files.get(name=uploaded_file.name)
             
-            if file_info.state == "ACTIVE":
-                print(f"✅ Fichier ACTIVE")
-                break
-            elif file_info.state == "FAILED":
-                return JsonResponse({
-                    "error": "Le traitement du fichier a échoué côté Gemini",
-                    "success": False
-                }, status=500)
+                if file_info.state == "ACTIVE":
+                    print(f"✅ Fichier ACTIVE")
+                    break
+                elif file_info.state == "FAILED":
+                    return JsonResponse({
+                        "error": "Le traitement du fichier a échoué côté Gemini",
+                        "success": False
+                    }, status=500)
             
-            print(f"⏳ État: {file_info.state}, attente...")
-            time.sleep(poll_interval)
-            elapsed += poll_interval
+                print(f"⏳ État: {file_info.state}, attente...")
+                time.sleep(poll_interval)
+                elapsed += poll_interval
         
         if elapsed >= max_wait_time:
             return JsonResponse({
@@ -140,13 +142,16 @@ TRANSLATION: Hello, how are you?"""
         # ✅ CORRECTION : Utiliser la même syntaxe que speachV2.py
         print(f"🎙️ Transcription en cours avec {MODEL_NAME}...")
         
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=[prompt, uploaded_file],
-            config=types.GenerateContentConfig(
-                response_modalities=['TEXT']
+        # SDK importé au premier appel (le client partagé l'a déjà chargé)
+        from google.genai import types
+        with timed('gemini_generate'):
+            response = client.models.generate_content(
+                model=MODEL_NAME,
+                contents=[prompt, uploaded_file],
+                config=types.GenerateContentConfig(
+                    response_modalities=['TEXT']
+                )
             )
-        )
         
         # Parser la réponse
         result_text = response.text.strip()
@@ -168,6 +173,10 @@ TRANSLATION: Hello, how are you?"""
         
         return JsonResponse(response_data)
 
+    except AudioRejected as e:
+        # Durée dépassée, vue seulement au décodage (conteneur sans durée)
+        return JsonResponse({"error": e.message, "success": False}, status=e.status)
+
     except Exception as e:
         error_msg = str(e)
         print(f"❌ Erreur: {error_msg}")
@@ -194,13 +203,8 @@ TRANSLATION: Hello, how are you?"""
         }, status=500)
     
     finally:
-        # Nettoyage du fichier temporaire local
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-                print(f"🗑️ Fichier local supprimé")
-            except Exception as e:
-                print(f"⚠️ Erreur suppression locale: {e}")
+        # Tampon libéré (fichier temporaire supprimé s'il a débordé sur disque)
+        audio_file.close()
         
         # Nettoyage du fichier sur Gemini
         if uploaded_file and client: